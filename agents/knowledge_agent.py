@@ -1,5 +1,6 @@
 """Knowledge Agent with RAG capabilities for InfinitePay content."""
 
+import json
 import logging
 import re
 from typing import Dict, List, Optional
@@ -10,6 +11,7 @@ from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from langchain_chroma import Chroma
 
 from rag.config import RAGConfig, get_embeddings
+from rag.semantic_cache import SemanticCache, get_semantic_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -40,13 +42,13 @@ class KnowledgeAgent:
                     logger.warning("Vector store exists but contains no documents")
                     self.vectorstore = None
                 else:
-                    logger.info(f"Vector store loaded with {count} documents")
+                    logger.info("Vector store loaded with %s documents", count)
             except Exception as e:
-                logger.warning(f"Vector store test failed: {e}")
+                logger.warning("Vector store test failed: %s", e)
                 self.vectorstore = None
                 
         except Exception as e:
-            logger.warning(f"Failed to load vector store: {e}")
+            logger.warning("Failed to load vector store: %s", e)
             self.vectorstore = None
     
     def _create_qa_prompt(self, lang: str = "pt") -> PromptTemplate:
@@ -83,7 +85,7 @@ ANSWER:"""
     
     def process_query(self, query: str, lang: str = "pt") -> Dict:
         """Process a knowledge query and return response."""
-        logger.info(f"KnowledgeAgent processing query: {query} (lang: {lang})")
+        logger.info("KnowledgeAgent processing query: %s (lang: %s)", query, lang)
         
         try:
             # Check if vector store has content
@@ -105,9 +107,16 @@ ANSWER:"""
                 if not docs or len(docs) == 0:
                     return self._handle_no_relevant_content(query, lang=lang)
             except Exception as e:
-                logger.warning(f"Retrieval failed: {e}")
+                logger.warning("Retrieval failed: %s", e)
                 return self._handle_no_relevant_content(query, lang=lang)
             
+            # Near-duplicates of an answered question over the same context skip the LLM
+            cache = get_semantic_cache()
+            cache_key = self._cache_key(docs, lang)
+            cached = cache.lookup(query, cache_key, SemanticCache.STRICT_DISTANCE_THRESHOLD) if cache else None
+            if cached:
+                return json.loads(cached)
+            
             # Create QA chain with retrieved documents
             qa_chain = RetrievalQA.from_chain_type(
                 llm=self._get_llm(),
@@ -143,17 +152,29 @@ ANSWER:"""
                 label = "Sources" if lang.split('-')[0] == "en" else "Fontes"
                 answer += f"\n\n📚 **{label}:**\n" + "\n".join(sources)
             
-            return {
+            response = {
                 "answer": answer,
                 "agent_used": "knowledge",
                 "sources": sources,
                 "confidence": confidence
             }
+            if cache:
+                cache.add(query, cache_key, json.dumps(response, ensure_ascii=False))
+            return response
             
         except Exception as e:
-            logger.error(f"Error processing knowledge query: {e}")
+            logger.error("Error processing knowledge query: %s", e)
             return self._handle_fallback_response(query, lang=lang)
     
+    def _cache_key(self, docs: List, lang: str) -> str:
+        """Semantic cache key for knowledge answers: retrieved context + language.
+
+        Questions about different products retrieve different chunks, so they
+        never share an answer even when their embeddings are close.
+        """
+        context = sorted(doc.page_content for doc in docs)
+        return make_cache_key("knowledge", lang.split('-')[0], *context)
+    
     def _has_sufficient_content(self) -> bool:
         """Check if vector store has sufficient content."""
         try:
@@ -233,7 +254,7 @@ ANSWER:"""
                 "note": "No relevant RAG content found; LLM generated off-topic response."
             }
         except Exception as e:
-            logger.error(f"Fallback LLM response for no relevant content failed: {e}")
+            logger.error("Fallback LLM response for no relevant content failed: %s", e)
             return self._handle_fallback_response(query, lang=lang)
     
     def _handle_fallback_response(self, query: str, lang: str = "pt") -> Dict:
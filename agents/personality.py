@@ -77,7 +77,7 @@ class PersonalityLayer:
             return adjusted
             
         except Exception as e:
-            logger.error(f"Error adjusting response tone: {e}")
+            logger.error("Error adjusting response tone: %s", e)
             return response  # Return original on error
     
     def _apply_adjustments(self, text: str, lang: str) -> str:
@@ -1,15 +1,103 @@
 """Router Agent for intent classification and orchestration."""
 
+import asyncio
 import logging
+import os
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 
 from agents.knowledge_agent import KnowledgeAgent
 from agents.support_agent import SupportAgent
+from tools.keyword_matcher import KeywordMatcher
+from tools.pattern_matcher import PatternMatcher
 
 logger = logging.getLogger(__name__)
 
+# Last-resort keyword hints for the rule-based classifier, matched in one
+# pass; the tag says which intent the keyword points to.
+_INTENT_KEYWORDS = KeywordMatcher.from_groups({
+    "support": ("minha", "meu", "conta", "saldo", "transação", "problema", "ajuda"),
+    "knowledge": ("o que é", "como funciona", "taxa", "preço", "produto", "serviço"),
+})
+
+
+def _compile_all(patterns: List[str]) -> Tuple["re.Pattern[str]", ...]:
+    return tuple(re.compile(pattern) for pattern in patterns)
+
+
+# Rule-based intent patterns, compiled once at import into a single matcher
+# (one Hyperscan pass when available). The classifier scores how many of each
+# intent's patterns match.
+_INTENT_MATCHER = PatternMatcher.from_groups({
+    "support": [
+        # Account-related
+        r"saldo\b", r"conta\b", r"extrato\b", r"transações?\b", r"movimentações?\b",
+        r"histórico\b", r"pagamentos?\b", r"saques?\b", r"depósitos?\b",
+        # Transfers
+        r"transferências?\b", r"transfer\b", r"transfers\b", r"pix\b",
+        
+        # User data
+        r"meus?\s+dados\b", r"informações?\s+d[ao]\s+cadastro\b", r"perfil\b",
+        r"meu\s+id\b", r"minha\s+conta\b",
+        
+        # Support
+        r"suporte\b", r"ajuda\b", r"problema\b", r"dúvida\b", r"tickets?\b",
+        r"reclamação\b", r"assistência\b", r"atendimento\b", r"falar\s+com\s+atendente\b",
+        
+        # Issues
+        r"não\s+consigo\b", r"erro\b", r"falha\b", r"problema\s+com\b", r"minha\s+maquininha\b",
+        # English equivalents
+        r"can't\b", r"cannot\b", r"error\b", r"issue\b", r"problem\b", r"help\b", r"my\s+account\b",
+        r"card\s+reader\b", r"not\s+working\b"
+    ],
+
+    "knowledge": [
+        # Products and services
+        r"maquininha\b", r"tap\s+to\s+pay\b", r"pdv\b", r"point\s+of\s+sale\b",
+        r"link\s+de\s+pagamento\b", r"loja\s+online\b", r"boleto\b", r"conta\s+digital\b",
+        r"conta\s+pj\b", r"pix\b", r"pix\s+parcelado\b", r"empréstimo\b", r"cartão\b",
+        r"rendimento\b", r"taxas?\b", r"tarifas?\b", r"preços?\b", r"valores?\b",
+        
+        # How it works
+        r"como\s+funciona\b", r"como\s+usar\b", r"funcionalidades?\b", r"benefícios?\b",
+        r"vantagens?\b", r"prazos?\b", r"limites?\b", r"requisitos?\b",
+        
+        # Company info
+        r"infinitepay\b", r"sobre\b", r"informações?\s+sobre\b", r"o\s+que\s+é\b",
+        r"como\s+começar\b", r"cadastro\b", r"abrir\s+conta\b"
+    ],
+})
+
+# Escalation patterns; only a yes/no is needed, so they form one alternation
+_ESCALATION_RE = re.compile("|".join([
+    r"urgente\b", r"emergência\b", r"crítico\b", r"imediatamente\b",
+    r"falar\s+com\s+humano\b", r"atendente\s+humano\b", r"pessoa\s+real\b",
+    r"não\s+entendi\b", r"não\s+respondeu\b", r"tentativas?\b", r"já\s+tentei\b",
+    # English equivalents
+    r"urgent\b", r"emergency\b", r"critical\b", r"immediately\b", r"real\s+person\b",
+    r"human\s+agent\b", r"speak\s+to\s+a\s+human\b", r"frustrated\b", r"useless\b",
+    r"didn't\s+understand\b", r"didn't\s+answer\b", r"already\s+tried\b", r"attempts\b"
+]))
+
+# Multi-intent split patterns (every match of every pattern is a split point)
+_SPLIT_PATTERNS = _compile_all([
+    r"\be\b", r"\b[eé]\s+também\b", r"\balém\s+disso\b", r"\boutra\s+coisa\b",
+    r"\bporém\b", r"\bmas\b", r"\bentretanto\b"
+])
+_SIMPLE_SPLIT_RE = re.compile(r'\s+e\s+|\s+and\s+')
+
+# Explicit requests to open a support ticket
+_TICKET_RE = re.compile("|".join([
+    r"create\s+(a\s+)?support\s+ticket",
+    r"open\s+(a\s+)?ticket",
+    r"file\s+(a\s+)?ticket",
+    r"support\s+ticket",
+    r"abrir\s+(um\s+)?chamado",
+    r"abrir\s+(um\s+)?ticket",
+    r"criar\s+(um\s+)?chamado",
+]))
+
 
 class RouterAgent:
     """Router agent for classifying intents and routing to appropriate agents."""
@@ -18,63 +106,9 @@ class RouterAgent:
         self.knowledge_agent = KnowledgeAgent()
         self.support_agent = SupportAgent()
         
-        # Define intent patterns for rule-based classification
-        self.intent_patterns = {
-            "support": [
-                # Account-related
-                r"saldo\b", r"conta\b", r"extrato\b", r"transações?\b", r"movimentações?\b",
-                r"histórico\b", r"pagamentos?\b", r"saques?\b", r"depósitos?\b",
-                # Transfers
-                r"transferências?\b", r"transfer\b", r"transfers\b", r"pix\b",
-                
-                # User data
-                r"meus?\s+dados\b", r"informações?\s+d[ao]\s+cadastro\b", r"perfil\b",
-                r"meu\s+id\b", r"minha\s+conta\b",
-                
-                # Support
-                r"suporte\b", r"ajuda\b", r"problema\b", r"dúvida\b", r"tickets?\b",
-                r"reclamação\b", r"assistência\b", r"atendimento\b", r"falar\s+com\s+atendente\b",
-                
-                # Issues
-                r"não\s+consigo\b", r"erro\b", r"falha\b", r"problema\s+com\b", r"minha\s+maquininha\b",
-                # English equivalents
-                r"can't\b", r"cannot\b", r"error\b", r"issue\b", r"problem\b", r"help\b", r"my\s+account\b",
-                r"card\s+reader\b", r"not\s+working\b"
-            ],
-
-            "knowledge": [
-                # Products and services
-                r"maquininha\b", r"tap\s+to\s+pay\b", r"pdv\b", r"point\s+of\s+sale\b",
-                r"link\s+de\s+pagamento\b", r"loja\s+online\b", r"boleto\b", r"conta\s+digital\b",
-                r"conta\s+pj\b", r"pix\b", r"pix\s+parcelado\b", r"empréstimo\b", r"cartão\b",
-                r"rendimento\b", r"taxas?\b", r"tarifas?\b", r"preços?\b", r"valores?\b",
-                
-                # How it works
-                r"como\s+funciona\b", r"como\s+usar\b", r"funcionalidades?\b", r"benefícios?\b",
-                r"vantagens?\b", r"prazos?\b", r"limites?\b", r"requisitos?\b",
-                
-                # Company info
-                r"infinitepay\b", r"sobre\b", r"informações?\s+sobre\b", r"o\s+que\s+é\b",
-                r"como\s+começar\b", r"cadastro\b", r"abrir\s+conta\b"
-            ]
-        }
-        
-        # Escalation patterns
-        self.escalation_patterns = [
-            r"urgente\b", r"emergência\b", r"crítico\b", r"imediatamente\b",
-            r"falar\s+com\s+humano\b", r"atendente\s+humano\b", r"pessoa\s+real\b",
-            r"não\s+entendi\b", r"não\s+respondeu\b", r"tentativas?\b", r"já\s+tentei\b",
-            # English equivalents
-            r"urgent\b", r"emergency\b", r"critical\b", r"immediately\b", r"real\s+person\b",
-            r"human\s+agent\b", r"speak\s+to\s+a\s+human\b", r"frustrated\b", r"useless\b",
-            r"didn't\s+understand\b", r"didn't\s+answer\b", r"already\s+tried\b", r"attempts\b"
-        ]
-        
-        # Multi-intent split patterns
-        self.split_patterns = [
-            r"\be\b", r"\b[eé]\s+também\b", r"\balém\s+disso\b", r"\boutra\s+coisa\b",
-            r"\bporém\b", r"\bmas\b", r"\bentretanto\b"
-        ]
+        self.intent_matcher = _INTENT_MATCHER
+        self.escalation_re = _ESCALATION_RE
+        self.split_patterns = _SPLIT_PATTERNS
     
     def classify_intent(self, query: str) -> Tuple[str, float]:
         """Classify intent using LLM first, fallback to rule-based approach."""
@@ -92,22 +126,63 @@ class RouterAgent:
         # Fallback: rule-based classification
         return self._classify_with_rules(query_lower)
     
+    async def aclassify_intent(self, query: str) -> Tuple[str, float]:
+        """Async variant of classify_intent; awaits the LLM classifier."""
+        query_lower = query.lower().strip()
+        
+        if self._check_escalation(query_lower):
+            return "escalate", 1.0
+        
+        llm_result = await self._aclassify_with_llm(query)
+        if llm_result:
+            return llm_result
+        
+        return self._classify_with_rules(query_lower)
+    
     def _classify_with_llm(self, query: str) -> Optional[Tuple[str, float]]:
         """Use LLM for intelligent intent classification."""
         try:
-            import os
-            from rag.config import create_llm
-            from langchain.schema import HumanMessage, SystemMessage
-            
             # Check if OpenAI is properly configured
-            if os.getenv("MODEL_PROVIDER") != "openai" or not os.getenv("OPENAI_API_KEY"):
+            if not self._llm_classification_enabled():
                 return None
             
+            from rag.config import create_llm
+            
             # Create LLM instance
             llm = create_llm()
+            response = llm.invoke(self._classification_messages(query))
+            return self._parse_classification(response.content)
+            
+        except Exception as e:
+            logger.warning("LLM classification failed: %s", e)
+            return None
+    
+    async def _aclassify_with_llm(self, query: str) -> Optional[Tuple[str, float]]:
+        """Async variant of _classify_with_llm using `llm.ainvoke`."""
+        try:
+            if not self._llm_classification_enabled():
+                return None
             
-            # Create classification prompt
-            system_prompt = '''You are an intelligent intent classifier for a customer service system. Analyze the user query and classify it into one of these categories:
+            from rag.config import create_llm
+            
+            llm = create_llm()
+            response = await llm.ainvoke(self._classification_messages(query))
+            return self._parse_classification(response.content)
+            
+        except Exception as e:
+            logger.warning("LLM classification failed: %s", e)
+            return None
+    
+    def _llm_classification_enabled(self) -> bool:
+        """LLM classification is only used with a configured OpenAI provider."""
+        return os.getenv("MODEL_PROVIDER") == "openai" and bool(os.getenv("OPENAI_API_KEY"))
+    
+    def _classification_messages(self, query: str) -> List:
+        """Build the intent classification prompt."""
+        from langchain.schema import HumanMessage, SystemMessage
+        
+        # Create classification prompt
+        system_prompt = '''You are an intelligent intent classifier for a customer service system. Analyze the user query and classify it into one of these categories:
 
 INTENT CATEGORIES:
 - "support": Account issues, login problems, transaction queries, balance inquiries, transfer issues, account access problems
@@ -126,58 +201,50 @@ RESPOND WITH:
 CLASSIFICATION: <intent>
 CONFIDENCE: <0.0-1.0>
 REASON: <brief explanation>'''
-            
-            human_prompt = f"User query: {query}"
-            
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=human_prompt)
-            ]
-            
-            response = llm.invoke(messages)
-            result = response.content.strip()
-            
-            # Parse LLM response
-            lines = result.split('\n')
-            intent = "unknown"
-            confidence = 0.5
-            
-            for line in lines:
-                if "CLASSIFICATION:" in line:
-                    intent = line.split("CLASSIFICATION:")[1].strip().lower()
-                elif "CONFIDENCE:" in line:
-                    try:
-                        confidence = float(line.split("CONFIDENCE:")[1].strip())
-                    except ValueError:
-                        confidence = 0.5
-            
-            # Validate intent
-            if intent in ["support", "knowledge", "escalate", "unknown"]:
-                return intent, min(confidence, 0.95)  # Cap at 0.95 for LLM
-            
-            return None
-            
-        except Exception as e:
-            logger.warning(f"LLM classification failed: {e}")
-            return None
+        
+        human_prompt = f"User query: {query}"
+        
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=human_prompt)
+        ]
+    
+    def _parse_classification(self, content: str) -> Optional[Tuple[str, float]]:
+        """Parse the CLASSIFICATION/CONFIDENCE lines of the LLM reply."""
+        result = content.strip()
+        
+        # Parse LLM response
+        lines = result.split('\n')
+        intent = "unknown"
+        confidence = 0.5
+        
+        for line in lines:
+            if "CLASSIFICATION:" in line:
+                intent = line.split("CLASSIFICATION:")[1].strip().lower()
+            elif "CONFIDENCE:" in line:
+                try:
+                    confidence = float(line.split("CONFIDENCE:")[1].strip())
+                except ValueError:
+                    confidence = 0.5
+        
+        # Validate intent
+        if intent in ["support", "knowledge", "escalate", "unknown"]:
+            return intent, min(confidence, 0.95)  # Cap at 0.95 for LLM
+        
+        return None
     
     def _classify_with_rules(self, query_lower: str) -> Tuple[str, float]:
         """Fallback rule-based classification."""
         # Count matches for each intent
-        intent_scores = {}
-        for intent, patterns in self.intent_patterns.items():
-            score = 0
-            for pattern in patterns:
-                if re.search(pattern, query_lower):
-                    score += 1
-            intent_scores[intent] = score
+        intent_scores = self.intent_matcher.counts(query_lower)
         
         # Determine primary intent
         if not intent_scores or max(intent_scores.values()) == 0:
-            # Fallback: check for specific keywords
-            if self._has_support_keywords(query_lower):
+            # Fallback: check for specific keywords (one scan for both intents)
+            keyword_intents = _INTENT_KEYWORDS.tags(query_lower)
+            if "support" in keyword_intents:
                 return "support", 0.6
-            elif self._has_knowledge_keywords(query_lower):
+            elif "knowledge" in keyword_intents:
                 return "knowledge", 0.6
             else:
                 return "unknown", 0.3
@@ -201,16 +268,11 @@ REASON: <brief explanation>'''
     
     def route_query(self, query: str, user_id: Optional[str] = None, lang: Optional[str] = None) -> Dict:
         """Route query to appropriate agent and return response."""
-        logger.info(f"RouterAgent processing query: {query}")
+        logger.info("RouterAgent processing query: %s", query)
 
         # Detect language if not provided
         if lang is None:
-            try:
-                from langdetect import detect, LangDetectException
-                lang = detect(query)
-            except LangDetectException:
-                lang = "pt"  # Default to Portuguese if detection fails
-            logger.info(f"Detected language: {lang}")
+            lang = self._detect_lang(query)
 
         # Check for multi-intent queries
         sub_queries = self._split_multi_intent(query)
@@ -220,107 +282,169 @@ REASON: <brief explanation>'''
 
         # Single intent - classify and route
         # Deterministic override: explicit ticket intent should go to Support
-        ql = query.lower()
-        ticket_patterns = [
-            r"create\s+(a\s+)?support\s+ticket",
-            r"open\s+(a\s+)?ticket",
-            r"file\s+(a\s+)?ticket",
-            r"support\s+ticket",
-            r"abrir\s+(um\s+)?chamado",
-            r"abrir\s+(um\s+)?ticket",
-            r"criar\s+(um\s+)?chamado",
-        ]
-        if any(re.search(p, ql) for p in ticket_patterns) or ("subject:" in ql and "description:" in ql):
+        if self._is_explicit_ticket(query):
             support_response = self.support_agent.process_query(query, user_id, lang=lang)
-            support_response.update({
-                "intent": "support",
-                "confidence": 0.95,
-                "lang": lang,
-            })
-            return support_response
+            return self._with_routing(support_response, "support", 0.95, lang)
 
         intent, confidence = self.classify_intent(query)
-        logger.info(f"Classified intent: {intent} (confidence: {confidence})")
+        logger.info("Classified intent: %s (confidence: %s)", intent, confidence)
 
         # Route based on intent
         if intent == "escalate":
-            # Localize escalation message by language
-            if lang and lang.split('-')[0] == "en":
-                esc_msg = (
-                    "I understand this might be urgent or complex. I’ll connect you with a human agent who can help further. "
-                    "Please hold on a moment... 🔄"
-                )
-            else:
-                esc_msg = (
-                    "Entendo que sua solicitação pode ser urgente ou complexa. Vou encaminhar você para um atendente humano "
-                    "que poderá ajudar melhor. Por favor, aguarde um momento... 🔄"
-                )
-            return {
-                "answer": esc_msg,
-                "agent_used": "router",
-                "intent": intent,
-                "confidence": confidence,
-                "lang": lang,
-                "handoff_to_human": True
-            }
+            return self._escalation_response(intent, confidence, lang)
 
         elif intent == "support":
             # Route to support agent
             support_response = self.support_agent.process_query(query, user_id, lang=lang)
-            support_response.update({
-                "intent": intent,
-                "confidence": confidence,
-                "lang": lang
-            })
-            return support_response
+            return self._with_routing(support_response, intent, confidence, lang)
 
         elif intent == "knowledge":
             # Route to knowledge agent
             knowledge_response = self.knowledge_agent.process_query(query, lang=lang)
-            knowledge_response.update({
-                "intent": intent,
-                "confidence": confidence,
-                "lang": lang
-            })
-            return knowledge_response
+            return self._with_routing(knowledge_response, intent, confidence, lang)
 
         else:  # unknown intent
             # Try knowledge agent first (broader scope)
             if self.knowledge_agent.is_available():
                 knowledge_response = self.knowledge_agent.process_query(query, lang=lang)
                 if knowledge_response.get("confidence", 0) > 0.3:
-                    knowledge_response.update({
-                        "intent": "knowledge",
-                        "confidence": confidence * 0.8,
-                        "lang": lang
-                    })
-                    return knowledge_response
+                    return self._with_routing(knowledge_response, "knowledge", confidence * 0.8, lang)
 
             # Fallback to support agent
             support_response = self.support_agent.process_query(query, user_id, lang=lang)
-            support_response.update({
-                "intent": "support",
-                "confidence": confidence * 0.8,
-                "lang": lang
-            })
-            return support_response
+            return self._with_routing(support_response, "support", confidence * 0.8, lang)
+
+    async def aroute_query(self, query: str, user_id: Optional[str] = None, lang: Optional[str] = None) -> Dict:
+        """Async variant of route_query.
+
+        LLM calls are awaited via `ainvoke`; the knowledge agent's retrieval
+        chain is synchronous and runs in a worker thread.
+        """
+        logger.info("RouterAgent processing query: %s", query)
+
+        if lang is None:
+            lang = self._detect_lang(query)
+
+        sub_queries = self._split_multi_intent(query)
+
+        if len(sub_queries) > 1:
+            return await self._ahandle_multi_intent(sub_queries, user_id, lang)
+
+        if self._is_explicit_ticket(query):
+            support_response = await self.support_agent.aprocess_query(query, user_id, lang=lang)
+            return self._with_routing(support_response, "support", 0.95, lang)
+
+        intent, confidence = await self.aclassify_intent(query)
+        logger.info("Classified intent: %s (confidence: %s)", intent, confidence)
+        return await self._adispatch(query, user_id, lang, intent, confidence)
+
+    async def astream_query(self, query: str, user_id: Optional[str] = None, lang: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Route a query and yield its answer incrementally.
+
+        Yields ``{"delta": text}`` events followed by one final event with the
+        routing metadata (``agent_used``, ``intent``, ``confidence``, ...).
+        Only general support answers are generated token by token; every other
+        route is answered by `aroute_query` and sent as a single delta.
+        """
+        logger.info("RouterAgent streaming query: %s", query)
+
+        if lang is None:
+            lang = self._detect_lang(query)
+
+        if len(self._split_multi_intent(query)) > 1 or self._is_explicit_ticket(query):
+            result = await self.aroute_query(query, user_id, lang)
+        else:
+            intent, confidence = await self.aclassify_intent(query)
+            logger.info("Classified intent: %s (confidence: %s)", intent, confidence)
+            if intent == "support" and self.support_agent.can_stream(query, user_id):
+                async for text in self.support_agent.astream_general_support_query(query, user_id, lang=lang):
+                    yield {"delta": text}
+                yield self._with_routing({"agent_used": "support", "tool_used": None, "requires_user_id": False}, intent, confidence, lang)
+                return
+            result = await self._adispatch(query, user_id, lang, intent, confidence)
+
+        yield {"delta": result.pop("answer", "")}
+        yield result
+
+    async def _adispatch(self, query: str, user_id: Optional[str], lang: str, intent: str, confidence: float) -> Dict:
+        """Send a classified single-intent query to the matching agent."""
+        if intent == "escalate":
+            return self._escalation_response(intent, confidence, lang)
+
+        elif intent == "support":
+            support_response = await self.support_agent.aprocess_query(query, user_id, lang=lang)
+            return self._with_routing(support_response, intent, confidence, lang)
+
+        elif intent == "knowledge":
+            knowledge_response = await asyncio.to_thread(self.knowledge_agent.process_query, query, lang)
+            return self._with_routing(knowledge_response, intent, confidence, lang)
+
+        else:  # unknown intent
+            if self.knowledge_agent.is_available():
+                knowledge_response = await asyncio.to_thread(self.knowledge_agent.process_query, query, lang)
+                if knowledge_response.get("confidence", 0) > 0.3:
+                    return self._with_routing(knowledge_response, "knowledge", confidence * 0.8, lang)
+
+            support_response = await self.support_agent.aprocess_query(query, user_id, lang=lang)
+            return self._with_routing(support_response, "support", confidence * 0.8, lang)
+
+    def _detect_lang(self, query: str) -> str:
+        """Detect the query language, defaulting to Portuguese."""
+        try:
+            from langdetect import detect, LangDetectException
+            lang = detect(query)
+        except LangDetectException:
+            lang = "pt"  # Default to Portuguese if detection fails
+        logger.info("Detected language: %s", lang)
+        return lang
+
+    def _is_explicit_ticket(self, query: str) -> bool:
+        """Check for an explicit request to open a support ticket."""
+        ql = query.lower()
+        return _TICKET_RE.search(ql) is not None or ("subject:" in ql and "description:" in ql)
+
+    def _escalation_response(self, intent: str, confidence: float, lang: str) -> Dict:
+        """Build the human handoff response."""
+        # Localize escalation message by language
+        if lang and lang.split('-')[0] == "en":
+            esc_msg = (
+                "I understand this might be urgent or complex. I’ll connect you with a human agent who can help further. "
+                "Please hold on a moment... 🔄"
+            )
+        else:
+            esc_msg = (
+                "Entendo que sua solicitação pode ser urgente ou complexa. Vou encaminhar você para um atendente humano "
+                "que poderá ajudar melhor. Por favor, aguarde um momento... 🔄"
+            )
+        return {
+            "answer": esc_msg,
+            "agent_used": "router",
+            "intent": intent,
+            "confidence": confidence,
+            "lang": lang,
+            "handoff_to_human": True
+        }
+
+    def _with_routing(self, response: Dict, intent: str, confidence: float, lang: str) -> Dict:
+        """Annotate an agent response with routing metadata."""
+        response.update({
+            "intent": intent,
+            "confidence": confidence,
+            "lang": lang
+        })
+        return response
     
     def _check_escalation(self, query: str) -> bool:
         """Check if query should be escalated to human."""
-        for pattern in self.escalation_patterns:
-            if re.search(pattern, query):
-                return True
-        return False
+        return self.escalation_re.search(query) is not None
     
     def _has_support_keywords(self, query: str) -> bool:
         """Check if query has support-related keywords."""
-        support_keywords = ["minha", "meu", "conta", "saldo", "transação", "problema", "ajuda"]
-        return any(keyword in query for keyword in support_keywords)
+        return "support" in _INTENT_KEYWORDS.tags(query)
     
     def _has_knowledge_keywords(self, query: str) -> bool:
         """Check if query has knowledge-related keywords."""
-        knowledge_keywords = ["o que é", "como funciona", "taxa", "preço", "produto", "serviço"]
-        return any(keyword in query for keyword in knowledge_keywords)
+        return "knowledge" in _INTENT_KEYWORDS.tags(query)
     
     def _split_multi_intent(self, query: str) -> List[str]:
         """Split multi-intent queries into sub-queries."""
@@ -330,7 +454,7 @@ REASON: <brief explanation>'''
         # Find split points
         split_points = []
         for pattern in self.split_patterns:
-            for match in re.finditer(pattern, query_lower):
+            for match in pattern.finditer(query_lower):
                 split_points.append(match.start())
         
         if not split_points:
@@ -362,7 +486,7 @@ REASON: <brief explanation>'''
         # If we couldn't split properly, check for obvious multi-intent patterns
         if len(sub_queries) < 2:
             # Check for "X and Y" or "X e Y" patterns
-            simple_split = re.split(r'\s+e\s+|\s+and\s+', query, 1)
+            simple_split = _SIMPLE_SPLIT_RE.split(query, 1)
             if len(simple_split) == 2 and len(simple_split[0].strip()) > 5 and len(simple_split[1].strip()) > 5:
                 return simple_split
         
@@ -370,13 +494,24 @@ REASON: <brief explanation>'''
     
     def _handle_multi_intent(self, sub_queries: List[str], user_id: Optional[str], lang: str) -> Dict:
         """Handle multi-intent queries by processing each sub-query."""
+        # Pass the language down in the recursive call
+        results = [self.route_query(sub_query, user_id, lang=lang) for sub_query in sub_queries]
+        return self._combine_multi_intent(sub_queries, results, lang)
+    
+    async def _ahandle_multi_intent(self, sub_queries: List[str], user_id: Optional[str], lang: str) -> Dict:
+        """Async variant of _handle_multi_intent; sub-queries are routed concurrently."""
+        results = await asyncio.gather(
+            *(self.aroute_query(sub_query, user_id, lang=lang) for sub_query in sub_queries)
+        )
+        return self._combine_multi_intent(sub_queries, results, lang)
+    
+    def _combine_multi_intent(self, sub_queries: List[str], results: List[Dict], lang: str) -> Dict:
+        """Merge per-sub-query results into one localized answer."""
         responses = []
         agents_used = []
         total_confidence = 0
         
-        for sub_query in sub_queries:
-            # Pass the language down in the recursive call
-            result = self.route_query(sub_query, user_id, lang=lang)
+        for result in results:
             responses.append(result.get("answer", ""))
             agents_used.append(result.get("agent_used", "unknown"))
             total_confidence += result.get("confidence", 0)
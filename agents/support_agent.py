@@ -1,62 +1,249 @@
 """Customer Support Agent with access to user data tools."""
 
+import asyncio
+import functools
+import hashlib
 import logging
 import os
 import json
-from typing import Dict, List, Optional
+import re
+import threading
+import unicodedata
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
 
-from langchain.agents import Tool
-from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+from cachetools import TTLCache
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _facts_json(facts: Dict, sort_keys: bool = False) -> str:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(facts, option=option).decode()
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    _json_loads = json.loads
+
+    def _facts_json(facts: Dict, sort_keys: bool = False) -> str:
+        return json.dumps(facts, ensure_ascii=False, indent=2, sort_keys=sort_keys)
 
 from tools.user_store import (
+    STATUS_EMOJI,
     TOOL_METADATA,
+    UNKNOWN_EMOJI,
+    format_brl,
     get_account_details,
     get_recent_transactions,
     get_tool_suggestions,
+    get_user_store,
     open_support_ticket,
-    UserStore,
 )
-from tools.ticket_sink import post_ticket
+from rag.semantic_cache import SemanticCache, get_semantic_cache, make_cache_key
+from tools.keyword_matcher import KeywordMatcher
+from tools.ticket_sink import enqueue_ticket, post_ticket
+
+if TYPE_CHECKING:
+    # LangChain is imported lazily where it is used; it dominates cold import time
+    from langchain.agents import Tool
+    from langchain.schema import BaseMessage, SystemMessage
 
 logger = logging.getLogger(__name__)
 
 
-class SupportAgent:
-    """Agent for handling customer support queries with access to user data."""
-    
-    def __init__(self):
-        self.tools = self._create_tools()
-        self.system_prompt = self._create_system_prompt()
-    
-    def _create_tools(self) -> List[Tool]:
-        """Create LangChain tools for the agent."""
-        return [
-            Tool(
-                name="get_account_details",
-                func=get_account_details,
-                description="Get user account details (requires user_id)"
-            ),
-            Tool(
-                name="get_recent_transactions",
-                func=get_recent_transactions,
-                description="Get recent user transactions (requires user_id, optional: limit)"
-            ),
-            Tool(
-                name="open_support_ticket",
-                func=open_support_ticket,
-                description="Open a new support ticket (requires user_id, subject, description)"
-            )
-        ]
-    
-    def _create_system_prompt(self, lang: str = "pt") -> str:
-        """Create system prompt for the support agent."""
-        language_map = {
-            "en": "English",
-            "pt": "Portuguese"
-        }
-        output_language = language_map.get(lang.split('-')[0], "Portuguese")
+# Localized recommendation lists, keyed by (language, scenario). Built once at
+# import time so the login/transfer diagnostics don't rebuild them per call.
+RECS = {
+    # Login / access
+    ("en", "login_active"): (
+        "Reset your password and try signing in again",
+        "If you use 2FA, check SMS/app codes and try once more",
+        "Update the app to the latest version and try a different connection (Wi‑Fi/4G)",
+        "If it still fails, reply 'Open ticket' and I will escalate",
+    ),
+    ("en", "login_restricted"): (
+        "Complete any pending identity/registration verification",
+        "Resolve compliance or security reviews shown in the app",
+        "Reply 'Open ticket' and I will escalate this now",
+    ),
+    ("pt", "login_active"): (
+        "Redefina sua senha e tente entrar novamente",
+        "Se usar 2FA, verifique os códigos por SMS/app e tente de novo",
+        "Atualize o app para a versão mais recente e teste outra conexão (Wi‑Fi/4G)",
+        "Se continuar falhando, responda 'Abrir chamado' que eu escalo",
+    ),
+    ("pt", "login_restricted"): (
+        "Conclua eventuais verificações de identidade/cadastro",
+        "Resolva pendências de conformidade ou segurança exibidas no app",
+        "Responda 'Abrir chamado' que eu escalo agora",
+    ),
+    # Transfers / PIX
+    ("en", "transfer_base"): (
+        "Check recipient details and the amount",
+        "Verify the app has no pending updates",
+        "Try again in a few minutes",
+        "If it keeps failing, I can open a support ticket",
+    ),
+    ("en", "transfer_suspended"): (
+        "Complete any pending identity/registration verification",
+        "Resolve compliance or security reviews shown in the app",
+        "Reply here with 'Open ticket' and I will escalate",
+    ),
+    ("en", "transfer_failed"): (
+        "Double-check recipient info (PIX key/CPF/CNPJ, bank, amount)",
+        "Try on a different connection (Wi‑Fi/4G) and update the app",
+        "Try a smaller test amount to isolate the issue",
+        "If still failing, say 'Open ticket' and I will escalate",
+    ),
+    ("en", "transfer_pending"): (
+        "Wait a few minutes — pending items may settle shortly",
+        "Check notifications in the app for any required action",
+        "If it doesn't clear, I can open a support ticket for you",
+    ),
+    ("pt", "transfer_base"): (
+        "Conferir os dados do destinatário e o valor",
+        "Verificar se há atualização pendente do app",
+        "Tentar novamente em alguns minutos",
+        "Se continuar falhando, posso abrir um chamado",
+    ),
+    ("pt", "transfer_suspended"): (
+        "Concluir eventuais verificações de identidade/cadastro",
+        "Resolver pendências de conformidade ou segurança no app",
+        "Responda 'Abrir chamado' que eu escalo para o suporte",
+    ),
+    ("pt", "transfer_failed"): (
+        "Conferir informações do destinatário (chave PIX/CPF/CNPJ, banco, valor)",
+        "Tentar em outra conexão (Wi‑Fi/4G) e atualizar o app",
+        "Tentar um valor menor para isolar o problema",
+        "Se continuar, diga 'Abrir chamado' que eu escalo",
+    ),
+    ("pt", "transfer_pending"): (
+        "Aguardar alguns minutos — itens pendentes podem compensar",
+        "Verificar notificações no app para ações necessárias",
+        "Se não resolver, posso abrir um chamado para você",
+    ),
+}
+
+ASK_USER_ID_MAP = {
+    "en": (
+        "To check your account or transactions I need your user ID. "
+        "Please provide your user_id so I can securely verify your information and help you faster."
+    ),
+    "pt": (
+        "Para verificar sua conta ou transações, preciso do seu ID de usuário. "
+        "Por favor, me informe seu user_id para que eu possa verificar com segurança e ajudar mais rápido."
+    ),
+}
+
+NOT_FOUND_MAP = {
+    "en": "User {user_id} not found.",
+    "pt": "❌ Usuário {user_id} não encontrado.",
+}
+
+TICKET_HELP_MAP = {
+    "en": "I can help you create a support ticket! 🎫\n\nTo log your issue, I need:\n1. A brief subject (e.g., 'Problem with card machine')\n2. A detailed description of the problem\n\nPlease tell me what issue you are facing.",
+    "pt": "Posso ajudar você a criar um ticket de suporte! 🎫\n\nPara registrar seu problema, preciso de:\n1. Um breve assunto (ex: 'Problema com maquininha')\n2. Descrição detalhada do problema\n\nPor favor, me diga qual é o problema que você está enfrentando."
+}
+
+GENERAL_FALLBACK_MAP = {
+    "en": "I understand you're facing difficulties. I can help you with:\n\n💰 **Account data** - balance, registration information\n📊 **Transactions** - history of payments and withdrawals\n🎫 **Support** - create tickets for issues\n\nHow can I best help you today? If you need specific account information, please provide your user ID.",
+    "pt": "Entendo que você está enfrentando dificuldades. Posso ajudar você com:\n\n💰 **Dados da conta** - saldo, informações cadastrais\n📊 **Transações** - histórico de pagamentos e saques\n🎫 **Suporte** - criar tickets para problemas\n\nQual seria a melhor forma de ajudar você hoje? Se precisar de informações específicas da conta, me diga seu ID de usuário."
+}
+
 
-        return f"""You are a customer support assistant for InfinitePay, specializing in helping users with account and transaction-related issues.
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so 'transferência' matches 'transferencia'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# Intent patterns matched against _fold(query) (lowercase, accent-free).
+# Word boundaries avoid partial-word hits such as "loginless"; stems like
+# "transfer\w*" keep inflected forms ("transferido", "transferencias") matching.
+LOGIN_RE = re.compile(
+    r"\b(?:log[- ]?in|sign[- ]?in|access\w*|acess(?:ar|o)|entrar|senhas?|passwords?|2fa|otp)\b",
+    re.IGNORECASE,
+)
+ACCOUNT_RE = re.compile(r"\b(?:saldos?|contas?|accounts?|balances?|perfil|profiles?)\b", re.IGNORECASE)
+TXN_RE = re.compile(
+    r"\b(?:transacoes|extratos?|historicos?|movimentacoes|transactions|statements?|history)\b",
+    re.IGNORECASE,
+)
+TRANSFER_RE = re.compile(r"\b(?:transfer\w*|pix)\b", re.IGNORECASE)
+TICKET_RE = re.compile(
+    r"\b(?:suporte|ajud\w*|problemas?|tickets?|assistencia|help\w*|problems?)\b",
+    re.IGNORECASE,
+)
+
+# Support branches in dispatch priority order
+BRANCH_PATTERNS = (
+    ("login", LOGIN_RE),
+    ("account", ACCOUNT_RE),
+    ("transactions", TXN_RE),
+    ("transfer", TRANSFER_RE),
+    ("ticket", TICKET_RE),
+)
+
+# Recently created tickets keyed by request hash, so retries within the TTL
+# don't create a duplicate row or re-post the webhook
+IDEMPOTENCY: TTLCache = TTLCache(maxsize=10_000, ttl=600)
+_IDEMPOTENCY_LOCK = threading.Lock()
+
+
+def _ticket_idempotency_key(user_id: str, subject: str, description: str) -> str:
+    """Hash the fields that identify a ticket request."""
+    return hashlib.sha1(f"{user_id}|{subject}|{description}".encode("utf-8")).hexdigest()
+
+
+# Defaults for optional triage fields the LLM may omit. "attachments" and
+# "language_detected" are filled per call (fresh list / request language).
+_TRIAGE_DEFAULTS = {
+    "category": "support",
+    "severity": "P3",
+    "product": "",
+    "device_model": "",
+    "error_code": "",
+    "repro_steps": "",
+    "environment": "",
+    "timeframe": "",
+}
+
+# Keywords that need a user_id to answer (see SupportAgent._requires_user_id)
+_SUPPORT_KEYWORDS = KeywordMatcher.from_groups({
+    "balance": ("saldo", "balance"),
+    "account": ("conta", "account", "login", "sign in"),
+    "transactions": ("transações", "extrato", "histórico", "movimentações", "transactions", "statement"),
+    "transfer": ("transferência", "transferências", "transfer", "transfers"),
+})
+_DIGITS_RE = re.compile(r"\d+")
+
+# General answers are not tied to verified facts: only near-duplicate queries may share one
+_GENERAL_CACHE_THRESHOLD = SemanticCache.STRICT_DISTANCE_THRESHOLD
+
+# Extracts the JSON object when the LLM prefaces/suffixes it with prose
+JSON_BLOCK_RE = re.compile(r"\{.*\}", re.S)
+
+
+def _user_status(user: Dict) -> str:
+    """The account status, or "unknown" when the record lacks a usable one."""
+    status = user.get("status")
+    return status if isinstance(status, str) and status else "unknown"
+
+
+def _rec_lang(lang: str) -> str:
+    """Map a language tag to a RECS language key (English or Portuguese)."""
+    return "en" if lang.startswith("en") else "pt"
+
+
+def _build_system_prompt(lang: str) -> str:
+    """Render the support system prompt for a language."""
+    language_map = {
+        "en": "English",
+        "pt": "Portuguese"
+    }
+    output_language = language_map.get(lang.split('-')[0], "Portuguese")
+
+    return f"""You are a customer support assistant for InfinitePay, specializing in helping users with account and transaction-related issues.
 
 YOUR RESPONSIBILITIES:
 1.  **Language**: You MUST respond in the following language: **{output_language}**.
@@ -78,29 +265,85 @@ IMPORTANT GUIDELINES:
 - Use appropriate emojis to make the communication friendlier.
 - Do not just provide technical data about the account data and transactions, use them to address the client question.
 """
+
+
+# Built once at import; every SupportAgent shares the same prompt strings
+_SYS_PROMPTS = {"pt": _build_system_prompt("pt"), "en": _build_system_prompt("en")}
+
+# Instructions for paraphrasing verified facts, one string per language
+_SUMMARY_SYSTEM_PROMPTS = {
+    lang: (
+        f"You are a customer support assistant for InfinitePay. You will receive a user query and a set of VERIFIED FACTS "
+        f"about the user's account or transactions. Your job is to write a clear, friendly, and helpful response in {output_language} that:\n"
+        "- Uses ONLY the provided facts.\n"
+        "- DOES NOT invent numbers, statuses, or actions.\n"
+        "- Does not reveal raw JSON; summarize succinctly.\n"
+        "- Offers practical next steps and the option to open a support ticket.\n"
+        "- Keeps the response concise and readable, using bullet points where helpful.\n"
+    )
+    for lang, output_language in (("pt", "Portuguese"), ("en", "English"))
+}
+
+
+# The same SystemMessage object is reused per language so the prompt prefix is
+# byte-identical across requests, which is what provider-side prompt caching keys on.
+@functools.lru_cache(maxsize=8)
+def _system_message_for(lang: str) -> "SystemMessage":
+    from langchain.schema import SystemMessage
+
+    return SystemMessage(content=_SYS_PROMPTS.get(lang.split('-')[0], _SYS_PROMPTS["pt"]))
+
+
+@functools.lru_cache(maxsize=8)
+def _summary_system_message_for(lang: str) -> "SystemMessage":
+    from langchain.schema import SystemMessage
+
+    return SystemMessage(content=_SUMMARY_SYSTEM_PROMPTS.get(lang.split('-')[0], _SUMMARY_SYSTEM_PROMPTS["pt"]))
+
+
+_TOOL_SPECS = (
+    ("get_account_details", get_account_details, "Get user account details (requires user_id)"),
+    ("get_recent_transactions", get_recent_transactions, "Get recent user transactions (requires user_id, optional: limit)"),
+    ("open_support_ticket", open_support_ticket, "Open a new support ticket (requires user_id, subject, description)"),
+)
+
+
+@functools.cache
+def _tools() -> List["Tool"]:
+    """Build the shared LangChain Tool objects on first use."""
+    from langchain.agents import Tool
+
+    return [Tool(name=name, func=func, description=description) for name, func, description in _TOOL_SPECS]
+
+
+class SupportAgent:
+    """Agent for handling customer support queries with access to user data."""
+    
+    def __init__(self):
+        self.system_prompt = _SYS_PROMPTS["pt"]
+
+    @property
+    def tools(self) -> List["Tool"]:
+        """LangChain tools for the agent (LangChain is imported on first access)."""
+        return _tools()
+    
+    def _create_tools(self) -> List["Tool"]:
+        """Create LangChain tools for the agent."""
+        return _tools()
+    
+    def _create_system_prompt(self, lang: str = "pt") -> str:
+        """Create system prompt for the support agent."""
+        return _SYS_PROMPTS.get(lang.split('-')[0], _SYS_PROMPTS["pt"])
     
     def process_query(self, query: str, user_id: Optional[str] = None, lang: str = "pt") -> Dict:
         """Process a support query and return response."""
-        logger.info(f"SupportAgent processing query: {query}")
-        query_lower = query.lower()
-        
-        # Get tool suggestions based on query
-        tool_suggestions = get_tool_suggestions(query)
-        logger.info(f"Tool suggestions for query '{query}': {tool_suggestions}")
+        logger.info("SupportAgent processing query: %s", query)
+        # Lowercased, accent-folded once and reused by every branch check
+        query_lower = _fold(query)
         
         # If the query requires user context but user_id is missing, ask for it explicitly
         if self._requires_user_id(query) and not user_id:
-            ask_map = {
-                "en": (
-                    "To check your account or transactions I need your user ID. "
-                    "Please provide your user_id so I can securely verify your information and help you faster."
-                ),
-                "pt": (
-                    "Para verificar sua conta ou transações, preciso do seu ID de usuário. "
-                    "Por favor, me informe seu user_id para que eu possa verificar com segurança e ajudar mais rápido."
-                ),
-            }
-            answer = ask_map.get(lang.split('-')[0], ask_map["pt"])
+            answer = ASK_USER_ID_MAP.get(lang.split('-')[0], ASK_USER_ID_MAP["pt"])
             return {
                 "answer": answer,
                 "agent_used": "support",
@@ -110,132 +353,32 @@ IMPORTANT GUIDELINES:
         
         # Handle different types of queries
         # Login / access issues: produce an explanation based on data, not raw dump
-        if any(word in query_lower for word in [
-            "login", "sign in", "signin", "access", "acessar", "entrar", "senha", "password", "2fa", "otp"
-        ]):
+        branch = self._match_branch(query_lower)
+        if branch == "login":
             if user_id:
                 try:
-                    store = UserStore()
-                    user = store.get_user_by_id(user_id)
-                    if not user:
-                        not_found_map = {
-                            "en": f"User {user_id} not found.",
-                            "pt": f"❌ Usuário {user_id} não encontrado.",
-                        }
-                        answer = not_found_map.get(lang.split('-')[0], not_found_map["pt"]) 
-                        return {
-                            "answer": answer,
-                            "agent_used": "support",
-                            "tool_used": None,
-                            "requires_user_id": False,
-                        }
-
-                    status = user.get("status", "unknown")
-                    created_at = user.get("created_at", "N/A")
-
-                    # Minimal, language-specific, relevant login actions
-                    if lang.startswith("en"):
-                        recs_active = [
-                            "Reset your password and try signing in again",
-                            "If you use 2FA, check SMS/app codes and try once more",
-                            "Update the app to the latest version and try a different connection (Wi‑Fi/4G)",
-                            "If it still fails, reply 'Open ticket' and I will escalate",
-                        ]
-                        recs_restricted = [
-                            "Complete any pending identity/registration verification",
-                            "Resolve compliance or security reviews shown in the app",
-                            "Reply 'Open ticket' and I will escalate this now",
-                        ]
-                    else:
-                        recs_active = [
-                            "Redefina sua senha e tente entrar novamente",
-                            "Se usar 2FA, verifique os códigos por SMS/app e tente de novo",
-                            "Atualize o app para a versão mais recente e teste outra conexão (Wi‑Fi/4G)",
-                            "Se continuar falhando, responda 'Abrir chamado' que eu escalo",
-                        ]
-                        recs_restricted = [
-                            "Conclua eventuais verificações de identidade/cadastro",
-                            "Resolva pendências de conformidade ou segurança exibidas no app",
-                            "Responda 'Abrir chamado' que eu escalo agora",
-                        ]
-
-                    recs = recs_restricted if status != "active" else recs_active
-
-                    facts = {
-                        "account_status": status,
-                        "account_created_at": created_at,
-                        "login_issue": True,
-                        "recommended_actions": recs,
-                    }
-
-                    # Summarize with LLM using verified facts
-                    summarized = self._summarize_support_facts_with_llm(query, facts, lang=lang)
-                    if summarized:
-                        account_block = self._build_account_block(user, lang)
-                        return {
-                            "answer": f"{summarized}\n\n{account_block}",
-                            "agent_used": "support",
-                            "tool_used": "diagnose_login",
-                            "requires_user_id": False,
-                        }
+                    user = get_user_store().get_user_by_id(user_id)
+                except OSError as e:
+                    logger.warning("Login diagnostics could not read the user store: %s", e)
+                    return self._handle_general_support_query(query, user_id, lang=lang)
+                if not user:
+                    return self._user_not_found_response(user_id, lang)
 
-                    # Fallback deterministic explanation
-                    if lang.startswith("en"):
-                        if status != "active":
-                            answer = (
-                                "Your account appears to be restricted (status: " + status + "). This can block sign‑in until you "
-                                "complete identity/registration checks or resolve compliance/security reviews in the app.\n\n"
-                                "Please try these steps:\n"
-                                "- Complete any pending verification in the app.\n"
-                                "- If you prefer, reply 'Open ticket' and I will escalate this now."
-                            )
-                        else:
-                            answer = (
-                                "Let’s get you back in. Please try:\n"
-                                "- Reset your password and sign in again.\n"
-                                "- If you use 2FA, check SMS/app codes.\n"
-                                "- Update the app and try a different connection (Wi‑Fi/4G).\n\n"
-                                "If it still fails, reply 'Open ticket' and I’ll escalate."
-                            )
-                    else:
-                        if status != "active":
-                            answer = (
-                                "Sua conta parece estar restrita (status: " + status + "). Isso pode bloquear o acesso até você "
-                                "concluir verificações de identidade/cadastro ou resolver pendências de conformidade/segurança no app.\n\n"
-                                "Tente o seguinte:\n"
-                                "- Concluir as verificações pendentes no app.\n"
-                                "- Se preferir, responda 'Abrir chamado' que eu escalo agora."
-                            )
-                        else:
-                            answer = (
-                                "Vamos recuperar seu acesso. Tente:\n"
-                                "- Redefinir sua senha e entrar novamente.\n"
-                                "- Se usar 2FA, verifique os códigos por SMS/app.\n"
-                                "- Atualize o app e teste outra conexão (Wi‑Fi/4G).\n\n"
-                                "Se ainda falhar, diga 'Abrir chamado' que eu escalo."
-                            )
+                facts = self._build_login_facts(user, lang)
 
-                    account_block = self._build_account_block(user, lang)
-                    return {
-                        "answer": f"{answer}\n\n{account_block}",
-                        "agent_used": "support",
-                        "tool_used": "diagnose_login",
-                        "requires_user_id": False,
-                    }
-                except Exception as e:
-                    logger.warning(f"Login diagnostics failed: {e}")
-                    return self._handle_general_support_query(query, user_id, lang=lang)
+                # Summarize with LLM using verified facts
+                summarized = self._summarize_support_facts_with_llm(query, facts, lang=lang)
+                account_block = self._build_account_block(user, lang)
+                return self._login_response(facts, summarized, account_block, lang)
 
         # Account/profile data (non-login): return summarized account info
-        elif any(word in query_lower for word in [
-            "saldo", "conta", "account", "balance", "perfil", "profile"
-        ]):
+        elif branch == "account":
             if user_id:
                 # Keep existing localized formatter for PT; English uses the account block
                 if lang.startswith("pt"):
                     account_info = get_account_details(user_id)
                 else:
-                    store = UserStore()
+                    store = get_user_store()
                     user = store.get_user_by_id(user_id)
                     account_info = self._build_account_block(user, lang) if user else f"User {user_id} not found."
                 return {
@@ -245,10 +388,7 @@ IMPORTANT GUIDELINES:
                     "requires_user_id": False
                 }
         
-        elif any(word in query.lower() for word in [
-            "transações", "extrato", "histórico", "movimentações",
-            "transactions", "statement", "history"
-        ]):
+        elif branch == "transactions":
             if user_id:
                 # Extract limit if mentioned
                 limit = self._extract_limit(query)
@@ -261,170 +401,27 @@ IMPORTANT GUIDELINES:
                 }
 
         # Transfer-related diagnostics (English and Portuguese)
-        elif any(word in query.lower() for word in [
-            "transfer", "transfers", "transferência", "transferências", "transferir", "pix"
-        ]):
+        elif branch == "transfer":
             if user_id:
                 try:
-                    store = UserStore()
+                    store = get_user_store()
                     user = store.get_user_by_id(user_id)
-                    if not user:
-                        not_found_map = {
-                            "en": f"User {user_id} not found.",
-                            "pt": f"❌ Usuário {user_id} não encontrado.",
-                        }
-                        answer = not_found_map.get(lang.split('-')[0], not_found_map["pt"])
-                        return {
-                            "answer": answer,
-                            "agent_used": "support",
-                            "tool_used": None,
-                            "requires_user_id": False,
-                        }
-
-                    status = user.get("status", "unknown")
-                    balance = user.get("balance", 0)
                     # Get recent transactions for signal (failures/pending)
-                    recent = store.get_user_transactions(user_id, limit=5)
-                    failed_count = sum(1 for t in recent if t.get("status") == "failed")
-                    pending_count = sum(1 for t in recent if t.get("status") == "pending")
-
-                    # Prepare facts for LLM summarization
-                    balance_str = f"R$ {balance:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    # Language-specific recommendations (simple and relevant)
-                    if lang.startswith("en"):
-                        recs_base = [
-                            "Check recipient details and the amount",
-                            "Verify the app has no pending updates",
-                            "Try again in a few minutes",
-                            "If it keeps failing, I can open a support ticket",
-                        ]
-                        recs_suspended = [
-                            "Complete any pending identity/registration verification",
-                            "Resolve compliance or security reviews shown in the app",
-                            "Reply here with 'Open ticket' and I will escalate",
-                        ]
-                        recs_failed = [
-                            "Double-check recipient info (PIX key/CPF/CNPJ, bank, amount)",
-                            "Try on a different connection (Wi‑Fi/4G) and update the app",
-                            "Try a smaller test amount to isolate the issue",
-                            "If still failing, say 'Open ticket' and I will escalate",
-                        ]
-                        recs_pending = [
-                            "Wait a few minutes — pending items may settle shortly",
-                            "Check notifications in the app for any required action",
-                            "If it doesn't clear, I can open a support ticket for you",
-                        ]
-                    else:
-                        recs_base = [
-                            "Conferir os dados do destinatário e o valor",
-                            "Verificar se há atualização pendente do app",
-                            "Tentar novamente em alguns minutos",
-                            "Se continuar falhando, posso abrir um chamado",
-                        ]
-                        recs_suspended = [
-                            "Concluir eventuais verificações de identidade/cadastro",
-                            "Resolver pendências de conformidade ou segurança no app",
-                            "Responda 'Abrir chamado' que eu escalo para o suporte",
-                        ]
-                        recs_failed = [
-                            "Conferir informações do destinatário (chave PIX/CPF/CNPJ, banco, valor)",
-                            "Tentar em outra conexão (Wi‑Fi/4G) e atualizar o app",
-                            "Tentar um valor menor para isolar o problema",
-                            "Se continuar, diga 'Abrir chamado' que eu escalo",
-                        ]
-                        recs_pending = [
-                            "Aguardar alguns minutos — itens pendentes podem compensar",
-                            "Verificar notificações no app para ações necessárias",
-                            "Se não resolver, posso abrir um chamado para você",
-                        ]
-
-                    if status != "active":
-                        recs = recs_suspended
-                    elif failed_count > 0:
-                        recs = recs_failed
-                    elif pending_count > 0:
-                        recs = recs_pending
-                    else:
-                        recs = recs_base
-
-                    facts = {
-                        "account_status": status,
-                        "available_balance": balance_str,
-                        "recent_pending_transactions": pending_count,
-                        "recent_failed_transactions": failed_count,
-                        "channel": "transfers/PIX",
-                        "recommended_actions": recs,
-                    }
-
-                    # Try to summarize with LLM using the verified facts
-                    summarized = self._summarize_support_facts_with_llm(query, facts, lang=lang)
-                    if summarized:
-                        account_block = self._build_account_block(user, lang)
-                        return {
-                            "answer": f"{summarized}\n\n{account_block}",
-                            "agent_used": "support",
-                            "tool_used": "diagnose_transfers",
-                            "requires_user_id": False,
-                        }
+                    recent = store.get_user_transactions(user_id, limit=5) if user else []
+                except OSError as e:
+                    logger.warning("Transfer diagnostics could not read the user store: %s", e)
+                    return self._handle_general_support_query(query, user_id, lang=lang)
+                if not user:
+                    return self._user_not_found_response(user_id, lang)
 
-                    # Language-specific templates (fallback if LLM unavailable)
-                    if lang.startswith("en"):
-                        if status != "active":
-                            answer = (
-                                "I checked your account and transfers are currently unavailable because your account "
-                                f"status is '{status}'. This usually blocks PIX and bank transfers.\n\n"
-                                "What you can do now:\n"
-                                "- Confirm your registration/identity (if requested in the app).\n"
-                                "- Resolve any pending compliance or security review.\n"
-                                "- If you need, I can open a support ticket right away to speed this up."
-                            )
-                        else:
-                            answer = (
-                                "Your account is active. Here is a quick check to understand transfers: \n"
-                                f"- Available balance: {balance_str}.\n"
-                                f"- Recent transactions: {pending_count} pending, {failed_count} failed.\n\n"
-                                "If you're seeing errors when transferring, please try: \n"
-                                "1) Confirm the recipient data and amount.\n"
-                                "2) Check if there are any app updates pending.\n"
-                                "3) Try again in a few minutes (temporary network issues).\n\n"
-                                "Want me to open a support ticket describing this transfer issue for you?"
-                            )
-                    else:
-                        if status != "active":
-                            answer = (
-                                "Verifiquei sua conta e as transferências estão indisponíveis porque o status da sua conta "
-                                f"é '{status}'. Isso normalmente bloqueia PIX e transferências bancárias.\n\n"
-                                "O que você pode fazer agora:\n"
-                                "- Confirmar seus dados/identidade (se o app solicitar).\n"
-                                "- Resolver pendências de conformidade ou revisão de segurança.\n"
-                                "- Se quiser, eu já abro um ticket de suporte para agilizar."
-                            )
-                        else:
-                            answer = (
-                                "Sua conta está ativa. Aqui vai um check rápido para entender as transferências: \n"
-                                f"- Saldo disponível: {balance_str}.\n"
-                                f"- Transações recentes: {pending_count} pendentes, {failed_count} com falha.\n\n"
-                                "Se você estiver vendo erro ao transferir, tente: \n"
-                                "1) Confirmar os dados do destinatário e o valor.\n"
-                                "2) Verificar se há atualização pendente do app.\n"
-                                "3) Tentar novamente em alguns minutos (instabilidade temporária).\n\n"
-                                "Quer que eu abra um ticket de suporte descrevendo esse problema de transferência para você?"
-                            )
+                facts = self._build_transfer_facts(user, recent, lang)
 
-                    # Append account data block in the appropriate language
-                    account_block = self._build_account_block(user, lang)
-                    return {
-                        "answer": f"{answer}\n\n{account_block}",
-                        "agent_used": "support",
-                        "tool_used": "diagnose_transfers",
-                        "requires_user_id": False,
-                    }
-                except Exception as e:
-                    logger.warning(f"Transfer diagnostics failed: {e}")
-                    # Fallback to general handler
-                    return self._handle_general_support_query(query, user_id, lang=lang)
+                # Try to summarize with LLM using the verified facts
+                summarized = self._summarize_support_facts_with_llm(query, facts, lang=lang)
+                account_block = self._build_account_block(user, lang)
+                return self._transfer_response(facts, summarized, account_block, lang)
         
-        elif any(word in query.lower() for word in ["suporte", "ajuda", "problema", "ticket", "assistência", "help", "problem"]):
+        elif branch == "ticket":
             # Try to extract subject and description from query
             subject, description = None, None
             use_llm = os.getenv("TICKET_LLM_TRIAGE", "0") == "1"
@@ -449,17 +446,25 @@ IMPORTANT GUIDELINES:
                 subject, description = self._extract_ticket_info(query)
             
             if user_id and subject and description:
-                # Create ticket via store and localize confirmation
-                store = UserStore()
-                ticket = store.create_support_ticket(user_id, subject, description)
-                if ticket:
+                # Create ticket via store and localize confirmation; a retry of the
+                # same request within the TTL reuses the earlier ticket
+                key = _ticket_idempotency_key(user_id, subject, description)
+                with _IDEMPOTENCY_LOCK:
+                    cached = IDEMPOTENCY.get(key)
+                if cached:
+                    ticket, remote_info = cached
+                    logger.info("Duplicate ticket request: reusing local_id=%s user_id=%s", ticket.get("id"), user_id)
+                else:
+                    store = get_user_store()
+                    ticket = store.create_support_ticket(user_id, subject, description)
+                    remote_info = None
+                if ticket and not cached:
                     # Log local ticket creation details
                     logger.info(
                         "Ticket created: local_id=%s user_id=%s subject='%s'",
                         ticket.get("id"), user_id, (ticket.get("subject", "")[:80])
                     )
                     # Optionally post to external sink (webhook)
-                    remote_info = None
                     try:
                         payload = {
                             "user_id": user_id,
@@ -468,9 +473,11 @@ IMPORTANT GUIDELINES:
                             "triage": triaged or {},
                             "local_ticket_id": ticket["id"],
                         }
-                        remote_info = post_ticket(payload)
+                        # Prefer the background worker; post inline only when it is not running
+                        if not enqueue_ticket(payload):
+                            remote_info = post_ticket(payload)
                     except Exception as e:
-                        logger.warning(f"Ticket sink post failed: {e}")
+                        logger.warning("Ticket sink post failed: %s", e)
                     else:
                         if remote_info:
                             logger.info(
@@ -479,7 +486,10 @@ IMPORTANT GUIDELINES:
                                 remote_info.get("remote_id"),
                                 remote_info.get("status"),
                             )
+                    with _IDEMPOTENCY_LOCK:
+                        IDEMPOTENCY[key] = (ticket, remote_info)
 
+                if ticket:
                     if lang.startswith("en"):
                         extra = (
                             f"\nExternal Ref: {remote_info.get('remote_id')}" if remote_info and remote_info.get("remote_id") else ""
@@ -509,11 +519,7 @@ IMPORTANT GUIDELINES:
                         "requires_user_id": False
                     }
             else:
-                answer_map = {
-                    "en": "I can help you create a support ticket! 🎫\n\nTo log your issue, I need:\n1. A brief subject (e.g., 'Problem with card machine')\n2. A detailed description of the problem\n\nPlease tell me what issue you are facing.",
-                    "pt": "Posso ajudar você a criar um ticket de suporte! 🎫\n\nPara registrar seu problema, preciso de:\n1. Um breve assunto (ex: 'Problema com maquininha')\n2. Descrição detalhada do problema\n\nPor favor, me diga qual é o problema que você está enfrentando."
-                }
-                answer = answer_map.get(lang.split('-')[0], answer_map["pt"])
+                answer = TICKET_HELP_MAP.get(lang.split('-')[0], TICKET_HELP_MAP["pt"])
                 return {
                     "answer": answer,
                     "agent_used": "support",
@@ -524,16 +530,246 @@ IMPORTANT GUIDELINES:
         # Default response for unclear queries - enhanced with LLM
         return self._handle_general_support_query(query, user_id, lang=lang)
     
+    async def aprocess_query(self, query: str, user_id: Optional[str] = None, lang: str = "pt") -> Dict:
+        """Async variant of process_query.
+
+        Login/transfer diagnostics and the general fallback await the LLM via
+        `ainvoke`; the remaining branches (plain data lookups and ticket
+        creation) run process_query in a worker thread.
+        """
+        branch = self._match_branch(_fold(query))
+        if user_id and branch in ("login", "transfer"):
+            return await self._adiagnose(query, branch, user_id, lang)
+        if self._is_general_query(branch, query, user_id):
+            logger.info("SupportAgent processing query: %s", query)
+            return await self._ahandle_general_support_query(query, user_id, lang=lang)
+        return await asyncio.to_thread(self.process_query, query, user_id, lang)
+
+    def can_stream(self, query: str, user_id: Optional[str] = None) -> bool:
+        """Whether `astream_general_support_query` can answer this query."""
+        return self._is_general_query(self._match_branch(_fold(query)), query, user_id)
+
+    def _is_general_query(self, branch: Optional[str], query: str, user_id: Optional[str]) -> bool:
+        """True when process_query would fall through to the general LLM answer."""
+        return branch is None and bool(user_id or not self._requires_user_id(query))
+
+    async def _adiagnose(self, query: str, branch: str, user_id: str, lang: str) -> Dict:
+        """Login/transfer diagnostics with concurrent store reads and an awaited LLM summary."""
+        logger.info("SupportAgent processing query: %s", query)
+        try:
+            store = get_user_store()
+            if branch == "transfer":
+                user, recent = await asyncio.gather(
+                    store.aget_user_by_id(user_id),
+                    store.aget_user_transactions(user_id, limit=5),
+                )
+            else:
+                user = await store.aget_user_by_id(user_id)
+        except OSError as e:
+            logger.warning("Support diagnostics could not read the user store: %s", e)
+            return await self._ahandle_general_support_query(query, user_id, lang=lang)
+        if not user:
+            return self._user_not_found_response(user_id, lang)
+
+        if branch == "transfer":
+            facts = self._build_transfer_facts(user, recent, lang)
+        else:
+            facts = self._build_login_facts(user, lang)
+        # Plain string formatting: cheaper inline than a thread-pool hop
+        account_block = self._build_account_block(user, lang)
+        summarized = await self._asummarize_support_facts_with_llm(query, facts, lang)
+        if branch == "transfer":
+            return self._transfer_response(facts, summarized, account_block, lang)
+        return self._login_response(facts, summarized, account_block, lang)
+
+    def _match_branch(self, query_lower: str) -> Optional[str]:
+        """Return the first support branch whose pattern matches the folded query."""
+        for branch, pattern in BRANCH_PATTERNS:
+            if pattern.search(query_lower):
+                return branch
+        return None
+
+    def _user_not_found_response(self, user_id: str, lang: str) -> Dict:
+        """Build the localized response for an unknown user_id."""
+        answer = NOT_FOUND_MAP.get(lang.split('-')[0], NOT_FOUND_MAP["pt"]).format(user_id=user_id)
+        return {
+            "answer": answer,
+            "agent_used": "support",
+            "tool_used": None,
+            "requires_user_id": False,
+        }
+
+    def _build_login_facts(self, user: Dict, lang: str) -> Dict:
+        """Collect verified facts about the user's ability to sign in."""
+        status = _user_status(user)
+        # Minimal, language-specific, relevant login actions
+        scenario = "login_restricted" if status != "active" else "login_active"
+        return {
+            "account_status": status,
+            "account_created_at": user.get("created_at", "N/A"),
+            "login_issue": True,
+            "recommended_actions": RECS[(_rec_lang(lang), scenario)],
+        }
+
+    def _login_response(self, facts: Dict, summarized: Optional[str], account_block: str, lang: str) -> Dict:
+        """Combine the login explanation (LLM or deterministic fallback) with the account block."""
+        answer = summarized or self._login_fallback_answer(facts["account_status"], lang)
+        return {
+            "answer": f"{answer}\n\n{account_block}",
+            "agent_used": "support",
+            "tool_used": "diagnose_login",
+            "requires_user_id": False,
+        }
+
+    def _build_transfer_facts(self, user: Dict, recent: List[Dict], lang: str) -> Dict:
+        """Collect verified facts about the user's ability to transfer."""
+        status = _user_status(user)
+        balance = user.get("balance")
+        if isinstance(balance, bool) or not isinstance(balance, (int, float)):
+            balance = 0
+        statuses = [t.get("status") for t in recent if isinstance(t, dict)]
+        failed_count = statuses.count("failed")
+        pending_count = statuses.count("pending")
+
+        balance_str = format_brl(balance)
+        # Language-specific recommendations (simple and relevant)
+        if status != "active":
+            scenario = "transfer_suspended"
+        elif failed_count > 0:
+            scenario = "transfer_failed"
+        elif pending_count > 0:
+            scenario = "transfer_pending"
+        else:
+            scenario = "transfer_base"
+
+        return {
+            "account_status": status,
+            "available_balance": balance_str,
+            "recent_pending_transactions": pending_count,
+            "recent_failed_transactions": failed_count,
+            "channel": "transfers/PIX",
+            "recommended_actions": RECS[(_rec_lang(lang), scenario)],
+        }
+
+    def _transfer_response(self, facts: Dict, summarized: Optional[str], account_block: str, lang: str) -> Dict:
+        """Combine the transfer explanation with the account block."""
+        answer = summarized or self._transfer_fallback_answer(facts, lang)
+        return {
+            "answer": f"{answer}\n\n{account_block}",
+            "agent_used": "support",
+            "tool_used": "diagnose_transfers",
+            "requires_user_id": False,
+        }
+
+    def _login_fallback_answer(self, status: str, lang: str) -> str:
+        """Deterministic login explanation used when the LLM is unavailable."""
+        if lang.startswith("en"):
+            if status != "active":
+                answer = (
+                    "Your account appears to be restricted (status: " + status + "). This can block sign‑in until you "
+                    "complete identity/registration checks or resolve compliance/security reviews in the app.\n\n"
+                    "Please try these steps:\n"
+                    "- Complete any pending verification in the app.\n"
+                    "- If you prefer, reply 'Open ticket' and I will escalate this now."
+                )
+            else:
+                answer = (
+                    "Let’s get you back in. Please try:\n"
+                    "- Reset your password and sign in again.\n"
+                    "- If you use 2FA, check SMS/app codes.\n"
+                    "- Update the app and try a different connection (Wi‑Fi/4G).\n\n"
+                    "If it still fails, reply 'Open ticket' and I’ll escalate."
+                )
+        else:
+            if status != "active":
+                answer = (
+                    "Sua conta parece estar restrita (status: " + status + "). Isso pode bloquear o acesso até você "
+                    "concluir verificações de identidade/cadastro ou resolver pendências de conformidade/segurança no app.\n\n"
+                    "Tente o seguinte:\n"
+                    "- Concluir as verificações pendentes no app.\n"
+                    "- Se preferir, responda 'Abrir chamado' que eu escalo agora."
+                )
+            else:
+                answer = (
+                    "Vamos recuperar seu acesso. Tente:\n"
+                    "- Redefinir sua senha e entrar novamente.\n"
+                    "- Se usar 2FA, verifique os códigos por SMS/app.\n"
+                    "- Atualize o app e teste outra conexão (Wi‑Fi/4G).\n\n"
+                    "Se ainda falhar, diga 'Abrir chamado' que eu escalo."
+                )
+        return answer
+
+    def _transfer_fallback_answer(self, facts: Dict, lang: str) -> str:
+        """Language-specific transfer templates used when the LLM is unavailable."""
+        status = facts["account_status"]
+        balance_str = facts["available_balance"]
+        pending_count = facts["recent_pending_transactions"]
+        failed_count = facts["recent_failed_transactions"]
+        if lang.startswith("en"):
+            if status != "active":
+                answer = (
+                    "I checked your account and transfers are currently unavailable because your account "
+                    f"status is '{status}'. This usually blocks PIX and bank transfers.\n\n"
+                    "What you can do now:\n"
+                    "- Confirm your registration/identity (if requested in the app).\n"
+                    "- Resolve any pending compliance or security review.\n"
+                    "- If you need, I can open a support ticket right away to speed this up."
+                )
+            else:
+                answer = (
+                    "Your account is active. Here is a quick check to understand transfers: \n"
+                    f"- Available balance: {balance_str}.\n"
+                    f"- Recent transactions: {pending_count} pending, {failed_count} failed.\n\n"
+                    "If you're seeing errors when transferring, please try: \n"
+                    "1) Confirm the recipient data and amount.\n"
+                    "2) Check if there are any app updates pending.\n"
+                    "3) Try again in a few minutes (temporary network issues).\n\n"
+                    "Want me to open a support ticket describing this transfer issue for you?"
+                )
+        else:
+            if status != "active":
+                answer = (
+                    "Verifiquei sua conta e as transferências estão indisponíveis porque o status da sua conta "
+                    f"é '{status}'. Isso normalmente bloqueia PIX e transferências bancárias.\n\n"
+                    "O que você pode fazer agora:\n"
+                    "- Confirmar seus dados/identidade (se o app solicitar).\n"
+                    "- Resolver pendências de conformidade ou revisão de segurança.\n"
+                    "- Se quiser, eu já abro um ticket de suporte para agilizar."
+                )
+            else:
+                answer = (
+                    "Sua conta está ativa. Aqui vai um check rápido para entender as transferências: \n"
+                    f"- Saldo disponível: {balance_str}.\n"
+                    f"- Transações recentes: {pending_count} pendentes, {failed_count} com falha.\n\n"
+                    "Se você estiver vendo erro ao transferir, tente: \n"
+                    "1) Confirmar os dados do destinatário e o valor.\n"
+                    "2) Verificar se há atualização pendente do app.\n"
+                    "3) Tentar novamente em alguns minutos (instabilidade temporária).\n\n"
+                    "Quer que eu abra um ticket de suporte descrevendo esse problema de transferência para você?"
+                )
+        return answer
+
     def _get_llm(self):
         """Get LLM instance based on configuration."""
         from rag.config import create_llm
         return create_llm()
 
+    async def _allm_invoke(self, messages: List["BaseMessage"]):
+        """Await a completion, micro-batched with concurrent requests when LLM_BATCH=1."""
+        from rag.config import get_llm_batcher
+
+        batcher = get_llm_batcher()
+        if batcher is not None:
+            return await batcher.ainvoke(messages)
+        return await self._get_llm().ainvoke(messages)
+
     def _triage_ticket_with_llm(self, query: str, user_id: Optional[str], lang: str = "pt") -> Optional[Dict]:
         """Use the LLM to extract a structured ticket from free-form text.
         Returns a dict with at least 'subject' and 'description' on success; None on failure.
         """
         try:
+            from langchain.schema import HumanMessage, SystemMessage
+
             llm = self._get_llm()
 
             language_map = {"en": "English", "pt": "Portuguese"}
@@ -562,8 +798,15 @@ IMPORTANT GUIDELINES:
             response = llm.invoke(messages)
             content = (response.content or "").strip()
 
-            # Must be valid JSON only
-            data = json.loads(content)
+            # Must be valid JSON; tolerate a BOM or prose around the object
+            content = content.lstrip("\ufeff")
+            try:
+                data = _json_loads(content)
+            except ValueError:
+                match = JSON_BLOCK_RE.search(content)
+                if not match:
+                    raise
+                data = _json_loads(match.group(0))
             if not isinstance(data, dict):
                 return None
             subject = (data.get("subject") or "").strip()
@@ -571,23 +814,29 @@ IMPORTANT GUIDELINES:
             if not subject or not description:
                 return None
             # Normalize optional fields
-            data.setdefault("category", "support")
-            data.setdefault("severity", "P3")
-            data.setdefault("product", "")
-            data.setdefault("device_model", "")
-            data.setdefault("error_code", "")
-            data.setdefault("repro_steps", "")
-            data.setdefault("environment", "")
-            data.setdefault("timeframe", "")
-            data.setdefault("attachments", [])
-            data.setdefault("language_detected", lang)
+            data = {**_TRIAGE_DEFAULTS, "attachments": [], "language_detected": lang, **data}
             return data
         except Exception as e:
-            logger.warning(f"LLM ticket triage failed: {e}")
+            logger.warning("LLM ticket triage failed: %s", e)
             return None
     
     def _handle_general_support_query(self, query: str, user_id: Optional[str], lang: str = "pt") -> Dict:
         """Handle general support queries with intelligent responses."""
+        # Only the fallback path needs suggestions; the fast branches skip them
+        tool_suggestions = get_tool_suggestions(query)
+        logger.info("Tool suggestions for query '%s': %s", query, tool_suggestions)
+
+        cache = get_semantic_cache()
+        key = self._general_cache_key(query, lang)
+        cached = cache.lookup(query, key, _GENERAL_CACHE_THRESHOLD) if cache else None
+        if cached:
+            return {
+                "answer": cached,
+                "agent_used": "support",
+                "tool_used": None,
+                "requires_user_id": False
+            }
+
         try:
             # Use LLM to provide a more intelligent response for support queries
             from langchain.schema import HumanMessage, SystemMessage
@@ -603,6 +852,8 @@ IMPORTANT GUIDELINES:
             
             response = llm.invoke(messages)
             answer = response.content.strip()
+            if answer and cache:
+                cache.add(query, key, answer)
             
             return {
                 "answer": answer,
@@ -612,13 +863,9 @@ IMPORTANT GUIDELINES:
             }
             
         except Exception as e:
-            logger.warning(f"LLM general support failed: {e}")
+            logger.warning("LLM general support failed: %s", e)
             # Fallback to generic response
-            answer_map = {
-                "en": "I understand you're facing difficulties. I can help you with:\n\n💰 **Account data** - balance, registration information\n📊 **Transactions** - history of payments and withdrawals\n🎫 **Support** - create tickets for issues\n\nHow can I best help you today? If you need specific account information, please provide your user ID.",
-                "pt": "Entendo que você está enfrentando dificuldades. Posso ajudar você com:\n\n💰 **Dados da conta** - saldo, informações cadastrais\n📊 **Transações** - histórico de pagamentos e saques\n🎫 **Suporte** - criar tickets para problemas\n\nQual seria a melhor forma de ajudar você hoje? Se precisar de informações específicas da conta, me diga seu ID de usuário."
-            }
-            answer = answer_map.get(lang.split('-')[0], answer_map["pt"])
+            answer = GENERAL_FALLBACK_MAP.get(lang.split('-')[0], GENERAL_FALLBACK_MAP["pt"])
             return {
                 "answer": answer,
                 "agent_used": "support",
@@ -626,24 +873,92 @@ IMPORTANT GUIDELINES:
                 "requires_user_id": False
             }
     
+    async def _ahandle_general_support_query(self, query: str, user_id: Optional[str], lang: str = "pt") -> Dict:
+        """Async variant of `_handle_general_support_query` using `llm.ainvoke`."""
+        tool_suggestions = get_tool_suggestions(query)
+        logger.info("Tool suggestions for query '%s': %s", query, tool_suggestions)
+
+        cache = get_semantic_cache()
+        key = self._general_cache_key(query, lang)
+        cached = await asyncio.to_thread(cache.lookup, query, key, _GENERAL_CACHE_THRESHOLD) if cache else None
+        if cached:
+            return {
+                "answer": cached,
+                "agent_used": "support",
+                "tool_used": None,
+                "requires_user_id": False
+            }
+
+        try:
+            from langchain.schema import HumanMessage
+
+            messages = [self.get_system_message(), HumanMessage(content=f"User query: {query}")]
+
+            response = await self._allm_invoke(messages)
+            answer = response.content.strip()
+            if answer and cache:
+                await asyncio.to_thread(cache.add, query, key, answer)
+        except Exception as e:
+            logger.warning("LLM general support failed: %s", e)
+            answer = GENERAL_FALLBACK_MAP.get(lang.split('-')[0], GENERAL_FALLBACK_MAP["pt"])
+
+        return {
+            "answer": answer,
+            "agent_used": "support",
+            "tool_used": None,
+            "requires_user_id": False
+        }
+    
+    async def astream_general_support_query(self, query: str, user_id: Optional[str] = None, lang: str = "pt") -> AsyncIterator[str]:
+        """Streaming variant of `_ahandle_general_support_query`.
+
+        Yields text chunks from `llm.astream` as they arrive. A cached answer,
+        or the generic fallback when the LLM fails before its first chunk, is
+        yielded as a single chunk.
+        """
+        cache = get_semantic_cache()
+        key = self._general_cache_key(query, lang)
+        cached = await asyncio.to_thread(cache.lookup, query, key, _GENERAL_CACHE_THRESHOLD) if cache else None
+        if cached:
+            yield cached
+            return
+
+        parts: List[str] = []
+        try:
+            from langchain.schema import HumanMessage
+
+            llm = self._get_llm()
+            messages = [self.get_system_message(), HumanMessage(content=f"User query: {query}")]
+            async for chunk in llm.astream(messages):
+                # Chat models yield message chunks, plain LLMs yield strings
+                text = getattr(chunk, "content", chunk) or ""
+                if not text:
+                    continue
+                parts.append(text)
+                yield text
+        except Exception as e:
+            logger.warning("LLM general support stream failed: %s", e)
+            if not parts:
+                yield GENERAL_FALLBACK_MAP.get(lang.split('-')[0], GENERAL_FALLBACK_MAP["pt"])
+            return
+
+        answer = "".join(parts).strip()
+        if not answer:
+            yield GENERAL_FALLBACK_MAP.get(lang.split('-')[0], GENERAL_FALLBACK_MAP["pt"])
+        elif cache:
+            await asyncio.to_thread(cache.add, query, key, answer)
+
     def _requires_user_id(self, query: str) -> bool:
         """Check if query requires user ID."""
-        support_keywords = [
-            # Portuguese
-            "saldo", "conta", "transações", "extrato", "histórico", "movimentações", "transferência", "transferências",
-            # English
-            "account", "balance", "transactions", "statement", "transfer", "transfers", "login", "sign in"
-        ]
-        return any(keyword in query.lower() for keyword in support_keywords)
+        query_lower = query.lower()
+        return _SUPPORT_KEYWORDS.first(query_lower) is not None
     
     def _extract_limit(self, query: str) -> int:
         """Extract limit number from query."""
-        import re
-        
-        # Look for numbers in the query
-        numbers = re.findall(r'\d+', query)
-        if numbers:
-            limit = int(numbers[0])
+        # Look for the first number in the query
+        match = _DIGITS_RE.search(query)
+        if match:
+            limit = int(match.group())
             # Ensure reasonable limit
             return min(max(limit, 1), 50)
         
@@ -652,22 +967,23 @@ IMPORTANT GUIDELINES:
     def _extract_ticket_info(self, query: str) -> tuple:
         """Extract subject and description for ticket."""
         # Simple extraction - in production, use NLP
-        if len(query.split()) > 5:
+        # maxsplit stops after the 6th word instead of splitting the whole query
+        if len(query.split(None, 5)) > 5:
             # Use first sentence as subject, rest as description
-            sentences = query.split('.')
-            subject = sentences[0][:100]  # Limit subject length
-            description = query[:1000]  # Limit description length
+            end = query.find('.')
+            subject = query[:end if 0 <= end < 100 else 100]  # Limit subject length
+            description = query[:1000]  # Limit description length (no copy when shorter)
             return subject, description
         
         return None, None
     
-    def get_tools(self) -> List[Tool]:
+    def get_tools(self) -> List["Tool"]:
         """Get available tools."""
         return self.tools
     
-    def get_system_message(self, lang: str = "pt") -> SystemMessage:
+    def get_system_message(self, lang: str = "pt") -> "SystemMessage":
         """Get system message for LLM integration."""
-        return SystemMessage(content=self._create_system_prompt(lang=lang))
+        return _system_message_for(lang)
 
     def _build_account_block(self, user: Dict, lang: str) -> str:
         """Build a localized account details block without raw dumps."""
@@ -678,13 +994,9 @@ IMPORTANT GUIDELINES:
                 return get_account_details(user.get("id", ""))
             # English rendering
             balance = user.get("balance", 0)
-            balance_str = f"R$ {balance:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+            balance_str = format_brl(balance)
             status = user.get("status", "unknown")
-            status_emoji = {
-                "active": "✅",
-                "suspended": "⚠️",
-                "inactive": "❌",
-            }.get(status, "❓")
+            status_emoji = STATUS_EMOJI.get(status, UNKNOWN_EMOJI)
             account_type = user.get("account_type", "unknown").title()
             block = (
                 "📋 Account Details\n\n"
@@ -700,45 +1012,96 @@ IMPORTANT GUIDELINES:
         except Exception:
             return ""
 
+    def _facts_cache_key(self, facts: Dict, lang: str) -> str:
+        """Semantic cache key: paraphrases only share an answer when the facts match."""
+        return make_cache_key("facts", _facts_json(facts, sort_keys=True), lang.split('-')[0])
+
+    def _general_cache_key(self, query: str, lang: str) -> str:
+        """Semantic cache key for general support answers: detected topic + language.
+
+        There are no verified facts to pin the answer down, so lookups also
+        use the strict distance threshold (_GENERAL_CACHE_THRESHOLD).
+        """
+        topic = ",".join(get_tool_suggestions(query))
+        return make_cache_key("general", topic, lang.split('-')[0])
+
+    def _template_answer(self, facts: Dict, lang: str = "pt") -> Optional[str]:
+        """Deterministic answer for facts that leave nothing to paraphrase.
+
+        A non-active account explains both login and transfer failures on its
+        own (status is the only relevant fact), so the fixed template is used
+        and the LLM round-trip is skipped. Returns None when the facts need
+        the LLM to tailor the answer to the query.
+        """
+        if facts.get("account_status") == "active":
+            return None
+        if facts.get("login_issue"):
+            return self._login_fallback_answer(facts["account_status"], lang)
+        if "recent_failed_transactions" in facts:
+            return self._transfer_fallback_answer(facts, lang)
+        return None
+
+    def _build_summary_messages(self, query: str, facts: Dict, lang: str = "pt") -> List["BaseMessage"]:
+        """Build the system/human messages used to paraphrase verified support facts."""
+        from langchain.schema import HumanMessage
+
+        human_prompt = (
+            "USER QUERY:\n" + query + "\n\n" +
+            "FACTS (do not alter):\n" + _facts_json(facts)
+        )
+
+        return [
+            _summary_system_message_for(lang),
+            HumanMessage(content=human_prompt),
+        ]
+
     def _summarize_support_facts_with_llm(self, query: str, facts: Dict, lang: str = "pt") -> Optional[str]:
         """Use the LLM to paraphrase verified support facts without altering them.
         Returns None if LLM is unavailable or fails.
         """
+        template = self._template_answer(facts, lang)
+        if template:
+            return template
+        cache = get_semantic_cache()
+        key = self._facts_cache_key(facts, lang)
+        if cache:
+            cached = cache.lookup(query, key)
+            if cached:
+                return cached
         try:
             llm = self._get_llm()
-            import json
-
-            language_map = {
-                "en": "English",
-                "pt": "Portuguese",
-            }
-            output_language = language_map.get(lang.split('-')[0], "Portuguese")
-
-            system_prompt = (
-                f"You are a customer support assistant for InfinitePay. You will receive a user query and a set of VERIFIED FACTS "
-                f"about the user's account or transactions. Your job is to write a clear, friendly, and helpful response in {output_language} that:\n"
-                "- Uses ONLY the provided facts.\n"
-                "- DOES NOT invent numbers, statuses, or actions.\n"
-                "- Does not reveal raw JSON; summarize succinctly.\n"
-                "- Offers practical next steps and the option to open a support ticket.\n"
-                "- Keeps the response concise and readable, using bullet points where helpful.\n"
-            )
-
-            human_prompt = (
-                "USER QUERY:\n" + query + "\n\n" +
-                "FACTS (do not alter):\n" + json.dumps(facts, ensure_ascii=False, indent=2)
-            )
-
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=human_prompt),
-            ]
+            messages = self._build_summary_messages(query, facts, lang)
 
             response = llm.invoke(messages)
             text = (response.content or "").strip()
             if not text:
                 return None
+            if cache:
+                cache.add(query, key, text)
             return text
         except Exception as e:
-            logger.warning(f"LLM fact summarization failed: {e}")
+            logger.warning("LLM fact summarization failed: %s", e)
+            return None
+
+    async def _asummarize_support_facts_with_llm(self, query: str, facts: Dict, lang: str = "pt") -> Optional[str]:
+        """Async variant of `_summarize_support_facts_with_llm` using `llm.ainvoke`."""
+        template = self._template_answer(facts, lang)
+        if template:
+            return template
+        cache = get_semantic_cache()
+        key = self._facts_cache_key(facts, lang)
+        if cache:
+            cached = await asyncio.to_thread(cache.lookup, query, key)
+            if cached:
+                return cached
+        try:
+            messages = self._build_summary_messages(query, facts, lang)
+
+            response = await self._allm_invoke(messages)
+            text = (response.content or "").strip()
+            if text and cache:
+                await asyncio.to_thread(cache.add, query, key, text)
+            return text or None
+        except Exception as e:
+            logger.warning("LLM fact summarization failed: %s", e)
             return None
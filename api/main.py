@@ -1,17 +1,35 @@
 """FastAPI application for Agent Swarm system."""
 
+import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict
+from typing import TYPE_CHECKING, AsyncIterator, Dict
 
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+
+    def _sse_event(data: Dict) -> str:
+        return f"data: {orjson.dumps(data).decode()}\n\n"
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    def _sse_event(data: Dict) -> str:
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 from agents.personality import PersonalityLayer
-from agents.router_agent import RouterAgent
 from api.schemas import ErrorResponse, HealthResponse, QueryRequest, QueryResponse
+from tools.ticket_sink import start_ticket_worker, stop_ticket_worker
+
+if TYPE_CHECKING:
+    # The agents pull in LangChain, Chroma and sentence-transformers; they are
+    # imported when the first worker-local instance is built
+    from agents.router_agent import RouterAgent
 
 # Configure logging
 logging.basicConfig(
@@ -20,13 +38,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the agents and start background workers on startup; flush them and close shared pools on shutdown."""
+    router_agent = get_router_agent()
+    logger.info("Knowledge agent available: %s", router_agent.knowledge_agent.is_available())
+    logger.info("Personality layer enabled: %s", get_personality_layer().is_enabled())
+    start_ticket_worker()
+    yield
+    await stop_ticket_worker()
+
+    from rag.config import close_shared_http_clients
+    from tools.web_search import close_client as close_web_search_client
+
+    await close_shared_http_clients()
+    await close_web_search_client()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="InfinitePay Agent Swarm API",
     description="Multi-agent system for customer support and knowledge retrieval",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -38,9 +75,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize agents
-router_agent = RouterAgent()
-personality_layer = PersonalityLayer()
+# Compress larger JSON bodies (multi-KB answers); SSE streams are left as-is
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+def get_router_agent() -> "RouterAgent":
+    """This worker's RouterAgent, built on first use (normally during startup)."""
+    router_agent = getattr(app.state, "router_agent", None)
+    if router_agent is None:
+        from agents.router_agent import RouterAgent
+
+        router_agent = app.state.router_agent = RouterAgent()
+    return router_agent
+
+
+def get_personality_layer() -> PersonalityLayer:
+    """This worker's PersonalityLayer, built on first use."""
+    personality_layer = getattr(app.state, "personality_layer", None)
+    if personality_layer is None:
+        personality_layer = app.state.personality_layer = PersonalityLayer()
+    return personality_layer
 
 
 @app.exception_handler(HTTPException)
@@ -59,7 +112,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions."""
-    logger.error(f"Unexpected error: {exc}", exc_info=True)
+    logger.error("Unexpected error: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={
@@ -81,12 +134,46 @@ async def root():
     }
 
 
+# Probes hit these endpoints every few seconds; recompute at most every 5s
+_HEALTH_CACHE: TTLCache = TTLCache(maxsize=1, ttl=5)
+
+
+def _cached_health() -> HealthResponse:
+    """Return the current HealthResponse, recomputed once the cached one expires."""
+    health = _HEALTH_CACHE.get("health")
+    if health is None:
+        health = _HEALTH_CACHE["health"] = _compute_health()
+    return health
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
+    return _cached_health()
+
+
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", response_model=HealthResponse)
+async def readiness():
+    """Readiness probe: 503 while the service is unhealthy (degraded still serves)."""
+    health = _cached_health()
+    if health.status == "unhealthy":
+        return JSONResponse(status_code=503, content=health.model_dump())
+    return health
+
+
+def _compute_health() -> HealthResponse:
+    """Check the agents and build the health report."""
     timestamp = datetime.now().isoformat()
     
     # Check agent statuses
+    router_agent = get_router_agent()
+    personality_layer = get_personality_layer()
     agents_status = {
         "router": "healthy",
         "knowledge": "healthy" if router_agent.knowledge_agent.is_available() else "unavailable",
@@ -113,13 +200,14 @@ async def health_check():
 async def process_query(request: QueryRequest):
     """Main query endpoint."""
     try:
-        logger.info(f"Received query: {request.message[:100]}...")
+        logger.info("Received query: %s...", request.message[:100])
         
         # Route query to appropriate agent
-        result = router_agent.route_query(request.message, request.user_id)
+        result = await get_router_agent().aroute_query(request.message, request.user_id)
         result["lang"] = result.get("lang", "pt")
         
         # Apply personality layer if enabled
+        personality_layer = get_personality_layer()
         if personality_layer.is_enabled():
             lang = result.get("lang", "pt")
             result["answer"] = personality_layer.adjust_response(
@@ -139,26 +227,54 @@ async def process_query(request: QueryRequest):
             requires_user_id=result.get("requires_user_id", False)
         )
         
-        logger.info(f"Query processed by {result['agent_used']} with confidence {result.get('confidence', 0.0)}")
+        logger.info("Query processed by %s with confidence %s", result['agent_used'], result.get('confidence', 0.0))
         
         return response
         
     except Exception as e:
-        logger.error(f"Error processing query: {e}", exc_info=True)
+        logger.error("Error processing query: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Failed to process query. Please try again later."
         )
 
 
+@app.post("/query/stream")
+async def process_query_stream(request: QueryRequest):
+    """Streaming query endpoint (Server-Sent Events).
+
+    Emits ``{"delta": ...}`` events as the answer is generated, then a final
+    event with ``"done": true`` and the routing metadata. The personality
+    layer needs the full answer, so it only applies to the buffered /query.
+    """
+    logger.info("Received streaming query: %s...", request.message[:100])
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event in get_router_agent().astream_query(request.message, request.user_id):
+                if "delta" in event:
+                    yield _sse_event({"delta": event["delta"]})
+                else:
+                    yield _sse_event({"done": True, **event})
+        except Exception as e:
+            logger.error("Error streaming query: %s", e, exc_info=True)
+            yield _sse_event({"error": "Failed to process query. Please try again later."})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/capabilities")
 async def get_capabilities():
     """Get capabilities of available agents."""
     return {
-        "agents": router_agent.get_agent_capabilities(),
+        "agents": get_router_agent().get_agent_capabilities(),
         "features": {
             "multi_intent": True,
-            "personality_layer": personality_layer.is_enabled(),
+            "personality_layer": get_personality_layer().is_enabled(),
             "human_escalation": True,
             "source_citations": True
         },
@@ -172,14 +288,19 @@ if __name__ == "__main__":
     
     port = int(os.getenv("PORT", 8000))
     
-    logger.info(f"Starting InfinitePay Agent Swarm API on port {port}")
-    logger.info(f"Knowledge agent available: {router_agent.knowledge_agent.is_available()}")
-    logger.info(f"Personality layer enabled: {personality_layer.is_enabled()}")
+    logger.info("Starting InfinitePay Agent Swarm API on port %s", port)
     
-    uvicorn.run(
-        "api.main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True,
-        log_level=os.getenv("LOG_LEVEL", "info").lower()
-    )
\ No newline at end of file
+    log_level = os.getenv("LOG_LEVEL", "info").lower()
+    if os.getenv("ENVIRONMENT", "development") == "development":
+        # Auto-reload runs a single process; only meant for local development
+        uvicorn.run("api.main:app", host="0.0.0.0", port=port, reload=True, log_level=log_level)
+    else:
+        uvicorn.run(
+            "api.main:app",
+            host="0.0.0.0",
+            port=port,
+            workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+            loop="uvloop",
+            http="httptools",
+            log_level=log_level
+        )
\ No newline at end of file
@@ -4,6 +4,7 @@ Docker startup check script for vector store validation and re-indexing.
 Leverages existing project code instead of duplicating logic.
 """
 
+import asyncio
 import logging
 import os
 import sys
@@ -59,6 +60,14 @@ def check_vector_store_compatibility():
             return False, "OTHER_ERROR"
 
 def reindex_if_needed():
+    """Re-index documents if needed (sync entry point for the CLI check).
+
+    Must not be called from a running event loop; await areindex_if_needed()
+    there instead.
+    """
+    return asyncio.run(areindex_if_needed())
+
+async def areindex_if_needed():
     """Re-index documents if needed using existing RAG infrastructure."""
     try:
         # Set up cache directory - try primary location first, fallback to home
@@ -88,15 +97,15 @@ def reindex_if_needed():
         if embeddings_provider == "openai" and os.getenv("OPENAI_API_KEY"):
             logger.info("Re-indexing with OpenAI embeddings...")
             from rag.reindex_openai import reindex_with_openai
-            reindex_with_openai()
+            # Synchronous; keep the event loop free while it runs
+            await asyncio.to_thread(reindex_with_openai)
         else:
             logger.info(f"Re-indexing with {embeddings_provider} embeddings...")
             # For local embeddings, we need to use the ingest module
             from rag.ingest import ingest_infinitepay_content
-            import asyncio
             
-            # Run the ingestion process
-            result = asyncio.run(ingest_infinitepay_content())
+            # Run the ingestion process on the caller's loop
+            result = await ingest_infinitepay_content()
             logger.info(f"Re-indexing completed with {result} document chunks")
         
         return True
@@ -1,12 +1,23 @@
 """RAG configuration and settings."""
 
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import logging
 import os
-from typing import List
+import pickle
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import httpx
+from cachetools import TTLCache
 from langchain.embeddings.base import Embeddings
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_openai import OpenAIEmbeddings
 
+logger = logging.getLogger(__name__)
+
 
 def get_llm_config():
     """Get LLM configuration based on environment variables."""
@@ -29,16 +40,107 @@ def get_llm_config():
         }
 
 
+# Exact-match response cache shared by every CachedChatOpenAI instance.
+# Sampling at temperature=0.1 is not deterministic; the opt-in cache
+# deliberately reuses one sampled completion for identical
+# (model, temperature, messages) prompts until the entry expires.
+_LLM_EXACT_CACHE = TTLCache(maxsize=4096, ttl=3600)
+_LLM_EXACT_CACHE_LOCK = threading.Lock()
+
+
+@functools.cache
+def _cached_chat_openai_class():
+    """Build the ChatOpenAI subclass used when LLM_EXACT_CACHE=1."""
+    from langchain_core.messages import AIMessage, BaseMessage
+    from langchain_openai import ChatOpenAI
+
+    class CachedChatOpenAI(ChatOpenAI):
+        """ChatOpenAI with an in-process exact-match response cache."""
+
+        def _cache_key(self, messages, kwargs) -> Optional[str]:
+            # Only plain message lists without per-call options are cacheable
+            if kwargs or not isinstance(messages, list) or not all(isinstance(m, BaseMessage) for m in messages):
+                return None
+            payload = (self.model_name, self.temperature, [(m.type, m.content) for m in messages])
+            return hashlib.blake2b(pickle.dumps(payload), digest_size=16).hexdigest()
+
+        def _cached(self, key: Optional[str]):
+            if key is None:
+                return None
+            with _LLM_EXACT_CACHE_LOCK:
+                content = _LLM_EXACT_CACHE.get(key)
+            return AIMessage(content=content) if content is not None else None
+
+        def _remember(self, key: Optional[str], response) -> None:
+            if key is not None and response.content:
+                with _LLM_EXACT_CACHE_LOCK:
+                    _LLM_EXACT_CACHE[key] = response.content
+
+        def invoke(self, input, config=None, **kwargs):
+            key = self._cache_key(input, kwargs)
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+            response = super().invoke(input, config, **kwargs)
+            self._remember(key, response)
+            return response
+
+        async def ainvoke(self, input, config=None, **kwargs):
+            key = self._cache_key(input, kwargs)
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+            response = await super().ainvoke(input, config, **kwargs)
+            self._remember(key, response)
+            return response
+
+    return CachedChatOpenAI
+
+
+@functools.cache
+def _shared_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Process-wide connection pools handed to every ChatOpenAI instance.
+
+    create_llm() is called per request; sharing the clients keeps TLS sessions
+    (and HTTP/2 connections, when h2 is installed) alive across requests.
+    """
+    http2 = importlib.util.find_spec("h2") is not None
+    limits = httpx.Limits(
+        max_connections=RAGConfig.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=RAGConfig.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    )
+    return (
+        httpx.Client(http2=http2, limits=limits, timeout=RAGConfig.HTTP_TIMEOUT),
+        httpx.AsyncClient(http2=http2, limits=limits, timeout=RAGConfig.HTTP_TIMEOUT),
+    )
+
+
+async def close_shared_http_clients() -> None:
+    """Close the shared LLM connection pools (called on application shutdown)."""
+    if _shared_http_clients.cache_info().currsize == 0:
+        return
+    sync_client, async_client = _shared_http_clients()
+    _shared_http_clients.cache_clear()
+    await async_client.aclose()
+    sync_client.close()
+
+
 def create_llm():
     """Create LLM instance based on configuration."""
     config = get_llm_config()
     
     if config["provider"] == "openai":
-        from langchain_openai import ChatOpenAI
+        if os.getenv("LLM_EXACT_CACHE", "0") == "1":
+            ChatOpenAI = _cached_chat_openai_class()
+        else:
+            from langchain_openai import ChatOpenAI
+        http_client, http_async_client = _shared_http_clients()
         return ChatOpenAI(
             temperature=config["temperature"],
             model=config["model"],
-            api_key=config["api_key"]
+            api_key=config["api_key"],
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
     else:
         # Return MockLLM for local development
@@ -68,7 +170,23 @@ def create_llm():
                     def __init__(self, content):
                         self.content = content
                 return MockResponse(response_text)
-            
+
+            async def ainvoke(self, prompt, **kwargs):
+                # Same canned response; keeps the async call sites uniform with ChatOpenAI.ainvoke
+                return self.invoke(prompt, **kwargs)
+
+            async def abatch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+                # Route through invoke so results carry .content like ChatOpenAI's
+                results = []
+                for prompt in inputs:
+                    try:
+                        results.append(self.invoke(prompt))
+                    except Exception as e:
+                        if not return_exceptions:
+                            raise
+                        results.append(e)
+                return results
+
             @property
             def _llm_type(self):
                 return "mock"
@@ -76,26 +194,148 @@ def create_llm():
         return MockLLM()
 
 
+class LLMBatcher:
+    """Coalesce concurrent `ainvoke` calls into one `llm.abatch` call.
+
+    Requests arriving within `window_ms` of the first pending one (or until
+    `max_size` are pending) are sent together; identical message lists in a
+    batch share a single completion. Each caller awaits its own future.
+    Instances are bound to the event loop they are first used on; use
+    get_llm_batcher() to get the one for the running loop.
+    """
+
+    def __init__(self, window_ms: float = 20, max_size: int = 16, llm_factory: Callable[[], Any] = create_llm):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._llm_factory = llm_factory
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def ainvoke(self, messages):
+        """Queue `messages` for the next batch and wait for its response."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((messages, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        # Identical prompts within the window are sent once
+        unique: Dict[Any, int] = {}
+        inputs = []
+        slots = []
+        for messages, _ in batch:
+            key = self._dedup_key(messages)
+            if key not in unique:
+                unique[key] = len(inputs)
+                inputs.append(messages)
+            slots.append(unique[key])
+
+        try:
+            results = await self._llm_factory().abatch(inputs, return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(inputs)
+
+        for (_, future), slot in zip(batch, slots, strict=True):
+            if future.done():  # caller was cancelled
+                continue
+            result = results[slot]
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _dedup_key(messages) -> Any:
+        try:
+            key = tuple((getattr(m, "type", None), getattr(m, "content", m)) for m in messages) if isinstance(messages, list) else messages
+            hash(key)
+            return key
+        except TypeError:  # unhashable content (e.g. multimodal parts): never shared
+            return object()
+
+
+_LLM_BATCHERS: Dict[asyncio.AbstractEventLoop, LLMBatcher] = {}
+
+
+def get_llm_batcher() -> Optional[LLMBatcher]:
+    """Return the running loop's LLMBatcher, or None unless LLM_BATCH=1."""
+    if os.getenv("LLM_BATCH", "0") != "1":
+        return None
+    loop = asyncio.get_running_loop()
+    batcher = _LLM_BATCHERS.get(loop)
+    if batcher is None:
+        # Drop batchers of loops that have since been closed
+        for stale in [loop for loop in _LLM_BATCHERS if loop.is_closed()]:
+            del _LLM_BATCHERS[stale]
+        batcher = _LLM_BATCHERS[loop] = LLMBatcher(
+            window_ms=float(os.getenv("LLM_BATCH_WINDOW_MS", RAGConfig.LLM_BATCH_WINDOW_MS)),
+            max_size=RAGConfig.LLM_BATCH_MAX_SIZE,
+        )
+    return batcher
+
+
 class RAGConfig:
     """Configuration for RAG system."""
     
     # Vector store settings
     VECTOR_STORE_PATH = "./data/chroma"
     COLLECTION_NAME = "infinitepay_knowledge"
+    # Both embedding providers return unit-length vectors, so inner product
+    # ranks like cosine without normalizing at every distance computation.
+    # Only applied when the collection is first created.
+    COLLECTION_METADATA = {
+        "hnsw:space": "ip",
+        "hnsw:M": 32,
+        "hnsw:construction_ef": 200,
+        "hnsw:search_ef": 64,
+    }
     
     # Embedding settings
     LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
     OPENAI_EMBEDDING_MODEL = "text-embedding-3-large"
+    OPENAI_EMBEDDING_DIM = 256  # Matryoshka-truncated from 3072
+    EMBEDDING_BATCH_SIZE = 64
+    GPU_EMBEDDING_BATCH_SIZE = 256
+    ONNX_EMBEDDING_FILE = "onnx/model_qint8_avx512.onnx"
+    
+    # LLM HTTP connection pool
+    HTTP_MAX_CONNECTIONS = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = 50
+    HTTP_TIMEOUT = 30.0
+    
+    # LLM micro-batching (LLM_BATCH=1)
+    LLM_BATCH_WINDOW_MS = 20
+    LLM_BATCH_MAX_SIZE = 16
     
     # Chunking settings
-    CHUNK_SIZE = 800  # tokens
-    CHUNK_OVERLAP = 100  # tokens
+    CHUNK_SIZE = 800  # tokens for OpenAI embeddings, characters for local ones
+    CHUNK_OVERLAP = 100
+    OPENAI_TOKEN_ENCODING = "cl100k_base"  # tokenizer of the text-embedding-3 models
     
     # Retrieval settings
     TOP_K = 5
     MMR_K = 5
     MMR_FETCH_K = 20
     
+    # Ingestion settings
+    FETCH_CONCURRENCY = 8  # simultaneous page fetches
+    FETCH_CHUNK_SIZE = 65536  # bytes per read when streaming a page into the parser
+    INDEX_BATCH_SIZE = 256  # chunks embedded and written per vector store call
+    EMBED_BATCH_SIZE = 128  # texts per OpenAI embedding request during reindex
+    EMBED_CONCURRENCY = 8  # embedding requests in flight during reindex
+    
     # InfinitePay URLs to scrape
     INFINITEPAY_URLS = [
         "https://www.infinitepay.io",
@@ -120,10 +360,66 @@ class RAGConfig:
 
 
 def get_embeddings() -> Embeddings:
-    """Get embeddings based on configuration."""
+    """Get embeddings based on configuration.
+
+    Instances are shared per configuration, so the vector store, the knowledge
+    agent and the semantic cache all use one loaded model.
+    """
     provider = os.getenv("EMBEDDINGS_PROVIDER", "local")
-    
-    if provider == "openai" and os.getenv("OPENAI_API_KEY"):
-        return OpenAIEmbeddings(model=RAGConfig.OPENAI_EMBEDDING_MODEL)
+    if provider != "openai" or not os.getenv("OPENAI_API_KEY"):
+        provider = "local"
+    return _build_embeddings(
+        provider,
+        os.getenv("EMBEDDINGS_BACKEND", "torch"),
+        os.getenv("EMBEDDINGS_ONNX_FILE", RAGConfig.ONNX_EMBEDDING_FILE),
+    )
+
+
+@functools.lru_cache(maxsize=2)
+def _build_embeddings(provider: str, backend: str, onnx_file: str) -> Embeddings:
+    """Construct the embeddings for one configuration (cached by get_embeddings)."""
+    if provider == "openai":
+        return OpenAIEmbeddings(
+            model=RAGConfig.OPENAI_EMBEDDING_MODEL,
+            dimensions=RAGConfig.OPENAI_EMBEDDING_DIM,
+        )
     else:
-        return HuggingFaceEmbeddings(model_name=RAGConfig.LOCAL_EMBEDDING_MODEL)
\ No newline at end of file
+        encode_kwargs = {"batch_size": RAGConfig.EMBEDDING_BATCH_SIZE, "normalize_embeddings": True}
+        if backend == "onnx":
+            if importlib.util.find_spec("optimum") is None:
+                logger.warning("EMBEDDINGS_BACKEND=onnx needs the 'onnx' extra (optimum[onnxruntime]); falling back to PyTorch")
+            else:
+                # INT8-quantized ONNX export shipped with the model repo
+                return HuggingFaceEmbeddings(
+                    model_name=RAGConfig.LOCAL_EMBEDDING_MODEL,
+                    model_kwargs={
+                        "backend": "onnx",
+                        "model_kwargs": {
+                            "file_name": onnx_file,
+                            "provider": "CPUExecutionProvider",
+                        },
+                    },
+                    encode_kwargs=encode_kwargs,
+                    multi_process=False,
+                )
+        use_cuda = _cuda_available()
+        if use_cuda:
+            encode_kwargs["batch_size"] = RAGConfig.GPU_EMBEDDING_BATCH_SIZE
+        embeddings = HuggingFaceEmbeddings(
+            model_name=RAGConfig.LOCAL_EMBEDDING_MODEL,
+            model_kwargs={"device": "cuda" if use_cuda else "cpu"},
+            # One forward pass per batch of texts instead of per text
+            encode_kwargs=encode_kwargs,
+            multi_process=False,
+        )
+        if use_cuda:
+            # fp16 weights halve memory traffic and run on the tensor cores;
+            # the CPU path stays fp32
+            embeddings.client.half()
+        return embeddings
+
+
+def _cuda_available() -> bool:
+    """Whether a CUDA device can run the local embedding model."""
+    import torch
+    return torch.cuda.is_available()
@@ -1,112 +1,269 @@
 """RAG ingestion pipeline for InfinitePay content."""
 
 import asyncio
+import functools
+import gzip
+import hashlib
+import importlib.util
 import json
 import logging
 import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set, Tuple
 from urllib.parse import urljoin
 
 import httpx
-from bs4 import BeautifulSoup
+import lxml.html
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
+from lxml import etree
 
 from .config import RAGConfig, get_embeddings
 
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib
+    def _json_dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Per-URL HTTP validators of the saved raw pages, kept next to them in data/raw
+HTTP_CACHE_FILE = ".cache.json"
+
+# Every main content candidate (main, article, [role="main"], .content,
+# .main-content, #content, #main-content), found in one document pass
+_MAIN_XPATH = etree.XPath(
+    '//main | //article | //*[@role="main"]'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " content ")]'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " main-content ")]'
+    ' | //*[@id="content"] | //*[@id="main-content"]'
+)
+_META_DESCRIPTION_XPATH = etree.XPath('//meta[@name="description"]/@content')
+
+
+def _content_priority(element) -> int:
+    """Rank of a _MAIN_XPATH match, in the order the selectors above are tried."""
+    if element.tag == "main":
+        return 0
+    if element.tag == "article":
+        return 1
+    if element.get("role") == "main":
+        return 2
+    classes = (element.get("class") or "").split()
+    if "content" in classes:
+        return 3
+    if "main-content" in classes:
+        return 4
+    if element.get("id") == "content":
+        return 5
+    return 6
+
+
+def _element_text(element) -> str:
+    """Visible text of an element, stripped pieces joined by single spaces."""
+    return " ".join(piece for piece in (text.strip() for text in element.itertext()) if piece)
+
+
+def _extract_main_content(tree: lxml.html.HtmlElement) -> str:
+    """Extract main content from HTML."""
+    # Try to find main content areas
+    main_content = ""
+    
+    # Look for common content containers; min() keeps the first match in
+    # document order among equally ranked candidates
+    candidates = _MAIN_XPATH(tree)
+    if candidates:
+        main_content = _element_text(min(candidates, key=_content_priority))
+    
+    # Fallback to body content if no main content found
+    if not main_content:
+        body = tree.find('.//body')
+        if body is not None:
+            main_content = _element_text(body)
+    
+    return main_content
+
+
+def _parse_page(body: List[bytes], encoding: str, url: str) -> dict:
+    """Parse a page body (as read from the wire) into title, description and content.
+
+    Top-level so it can run in a ProcessPoolExecutor worker.
+    """
+    # Feed the raw chunks to lxml's C parser instead of decoding a full str copy
+    parser = lxml.html.HTMLParser(encoding=encoding)
+    for chunk in body:
+        parser.feed(chunk)
+    tree = parser.close()
+    
+    # Remove script and style elements (keeping the text that follows them)
+    etree.strip_elements(tree, "script", "style", with_tail=False)
+    
+    # Extract main content
+    content = _extract_main_content(tree)
+    
+    # Get title
+    title = tree.find('.//title')
+    title_text = title.text_content().strip() if title is not None else url
+    
+    # Get meta description
+    meta_desc = _META_DESCRIPTION_XPATH(tree)
+    description = meta_desc[0] if meta_desc else ""
+    
+    return {
+        'url': url,
+        'title': title_text,
+        'description': str(description),
+        'content': content,
+    }
+
 
 class WebContentFetcher:
     """Fetch and clean web content."""
     
-    def __init__(self):
-        self.client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+    def __init__(self, executor: Optional[Executor] = None, raw_dir: Optional[Path] = None):
+        self.executor = executor
+        # With a raw_dir, pages saved there by earlier runs are revalidated
+        # with conditional requests instead of being downloaded and parsed again
+        self.raw_dir = raw_dir
+        self.http_cache = self._load_http_cache()
+        # All ingest URLs share one host: keep a warm pool and, with h2
+        # installed, multiplex the concurrent fetches over one connection
+        encodings = ["gzip"]
+        if importlib.util.find_spec("brotli") is not None:
+            encodings.append("br")
+        self.client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=32,
+                max_keepalive_connections=32,
+                keepalive_expiry=30.0,
+            ),
+            follow_redirects=True,
+            headers={"Accept-Encoding": ", ".join(encodings)},
+        )
         
     async def fetch_url(self, url: str) -> Optional[dict]:
         """Fetch and parse a single URL."""
         try:
             logger.info(f"Fetching: {url}")
-            response = await self.client.get(url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract main content
-            content = self._extract_main_content(soup)
-            
-            # Get title
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else url
+            validators, saved_page = self._cached(url)
+            headers = {}
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
             
-            # Get meta description
-            description = ""
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc:
-                description = meta_desc.get('content', '')
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and saved_page is not None:
+                    logger.info(f"Not modified: {url}")
+                    return load_raw_page(saved_page)
+                response.raise_for_status()
+                encoding = response.encoding or "utf-8"
+                digest = hashlib.sha256()
+                body = []
+                async for chunk in response.aiter_bytes(RAGConfig.FETCH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    body.append(chunk)
             
-            return {
-                'url': url,
-                'title': title_text,
-                'description': description,
-                'content': content,
-                'scraped_at': asyncio.get_event_loop().time()
+            entry = {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'sha256': digest.hexdigest(),
             }
+            if saved_page is not None and validators.get('sha256') == entry['sha256']:
+                # Same bytes as last time (server without validators): skip parsing
+                self.http_cache[url] = entry
+                return load_raw_page(saved_page)
+            
+            # HTML parsing is CPU-bound: hand it to the process pool when there is one
+            if self.executor is not None:
+                loop = asyncio.get_running_loop()
+                page = await loop.run_in_executor(self.executor, _parse_page, body, encoding, url)
+            else:
+                page = _parse_page(body, encoding, url)
+            page['scraped_at'] = asyncio.get_running_loop().time()
+            if self.raw_dir is not None:
+                self.http_cache[url] = entry
+            return page
             
         except Exception as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
     
-    def _extract_main_content(self, soup: BeautifulSoup) -> str:
-        """Extract main content from HTML."""
-        # Try to find main content areas
-        main_content = ""
-        
-        # Look for common content containers
-        content_selectors = [
-            'main',
-            'article',
-            '[role="main"]',
-            '.content',
-            '.main-content',
-            '#content',
-            '#main-content'
-        ]
-        
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                main_content = elements[0].get_text(separator=' ', strip=True)
-                break
-        
-        # Fallback to body content if no main content found
-        if not main_content:
-            body = soup.find('body')
-            if body:
-                main_content = body.get_text(separator=' ', strip=True)
-        
-        return main_content
+    def _load_http_cache(self) -> dict:
+        """Validators (etag, last_modified, sha256) per URL from the last run."""
+        if self.raw_dir is None:
+            return {}
+        try:
+            return _json_loads((self.raw_dir / HTTP_CACHE_FILE).read_bytes())
+        except (OSError, ValueError):
+            return {}
+    
+    def _cached(self, url: str) -> Tuple[dict, Optional[Path]]:
+        """Validators for `url` and its saved raw page; ({}, None) if either is missing."""
+        validators = self.http_cache.get(url)
+        if not validators:
+            return {}, None
+        path = raw_page_path(self.raw_dir, url)
+        for candidate in (path.with_name(path.name + ".gz"), path):
+            if candidate.exists():
+                return validators, candidate
+        return {}, None
+    
+    def save_http_cache(self) -> None:
+        """Persist validators; call once the fetched pages are saved to raw_dir."""
+        if self.raw_dir is not None:
+            (self.raw_dir / HTTP_CACHE_FILE).write_bytes(_json_dumps(self.http_cache))
     
     async def close(self):
         """Close the HTTP client."""
         await self.client.aclose()
 
 
+def create_text_splitter(provider: str = "local", **kwargs) -> RecursiveCharacterTextSplitter:
+    """Text splitter whose chunk sizes match the embedding model's units.
+
+    OpenAI chunks are measured in tiktoken tokens, so CHUNK_SIZE is a real
+    token budget. Local MiniLM chunks stay in characters: 800 characters fit
+    the model's 256-token window, 800 wordpieces would be truncated. Falls
+    back to characters if the tiktoken encoding cannot be loaded.
+    """
+    if provider == "openai":
+        try:
+            return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+                encoding_name=RAGConfig.OPENAI_TOKEN_ENCODING,
+                chunk_size=RAGConfig.CHUNK_SIZE,
+                chunk_overlap=RAGConfig.CHUNK_OVERLAP,
+                **kwargs,
+            )
+        except Exception as e:
+            logger.warning(f"tiktoken encoding unavailable ({e}); splitting by characters")
+    return RecursiveCharacterTextSplitter(
+        chunk_size=RAGConfig.CHUNK_SIZE,
+        chunk_overlap=RAGConfig.CHUNK_OVERLAP,
+        length_function=len,
+        **kwargs,
+    )
+
+
 class DocumentProcessor:
     """Process fetched content into documents."""
     
     def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=RAGConfig.CHUNK_SIZE,
-            chunk_overlap=RAGConfig.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", ".", "!", "?", " ", ""]
+        provider = os.getenv("EMBEDDINGS_PROVIDER", "local")
+        if provider != "openai" or not os.getenv("OPENAI_API_KEY"):
+            provider = "local"
+        self.text_splitter = create_text_splitter(
+            provider,
+            separators=["\n\n", "\n", ".", "!", "?", " ", ""],
         )
     
     def create_documents(self, fetched_data: List[dict]) -> List[Document]:
@@ -136,51 +293,158 @@ Content:
             # Split into chunks
             chunks = self.text_splitter.split_text(full_text)
             
-            for i, chunk in enumerate(chunks):
-                chunk_metadata = metadata.copy()
-                chunk_metadata['chunk_id'] = i
-                chunk_metadata['total_chunks'] = len(chunks)
-                
-                documents.append(Document(
+            total_chunks = len(chunks)
+            documents.extend(
+                Document(
                     page_content=chunk,
-                    metadata=chunk_metadata
-                ))
+                    metadata={**metadata, 'id': content_id(chunk), 'chunk_id': i, 'total_chunks': total_chunks},
+                )
+                for i, chunk in enumerate(chunks)
+            )
         
         return documents
 
 
+def content_id(text: str) -> str:
+    """Stable chunk id: identical content always maps to the same vector store row."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def unique_by_content(documents: Iterable[Document]) -> List[Document]:
+    """Drop repeated chunks (e.g. page boilerplate), making sure each has metadata['id']."""
+    seen: Set[str] = set()
+    unique = []
+    for doc in documents:
+        cid = doc.metadata.setdefault('id', content_id(doc.page_content))
+        if cid not in seen:
+            seen.add(cid)
+            unique.append(doc)
+    return unique
+
+
+def existing_ids(vectorstore: Chroma, ids: List[str]) -> Set[str]:
+    """Subset of `ids` already stored in the collection."""
+    if not ids:
+        return set()
+    return set(vectorstore._collection.get(ids=ids, include=[])["ids"])
+
+
+def add_documents_batched(vectorstore: Chroma, documents: List[Document], batch_size: int = RAGConfig.INDEX_BATCH_SIZE) -> int:
+    """Embed and insert `documents` in fixed-size batches, skipping stored chunks.
+
+    Each batch is one embedding call plus one collection write, instead of a
+    single call that embeds everything before the first row is written.
+    Chunks are keyed by content hash, so unchanged chunks from a previous run
+    are neither re-embedded nor duplicated. Returns the number added.
+    """
+    documents = unique_by_content(documents)
+    added = 0
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        stored = existing_ids(vectorstore, [doc.metadata['id'] for doc in batch])
+        new_docs = [doc for doc in batch if doc.metadata['id'] not in stored]
+        if new_docs:
+            # Column arrays straight to add_texts (add_documents rebuilds them)
+            vectorstore.add_texts(
+                texts=[doc.page_content for doc in new_docs],
+                metadatas=[doc.metadata for doc in new_docs],
+                ids=[doc.metadata['id'] for doc in new_docs],
+            )
+            added += len(new_docs)
+        logger.info(f"Indexed {min(start + batch_size, len(documents))}/{len(documents)} chunks ({added} new)")
+    return added
+
+
+def remove_stale_chunks(vectorstore: Chroma, documents: List[Document]) -> int:
+    """Delete stored chunks of the given documents' sources that are no longer current."""
+    sources = sorted({doc.metadata['source'] for doc in documents})
+    if not sources:
+        return 0
+    current = {doc.metadata.get('id') or content_id(doc.page_content) for doc in documents}
+    stored = vectorstore._collection.get(where={"source": {"$in": sources}}, include=[])["ids"]
+    stale = [cid for cid in stored if cid not in current]
+    if stale:
+        vectorstore._collection.delete(ids=stale)
+        logger.info(f"Removed {len(stale)} outdated chunks")
+    return len(stale)
+
+
+def raw_page_path(raw_dir: Path, url: str) -> Path:
+    """Raw page file for `url` (save_raw_page writes it gzipped, with a .gz suffix)."""
+    return raw_dir / (url.replace('https://', '').replace('/', '_') + '.json')
+
+
+def save_raw_page(path: Path, data: dict) -> Path:
+    """Write a fetched page as gzipped compact JSON to `<path>.gz`.
+
+    A plain `path` left by an older run is removed so the page is not loaded twice.
+    """
+    gz_path = path.with_name(path.name + ".gz")
+    with gzip.open(gz_path, "wb") as f:
+        f.write(_json_dumps(data))
+    path.unlink(missing_ok=True)
+    return gz_path
+
+
+def load_raw_page(path: Path) -> dict:
+    """Read a page saved as `*.json` or `*.json.gz`."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        return _json_loads(f.read())
+
+
+def raw_page_files(data_path: Path) -> List[Path]:
+    """Raw page files in `data_path`, preferring `x.json.gz` over a stale `x.json`."""
+    compressed = sorted(data_path.glob("*.json.gz"))
+    names = {path.name[:-len(".gz")] for path in compressed}
+    # Dotfiles (the HTTP validator cache) are not pages
+    names.add(HTTP_CACHE_FILE)
+    plain = [path for path in sorted(data_path.glob("*.json")) if path.name not in names]
+    return compressed + plain
+
+
 class VectorStoreManager:
-    """Manage vector store operations."""
+    """Manage vector store operations.
+
+    Holds one Chroma client for its lifetime; use get_vector_store_manager()
+    to share it across the process.
+    """
     
     def __init__(self):
         self.embeddings = get_embeddings()
         self.persist_directory = RAGConfig.VECTOR_STORE_PATH
+        self._vectorstore: Optional[Chroma] = None
+        self._lock = threading.Lock()
+    
+    def _open(self) -> Chroma:
+        """Open the persistent collection on first use and keep it open."""
+        with self._lock:
+            if self._vectorstore is None:
+                # Create directory if it doesn't exist
+                Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+                self._vectorstore = Chroma(
+                    persist_directory=self.persist_directory,
+                    embedding_function=self.embeddings,
+                    collection_name=RAGConfig.COLLECTION_NAME,
+                    collection_metadata=RAGConfig.COLLECTION_METADATA,
+                )
+            return self._vectorstore
         
     def create_vectorstore(self, documents: List[Document]) -> Chroma:
-        """Create a new vector store from documents."""
+        """Add documents to the vector store, creating it if needed."""
         logger.info(f"Creating vector store with {len(documents)} documents")
         
-        # Create directory if it doesn't exist
-        Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
-        
-        # Create vector store
-        vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory=self.persist_directory,
-            collection_name=RAGConfig.COLLECTION_NAME
-        )
+        vectorstore = self._open()
+        add_documents_batched(vectorstore, documents)
+        # Pages that were re-fetched replace their old chunks
+        remove_stale_chunks(vectorstore, documents)
         
         return vectorstore
     
     def load_vectorstore(self) -> Optional[Chroma]:
         """Load existing vector store."""
         try:
-            vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings,
-                collection_name=RAGConfig.COLLECTION_NAME
-            )
+            vectorstore = self._open()
             
             # Test if collection exists
             try:
@@ -193,21 +457,54 @@ class VectorStoreManager:
             return None
 
 
+@functools.cache
+def get_vector_store_manager() -> VectorStoreManager:
+    """Process-wide VectorStoreManager (one embeddings model, one Chroma client)."""
+    return VectorStoreManager()
+
+
+# Below this many pages, forking workers costs more than parsing inline
+MIN_PAGES_FOR_PARSE_POOL = 4
+
+
+def _parse_pool(page_count: int) -> Optional[ProcessPoolExecutor]:
+    """Process pool for page parsing, sized to the work; None to parse inline.
+
+    At most FETCH_CONCURRENCY pages are in flight, so more workers than that
+    (or than pages, or cores) would sit idle.
+    """
+    workers = min(page_count, os.cpu_count() or 1, RAGConfig.FETCH_CONCURRENCY)
+    if page_count < MIN_PAGES_FOR_PARSE_POOL or workers < 2:
+        return None
+    return ProcessPoolExecutor(max_workers=workers)
+
+
 async def ingest_infinitepay_content():
     """Main ingestion function."""
     logger.info("Starting InfinitePay content ingestion")
     
     # Initialize components
-    fetcher = WebContentFetcher()
+    parse_pool = _parse_pool(len(RAGConfig.INFINITEPAY_URLS))
+    raw_data_path = Path("data/raw")
+    fetcher = WebContentFetcher(executor=parse_pool, raw_dir=raw_data_path)
     processor = DocumentProcessor()
-    vector_manager = VectorStoreManager()
+    vector_manager = get_vector_store_manager()
     
     try:
-        # Fetch all URLs
+        # Fetch all URLs concurrently (bounded), keeping the configured order
+        semaphore = asyncio.Semaphore(RAGConfig.FETCH_CONCURRENCY)
+
+        async def fetch_one(url: str) -> Optional[dict]:
+            async with semaphore:
+                return await fetcher.fetch_url(url)
+
+        results = await asyncio.gather(
+            *(fetch_one(url) for url in RAGConfig.INFINITEPAY_URLS),
+            return_exceptions=True,
+        )
         fetched_data = []
-        for url in RAGConfig.INFINITEPAY_URLS:
-            data = await fetcher.fetch_url(url)
-            if data:
+        for url, data in zip(RAGConfig.INFINITEPAY_URLS, results, strict=True):
+            if data and not isinstance(data, BaseException):
                 fetched_data.append(data)
             else:
                 logger.warning(f"Failed to fetch: {url}")
@@ -215,15 +512,11 @@ async def ingest_infinitepay_content():
         logger.info(f"Successfully fetched {len(fetched_data)} URLs")
         
         # Save raw data
-        raw_data_path = Path("data/raw")
         raw_data_path.mkdir(parents=True, exist_ok=True)
         
         for data in fetched_data:
-            filename = data['url'].replace('https://', '').replace('/', '_') + '.json'
-            filepath = raw_data_path / filename
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            save_raw_page(raw_page_path(raw_data_path, data['url']), data)
+        fetcher.save_http_cache()
         
         # Process into documents
         documents = processor.create_documents(fetched_data)
@@ -250,6 +543,8 @@ async def ingest_infinitepay_content():
         
     finally:
         await fetcher.close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
 
 
 if __name__ == "__main__":
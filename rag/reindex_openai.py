@@ -1,60 +1,106 @@
 """Re-index existing documents with OpenAI embeddings."""
 
-import json
+import asyncio
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
 
+from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
 
 from .config import RAGConfig, get_embeddings
+from .ingest import (
+    create_text_splitter,
+    existing_ids,
+    load_raw_page,
+    raw_page_files,
+    unique_by_content,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _load_document(json_file: Path) -> Optional[Document]:
+    """Build a Document from one raw page file, or None if it is empty or unreadable."""
+    try:
+        data = load_raw_page(json_file)
+    except Exception as e:
+        logger.error(f"Error loading {json_file}: {e}")
+        return None
+    
+    # Create a Document from the JSON data
+    content = data.get('content', '')
+    if not content:
+        return None
+    metadata = {
+        'source': data.get('url', ''),
+        'title': data.get('title', ''),
+        'description': data.get('description', ''),
+        'scraped_at': data.get('scraped_at', '')
+    }
+    return Document(page_content=content, metadata=metadata)
+
+
 def load_existing_documents(data_dir: str = "./data/raw") -> List[Document]:
     """Load existing scraped documents from JSON files."""
-    documents = []
     data_path = Path(data_dir)
     
     if not data_path.exists():
         logger.warning(f"Data directory {data_dir} does not exist")
-        return documents
+        return []
     
-    # Load all JSON files from the raw data directory
-    for json_file in data_path.glob("*.json"):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Create a Document from the JSON data
-            content = data.get('content', '')
-            if content:
-                # Create metadata
-                metadata = {
-                    'source': data.get('url', ''),
-                    'title': data.get('title', ''),
-                    'description': data.get('description', ''),
-                    'scraped_at': data.get('scraped_at', '')
-                }
-                
-                doc = Document(
-                    page_content=content,
-                    metadata=metadata
-                )
-                documents.append(doc)
-                logger.info(f"Loaded document from {json_file}: {data.get('title', 'Unknown')}")
-        except Exception as e:
-            logger.error(f"Error loading {json_file}: {e}")
+    # Read and parse all JSON files (plain or gzipped) in parallel, keeping file order
+    files = raw_page_files(data_path)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        documents = [doc for doc in executor.map(_load_document, files) if doc is not None]
     
+    logger.debug("Loaded titles: %s", [doc.metadata['title'] for doc in documents])
     logger.info(f"Loaded {len(documents)} documents from {data_dir}")
     return documents
 
 
+async def aembed_texts(
+    embeddings: Embeddings,
+    texts: List[str],
+    batch_size: int = RAGConfig.EMBED_BATCH_SIZE,
+    concurrency: int = RAGConfig.EMBED_CONCURRENCY,
+) -> List[List[float]]:
+    """Embed `texts` with up to `concurrency` embedding requests in flight.
+
+    Vectors are returned in input order. OpenAIEmbeddings already splits
+    over-long inputs by token count, so batches only bound the request count.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+
+def add_embedded_documents(vectorstore: Chroma, documents: List[Document], vectors: List[List[float]]) -> None:
+    """Write pre-computed vectors to the collection in INDEX_BATCH_SIZE batches.
+
+    Documents must carry their content-hash id in metadata['id'].
+    """
+    batch_size = RAGConfig.INDEX_BATCH_SIZE
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        vectorstore._collection.add(
+            ids=[doc.metadata['id'] for doc in batch],
+            embeddings=vectors[start:start + batch_size],
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch],
+        )
+
+
 def reindex_with_openai():
     """Re-index documents with OpenAI embeddings."""
     logger.info("Starting re-indexing with OpenAI embeddings...")
@@ -84,12 +130,8 @@ def reindex_with_openai():
         logger.error("No documents found to re-index")
         return
     
-    # Create text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=RAGConfig.CHUNK_SIZE,
-        chunk_overlap=RAGConfig.CHUNK_OVERLAP,
-        length_function=len,
-    )
+    # Create text splitter (chunk sizes in OpenAI tokens)
+    text_splitter = create_text_splitter("openai")
     
     # Split documents into chunks
     logger.info("Splitting documents into chunks...")
@@ -109,13 +151,23 @@ def reindex_with_openai():
     
     # Create new vector store with OpenAI embeddings
     logger.info("Creating vector store with OpenAI embeddings...")
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
+    vectorstore = Chroma(
         persist_directory=RAGConfig.VECTOR_STORE_PATH,
-        collection_name=RAGConfig.COLLECTION_NAME
+        embedding_function=embeddings,
+        collection_name=RAGConfig.COLLECTION_NAME,
+        collection_metadata=RAGConfig.COLLECTION_METADATA,
     )
     
+    # Only embed chunks the collection does not already hold (by content hash)
+    splits = unique_by_content(splits)
+    stored = existing_ids(vectorstore, [doc.metadata['id'] for doc in splits])
+    new_splits = [doc for doc in splits if doc.metadata['id'] not in stored]
+    
+    # Embed outside Chroma so the OpenAI requests run concurrently
+    logger.info(f"Embedding {len(new_splits)} new chunks with OpenAI ({len(stored)} already indexed)...")
+    vectors = asyncio.run(aembed_texts(embeddings, [doc.page_content for doc in new_splits]))
+    add_embedded_documents(vectorstore, new_splits, vectors)
+    
     # Persist the vector store
     vectorstore.persist()
     
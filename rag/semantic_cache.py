@@ -0,0 +1,128 @@
+"""Semantic response cache for LLM-generated support and knowledge answers.
+
+Paraphrased queries ("qual meu saldo" / "ver saldo") embed close to each
+other, so a previously generated response can be reused when a new query is
+within a cosine-distance threshold of a cached one *and* shares the same
+exact-match key (e.g. the hash of the verified facts plus the language).
+
+Entries live in an in-memory Chroma collection and expire after a TTL;
+writes delete expired entries at most once per purge interval.
+Set SEMANTIC_CACHE=off to disable.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from langchain.embeddings.base import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: str) -> str:
+    """Stable exact-match key for the non-semantic part of a cache lookup."""
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """Embedding-keyed response cache with per-entry TTL."""
+
+    COLLECTION_NAME = "support_response_cache"
+    DISTANCE_THRESHOLD = 0.15  # cosine distance
+    # For keys that do not pin down the answer (no verified facts): near-duplicates only
+    STRICT_DISTANCE_THRESHOLD = 0.05
+    TTL_SECONDS = 3600
+    PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(
+        self,
+        embeddings: Optional["Embeddings"] = None,
+        collection_name: str = COLLECTION_NAME,
+        threshold: float = DISTANCE_THRESHOLD,
+        ttl: float = TTL_SECONDS,
+        purge_interval: float = PURGE_INTERVAL_SECONDS,
+    ):
+        # Imported here so importing this module stays cheap
+        from langchain_chroma import Chroma
+
+        from rag.config import get_embeddings
+
+        self.threshold = threshold
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        # No persist_directory: the cache is per-process and never touches data/
+        self.store = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings if embeddings is not None else get_embeddings(),
+            collection_metadata={"hnsw:space": "cosine"},
+        )
+
+    def lookup(self, query: str, key: str, threshold: Optional[float] = None) -> Optional[str]:
+        """Return the cached response for a paraphrase of `query` under `key`, if still fresh.
+
+        `threshold` overrides the instance's maximum cosine distance for this lookup.
+        """
+        try:
+            results = self.store.similarity_search_with_score(
+                query,
+                k=1,
+                filter={"$and": [{"key": key}, {"expires_at": {"$gt": time.time()}}]},
+            )
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            return None
+
+        if not results:
+            return None
+        doc, distance = results[0]
+        if distance >= (self.threshold if threshold is None else threshold):
+            return None
+        logger.info("Semantic cache hit (distance=%.3f)", distance)
+        return doc.metadata.get("response")
+
+    def add(self, query: str, key: str, response: str) -> None:
+        """Cache `response` for `query` under `key`."""
+        now = time.time()
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self._purge_expired(now)
+        try:
+            self.store.add_texts(
+                [query],
+                metadatas=[{"key": key, "response": response, "expires_at": now + self.ttl}],
+            )
+        except Exception as e:
+            logger.warning("Semantic cache write failed: %s", e)
+
+    def _purge_expired(self, now: float) -> None:
+        """Delete entries past their TTL so the collection does not grow for the process lifetime."""
+        try:
+            self.store._collection.delete(where={"expires_at": {"$lte": now}})
+        except Exception as e:
+            logger.warning("Semantic cache purge failed: %s", e)
+
+
+_cache: Optional[SemanticCache] = None
+_cache_unavailable = False
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Return the shared cache, or None if disabled or the embeddings cannot load."""
+    global _cache, _cache_unavailable
+    if _cache_unavailable or os.getenv("SEMANTIC_CACHE", "on").lower() != "on":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_unavailable:
+                try:
+                    _cache = SemanticCache()
+                except Exception as e:
+                    logger.warning("Semantic cache unavailable: %s", e)
+                    _cache_unavailable = True
+    return _cache
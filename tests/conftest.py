@@ -1,26 +1,79 @@
 """Test configuration and fixtures."""
 
-import json
 import os
+import shutil
 import tempfile
+import uuid
+import zlib
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from typing import Dict
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
+from langchain_core.embeddings import Embeddings
 
 # Set test environment variables before imports
 os.environ["ENVIRONMENT"] = "test"
 os.environ["PERSONALITY"] = "off"  # Disable personality for deterministic tests
+os.environ["SEMANTIC_CACHE"] = "off"  # Cached answers would leak between tests
 
 from api.main import app
+from agents.knowledge_agent import KnowledgeAgent
 from agents.router_agent import RouterAgent
-
-
-@pytest.fixture
+from agents.support_agent import SupportAgent
+from rag.semantic_cache import SemanticCache
+from tools import user_store
+from tools.user_store import UserStore
+
+
+_MISSING = object()
+
+
+@contextmanager
+def swap_attr(obj, name, value):
+    """Temporarily set `obj.name` (a cheaper stand-in for mock.patch)."""
+    old = getattr(obj, name, _MISSING)
+    setattr(obj, name, value)
+    try:
+        yield value
+    finally:
+        if old is _MISSING:
+            delattr(obj, name)
+        else:
+            setattr(obj, name, old)
+
+
+def fast_patch(target, **kwargs):
+    """mock.patch with a plain MagicMock: no autospec or spec_set signature introspection.
+
+    Use it for stand-ins such as Chroma whose call signatures the test never
+    asserts; autospec would rebuild the full class spec on every patch.
+    """
+    return patch(target, autospec=False, spec_set=False, **kwargs)
+
+
+@contextmanager
+def swap_env(**values):
+    """Temporarily set environment variables (a cheaper stand-in for patch.dict)."""
+    old = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in old.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@pytest.fixture(scope="session")
 def test_client():
-    """Create FastAPI test client."""
-    return TestClient(app)
+    """Create FastAPI test client, running app startup/shutdown once per session."""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.fixture
@@ -54,25 +107,73 @@ def mock_user_data():
     }
 
 
+@pytest.fixture(autouse=True)
+def isolated_user_store(tmp_path):
+    """Point the default UserStore at a tmp_path copy of the mock data, so tests never write to data/mock."""
+    data_dir = tmp_path / "user_store"
+    data_dir.mkdir()
+    data_file = data_dir / "users.json"
+    shutil.copyfile(user_store._default_data_path(), data_file)
+    with swap_attr(user_store, "_default_data_path", lambda: data_file), \
+            swap_attr(user_store, "_store", None):
+        yield data_file
+
+
 @pytest.fixture
-def temp_mock_data(mock_user_data):
-    """Create temporary mock data file."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        json.dump(mock_user_data, f)
-        temp_path = f.name
-    
-    yield temp_path
-    
-    # Cleanup
-    os.unlink(temp_path)
+def memory_user_store(mock_user_data):
+    """Back every UserStore with mock_user_data in memory (no file reads or writes)."""
+    with swap_attr(UserStore, "_load_data", lambda self: mock_user_data), \
+            swap_attr(UserStore, "_save_data", lambda self: True), \
+            swap_attr(UserStore, "_append_ticket_log", lambda self, ticket: None), \
+            swap_attr(UserStore, "_sync_from_disk", lambda self: None), \
+            swap_attr(UserStore, "_file_lock", lambda self: nullcontext()), \
+            swap_attr(user_store, "_store", None):
+        yield mock_user_data
+
+
+class BagOfWordsEmbedding(Embeddings):
+    """Word-count vectors: sentences that differ by one word embed close, but not identical."""
+
+    SIZE = 1024
+
+    def _embed(self, text: str) -> list:
+        vector = [0.0] * self.SIZE
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % self.SIZE] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
 
 
 @pytest.fixture
+def word_semantic_cache():
+    """SemanticCache over BagOfWordsEmbedding, in a collection of its own."""
+    return SemanticCache(embeddings=BagOfWordsEmbedding(), collection_name=f"test_cache_{uuid.uuid4().hex}")
+
+
+@pytest.fixture(scope="session")
 def router_agent():
-    """Create router agent instance for testing."""
+    """Create router agent instance for testing (shared by the whole session)."""
     return RouterAgent()
 
 
+@pytest.fixture(scope="module")
+def knowledge_agent():
+    """KnowledgeAgent over a mocked vector store, shared by a module's read-only tests."""
+    with fast_patch('agents.knowledge_agent.Chroma'):
+        return KnowledgeAgent()
+
+
+@pytest.fixture(scope="module")
+def support_agent():
+    """SupportAgent shared by a module's read-only tests."""
+    return SupportAgent()
+
+
 @pytest.fixture
 def sample_queries():
     """Sample queries for testing."""
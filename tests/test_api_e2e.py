@@ -1,9 +1,13 @@
 """End-to-end tests for the FastAPI application."""
 
+import asyncio
 import json
 import pytest
 from datetime import datetime
 
+import httpx
+
+from api.main import app
 from tests.conftest import test_client
 
 
@@ -40,6 +44,16 @@ class TestAPIE2E:
         assert "support" in agents
         assert "personality" in agents
     
+    def test_probe_endpoints(self, test_client):
+        """Test liveness and readiness probes."""
+        livez = test_client.get("/livez")
+        readyz = test_client.get("/readyz")
+        
+        assert livez.status_code == 200
+        assert livez.json() == {"status": "ok"}
+        assert readyz.status_code == 200
+        assert readyz.json()["status"] in ["healthy", "degraded"]
+    
     def test_capabilities_endpoint(self, test_client):
         """Test capabilities endpoint."""
         response = test_client.get("/capabilities")
@@ -128,6 +142,22 @@ class TestAPIE2E:
         assert data["handoff_to_human"] is True
         assert "atendente humano" in data["answer"].lower()
     
+    def test_query_stream_endpoint(self, test_client):
+        """Test streaming endpoint emits SSE deltas followed by a done event."""
+        query_data = {
+            "message": "Preciso falar com um atendente humano"
+        }
+        
+        with test_client.stream("POST", "/query/stream", json=query_data) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = [json.loads(line[len("data: "):]) for line in response.iter_lines() if line.startswith("data: ")]
+        
+        answer = "".join(event.get("delta", "") for event in events)
+        assert "atendente humano" in answer.lower()
+        assert events[-1]["done"] is True
+        assert events[-1]["handoff_to_human"] is True
+    
     def test_query_endpoint_multi_intent(self, test_client):
         """Test query endpoint with multi-intent query."""
         query_data = {
@@ -199,22 +229,18 @@ class TestAPIE2E:
         # FastAPI validation errors have different format
         assert "detail" in data
     
-    def test_concurrent_queries(self, test_client):
+    async def test_concurrent_queries(self):
         """Test handling multiple concurrent queries."""
-        import concurrent.futures
-        
         queries = [
             {"message": "Qual é o meu saldo?", "user_id": "test_user_123"},
             {"message": "O que é o InfinitePay?"},
             {"message": "Preciso de ajuda"},
         ]
         
-        def send_query(query_data):
-            return test_client.post("/query", json=query_data)
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [executor.submit(send_query, query) for query in queries]
-            responses = [future.result() for future in concurrent.futures.as_completed(futures)]
+        # Drive the ASGI app directly so the requests really overlap on one event loop
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.post("/query", json=query) for query in queries))
         
         # All requests should succeed
         for response in responses:
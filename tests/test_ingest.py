@@ -0,0 +1,44 @@
+"""Tests for RAG ingestion helpers."""
+
+from unittest.mock import Mock
+
+from langchain_core.documents import Document
+
+from rag import ingest
+from rag.ingest import add_documents_batched, content_id
+from tests.conftest import swap_attr
+
+
+class TestAddDocumentsBatched:
+    """Test cases for add_documents_batched."""
+
+    def test_writes_one_add_texts_call_per_batch(self):
+        """Test chunks go to the store as column lists, one call per batch, skipping stored ones."""
+        docs = [Document(page_content=f"chunk {i}", metadata={"source": "s"}) for i in range(5)]
+        docs.append(Document(page_content="chunk 0", metadata={"source": "s"}))  # duplicate content
+        vectorstore = Mock()
+        vectorstore._collection.get.side_effect = lambda ids, include: {
+            "ids": [i for i in ids if i == content_id("chunk 1")]
+        }
+
+        added = add_documents_batched(vectorstore, docs, batch_size=2)
+
+        assert added == 4
+        batches = [c.kwargs for c in vectorstore.add_texts.call_args_list]
+        assert [b["texts"] for b in batches] == [["chunk 0"], ["chunk 2", "chunk 3"], ["chunk 4"]]
+        assert all(b["ids"] == [m["id"] for m in b["metadatas"]] for b in batches)
+
+
+class TestParsePool:
+    """Test cases for sizing the page parsing pool."""
+
+    def test_pool_is_sized_to_the_work(self):
+        """Test a few pages parse inline and larger runs get at most one worker per page, core and fetch slot."""
+        assert ingest._parse_pool(2) is None
+
+        with swap_attr(ingest.os, "cpu_count", lambda: 64):
+            pool = ingest._parse_pool(5)
+        try:
+            assert pool._max_workers == 5
+        finally:
+            pool.shutdown()
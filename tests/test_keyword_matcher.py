@@ -0,0 +1,33 @@
+"""Tests for the keyword matcher."""
+
+from unittest.mock import patch
+
+import pytest
+
+from tools.keyword_matcher import KeywordMatcher
+
+
+GROUPS = {
+    "support": ("saldo", "conta"),
+    "knowledge": ("como funciona", "taxa"),
+    "banking": ("conta corrente",),
+}
+
+
+class TestKeywordMatcher:
+    """Test cases for KeywordMatcher."""
+
+    @pytest.mark.parametrize("use_automaton", [True, False])
+    def test_tags_and_first(self, use_automaton):
+        """Test tags/first agree with and without pyahocorasick."""
+        if use_automaton:
+            matcher = KeywordMatcher.from_groups(GROUPS)
+        else:
+            with patch("tools.keyword_matcher.ahocorasick", None):
+                matcher = KeywordMatcher.from_groups(GROUPS)
+
+        assert matcher.tags("qual a taxa da minha conta?") == {"support", "knowledge"}
+        assert matcher.first("como funciona a maquininha") == "knowledge"
+        assert matcher.first("bom dia") is None
+        assert matcher.tags("") == set()
+        assert matcher.tags("minha conta corrente") == {"support", "banking"}
@@ -1,9 +1,49 @@
 """Tests for Knowledge Agent."""
 
+import uuid
+from types import SimpleNamespace
+
+import langchain_openai
 import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
 from unittest.mock import Mock, patch
 
+from agents import knowledge_agent as knowledge_agent_module
 from agents.knowledge_agent import KnowledgeAgent
+from rag.semantic_cache import SemanticCache
+from tests.conftest import fast_patch, swap_attr, swap_env
+
+
+@pytest.fixture
+def mock_doc_factory():
+    """Return a factory for source-document stand-ins (plain attribute bags) with the given attributes."""
+    def make(**attrs):
+        return SimpleNamespace(**{"metadata": {}, "page_content": "", **attrs})
+    return make
+
+
+@pytest.fixture(scope="module")
+def _qa_chain():
+    """RetrievalQA chain stand-in, built once per module."""
+    chain = Mock()
+    chain.invoke.return_value = {
+        "result": "O InfinitePay é uma empresa de pagamentos que oferece maquininhas e soluções financeiras.",
+        "source_documents": [
+            SimpleNamespace(metadata={"source": "https://example.com", "title": "Sobre"}, page_content="")
+        ],
+    }
+    return chain
+
+
+@pytest.fixture
+def mocked_qa_chain(_qa_chain):
+    """Make RetrievalQA.from_chain_type return the shared chain; per-test result changes are undone."""
+    default = _qa_chain.invoke.return_value
+    retrieval_qa = Mock(**{"from_chain_type.return_value": _qa_chain})
+    with swap_attr(knowledge_agent_module, "RetrievalQA", retrieval_qa):
+        yield _qa_chain
+    _qa_chain.invoke.return_value = default
+    _qa_chain.reset_mock()
 
 
 class TestKnowledgeAgent:
@@ -11,7 +51,7 @@ class TestKnowledgeAgent:
     
     def test_knowledge_agent_initialization(self):
         """Test knowledge agent initialization."""
-        with patch('agents.knowledge_agent.Chroma') as mock_chroma:
+        with fast_patch('agents.knowledge_agent.Chroma') as mock_chroma:
             mock_chroma.return_value._collection.count.return_value = 0
             
             agent = KnowledgeAgent()
@@ -22,7 +62,7 @@ class TestKnowledgeAgent:
     
     def test_knowledge_agent_with_mock_vectorstore(self):
         """Test knowledge agent with mock vector store."""
-        with patch('agents.knowledge_agent.Chroma') as mock_chroma:
+        with fast_patch('agents.knowledge_agent.Chroma') as mock_chroma:
             # Mock successful vector store
             mock_vectorstore = Mock()
             mock_vectorstore._collection.count.return_value = 10
@@ -35,7 +75,7 @@ class TestKnowledgeAgent:
     
     def test_process_query_no_vectorstore(self):
         """Test processing query when vector store is not available."""
-        with patch('agents.knowledge_agent.Chroma') as mock_chroma:
+        with fast_patch('agents.knowledge_agent.Chroma') as mock_chroma:
             mock_chroma.return_value._collection.count.return_value = 0
             
             agent = KnowledgeAgent()
@@ -46,15 +86,15 @@ class TestKnowledgeAgent:
             assert result["confidence"] == 0.0
             assert result["sources"] == []
     
-    def test_format_sources(self):
+    def test_format_sources(self, mock_doc_factory, knowledge_agent):
         """Test source formatting."""
-        agent = KnowledgeAgent()
+        agent = knowledge_agent
         
         # Mock source documents
         mock_docs = [
-            Mock(metadata={"source": "https://example.com", "title": "Example Page"}),
-            Mock(metadata={"source": "https://test.com", "title": ""}),
-            Mock(metadata={"source": "https://example.com", "title": "Example Page"}),  # Duplicate
+            mock_doc_factory(metadata={"source": "https://example.com", "title": "Example Page"}),
+            mock_doc_factory(metadata={"source": "https://test.com", "title": ""}),
+            mock_doc_factory(metadata={"source": "https://example.com", "title": "Example Page"}),  # Duplicate
         ]
         
         sources = agent._format_sources(mock_docs)
@@ -66,9 +106,9 @@ class TestKnowledgeAgent:
         assert "https://example.com" in source_contents
         assert "https://test.com" in source_contents
     
-    def test_calculate_confidence(self):
+    def test_calculate_confidence(self, mock_doc_factory, knowledge_agent):
         """Test confidence calculation."""
-        agent = KnowledgeAgent()
+        agent = knowledge_agent
         
         # Test with no documents
         confidence = agent._calculate_confidence([])
@@ -76,18 +116,18 @@ class TestKnowledgeAgent:
         
         # Test with mock documents
         mock_docs = [
-            Mock(page_content="a" * 500),
-            Mock(page_content="b" * 800),
-            Mock(page_content="c" * 300),
+            mock_doc_factory(page_content="a" * 500),
+            mock_doc_factory(page_content="b" * 800),
+            mock_doc_factory(page_content="c" * 300),
         ]
         
         confidence = agent._calculate_confidence(mock_docs)
         assert 0.3 < confidence <= 1.0  # Should have reasonable confidence
     
     
-    def test_create_qa_prompt(self):
+    def test_create_qa_prompt(self, knowledge_agent):
         """Test QA prompt creation."""
-        agent = KnowledgeAgent()
+        agent = knowledge_agent
         
         prompt = agent._create_qa_prompt()
         
@@ -97,23 +137,9 @@ class TestKnowledgeAgent:
         assert "RESPOSTA:" in prompt.template
         assert "português" in prompt.template.lower()
     
-    @patch('agents.knowledge_agent.RetrievalQA')
-    def test_process_query_with_mock_chain(self, mock_qa_class):
+    def test_process_query_with_mock_chain(self, mocked_qa_chain):
         """Test processing query with mocked QA chain."""
-        # Mock QA chain result
-        mock_result = {
-            "result": "O InfinitePay é uma empresa de pagamentos que oferece maquininhas e soluções financeiras.",
-            "source_documents": [
-                Mock(metadata={"source": "https://example.com", "title": "Sobre"})
-            ]
-        }
-        
-        # Mock the chain and its methods
-        mock_chain = Mock()
-        mock_chain.invoke.return_value = mock_result
-        mock_qa_class.from_chain_type.return_value = mock_chain
-        
-        with patch('agents.knowledge_agent.Chroma') as mock_chroma:
+        with fast_patch('agents.knowledge_agent.Chroma') as mock_chroma:
             mock_chroma.return_value._collection.count.return_value = 10
             
             agent = KnowledgeAgent()
@@ -124,18 +150,79 @@ class TestKnowledgeAgent:
             assert result["confidence"] > 0
             assert len(result["sources"]) > 0
     
+    def test_process_query_semantic_cache(self, mocked_qa_chain, mock_doc_factory):
+        """Test a repeated question is answered from the semantic cache without a second LLM call."""
+        cache = SemanticCache(
+            embeddings=DeterministicFakeEmbedding(size=32),
+            collection_name=f"test_cache_{uuid.uuid4().hex}",
+        )
+        with fast_patch('agents.knowledge_agent.Chroma'):
+            agent = KnowledgeAgent()
+        agent.vectorstore = Mock()
+        agent.vectorstore._collection.count.return_value = 20
+        agent.vectorstore.as_retriever.return_value.invoke.return_value = [mock_doc_factory()]
+
+        with swap_attr(knowledge_agent_module, "get_semantic_cache", lambda: cache):
+            first = agent.process_query("O que é o InfinitePay?")
+            second = agent.process_query("O que é o InfinitePay?")
+
+        assert second == first
+        assert "InfinitePay" in first["answer"]
+        mocked_qa_chain.invoke.assert_called_once()
+
+    def test_process_query_semantic_cache_keyed_by_context(self, mocked_qa_chain, mock_doc_factory, word_semantic_cache):
+        """Test near-identical questions about different products do not share a cached answer."""
+        chunks = {
+            "pix": mock_doc_factory(page_content="Taxa do Pix na maquininha: 0%."),
+            "boleto": mock_doc_factory(page_content="Taxa do boleto na maquininha: R$ 2,00."),
+        }
+        with fast_patch('agents.knowledge_agent.Chroma'):
+            agent = KnowledgeAgent()
+        agent.vectorstore = Mock()
+        agent.vectorstore._collection.count.return_value = 20
+        agent.vectorstore.as_retriever.return_value.invoke.side_effect = (
+            lambda query: [chunks["pix" if "pix" in query else "boleto"]]
+        )
+
+        with swap_attr(knowledge_agent_module, "get_semantic_cache", lambda: word_semantic_cache):
+            mocked_qa_chain.invoke.return_value = {"result": "O Pix não tem taxa.", "source_documents": [chunks["pix"]]}
+            pix = agent.process_query("qual é a taxa do pix na maquininha hoje")
+            mocked_qa_chain.invoke.return_value = {"result": "O boleto custa R$ 2,00.", "source_documents": [chunks["boleto"]]}
+            boleto = agent.process_query("qual é a taxa do boleto na maquininha hoje")
+
+        assert "Pix" in pix["answer"]
+        assert "boleto" in boleto["answer"]
+        assert mocked_qa_chain.invoke.call_count == 2
+
     def test_get_llm_openai(self):
         """Test LLM selection for OpenAI."""
-        with patch.dict('os.environ', {'MODEL_PROVIDER': 'openai', 'OPENAI_API_KEY': 'test-key'}):
-            with patch('langchain_openai.ChatOpenAI') as mock_openai:
+        with swap_env(MODEL_PROVIDER='openai', OPENAI_API_KEY='test-key'):
+            with swap_attr(langchain_openai, 'ChatOpenAI', Mock()) as mock_openai:
                 agent = KnowledgeAgent()
                 llm = agent._get_llm()
                 
                 mock_openai.assert_called_once()
     
+    def test_get_llm_openai_exact_cache(self):
+        """Test identical prompts hit the exact-match cache when LLM_EXACT_CACHE=1."""
+        from langchain_core.messages import AIMessage, HumanMessage
+        from langchain_openai import ChatOpenAI
+        from rag.config import create_llm
+
+        env = {'MODEL_PROVIDER': 'openai', 'OPENAI_API_KEY': 'test-key', 'LLM_EXACT_CACHE': '1'}
+        with patch.dict('os.environ', env):
+            with patch.object(ChatOpenAI, 'invoke', return_value=AIMessage(content="ok")) as mock_invoke:
+                llm = create_llm()
+                messages = [HumanMessage(content="exact cache test prompt")]
+                first = llm.invoke(messages)
+                second = create_llm().invoke(messages)
+
+        assert first.content == second.content == "ok"
+        mock_invoke.assert_called_once()
+
     def test_get_llm_local(self):
         """Test LLM selection for local/default."""
-        with patch.dict('os.environ', {'MODEL_PROVIDER': 'local'}):
+        with swap_env(MODEL_PROVIDER='local'):
             agent = KnowledgeAgent()
             llm = agent._get_llm()
             
@@ -145,7 +232,7 @@ class TestKnowledgeAgent:
     
     def test_error_handling(self):
         """Test error handling in query processing."""
-        with patch('agents.knowledge_agent.Chroma') as mock_chroma:
+        with fast_patch('agents.knowledge_agent.Chroma') as mock_chroma:
             mock_chroma.return_value._collection.count.return_value = 10
             
             agent = KnowledgeAgent()
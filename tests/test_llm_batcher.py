@@ -0,0 +1,49 @@
+"""Tests for LLM micro-batching."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+from rag.config import LLMBatcher, get_llm_batcher
+
+
+class TestLLMBatcher:
+    """Test cases for LLMBatcher."""
+
+    def _batcher(self, results, **kwargs):
+        llm = Mock()
+        llm.abatch = AsyncMock(side_effect=lambda inputs, **kw: [results[i] for i in inputs])
+        return LLMBatcher(llm_factory=lambda: llm, **kwargs), llm
+
+    async def test_concurrent_calls_share_one_batch(self):
+        """Test calls inside the window go out as one abatch call, deduplicated."""
+        batcher, llm = self._batcher({"a": "A", "b": "B"}, window_ms=10)
+
+        results = await asyncio.gather(batcher.ainvoke("a"), batcher.ainvoke("b"), batcher.ainvoke("a"))
+
+        assert results == ["A", "B", "A"]
+        llm.abatch.assert_awaited_once()
+        assert llm.abatch.await_args.args[0] == ["a", "b"]
+
+    async def test_full_batch_flushes_before_window(self):
+        """Test reaching max_size sends the batch without waiting for the window."""
+        batcher, llm = self._batcher({"a": "A", "b": "B"}, window_ms=10_000, max_size=2)
+
+        results = await asyncio.wait_for(asyncio.gather(batcher.ainvoke("a"), batcher.ainvoke("b")), timeout=1)
+
+        assert results == ["A", "B"]
+
+    async def test_errors_reach_each_caller(self):
+        """Test per-request exceptions are raised to the matching caller only."""
+        batcher, _ = self._batcher({"ok": "OK", "bad": ValueError("boom")}, window_ms=1)
+
+        ok, bad = await asyncio.gather(batcher.ainvoke("ok"), batcher.ainvoke("bad"), return_exceptions=True)
+
+        assert ok == "OK"
+        assert isinstance(bad, ValueError)
+
+    async def test_disabled_by_default(self):
+        """Test get_llm_batcher returns None unless LLM_BATCH=1."""
+        with patch.dict('os.environ', {'LLM_BATCH': '0'}):
+            assert get_llm_batcher() is None
+        with patch.dict('os.environ', {'LLM_BATCH': '1'}):
+            assert get_llm_batcher() is get_llm_batcher()
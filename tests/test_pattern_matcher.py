@@ -0,0 +1,34 @@
+"""Tests for the pattern matcher."""
+
+from unittest.mock import patch
+
+import pytest
+
+from tools import pattern_matcher
+from tools.pattern_matcher import PatternMatcher
+
+
+GROUPS = {
+    "support": (r"saldo\b", r"transações?\b", r"minha\s+conta\b"),
+    "knowledge": (r"como\s+funciona\b", r"taxas?\b"),
+}
+
+
+class TestPatternMatcher:
+    """Test cases for PatternMatcher."""
+
+    @pytest.mark.parametrize("use_hyperscan", [True, False])
+    def test_counts(self, use_hyperscan):
+        """Test counts agree with and without hyperscan."""
+        if use_hyperscan:
+            if pattern_matcher.hyperscan is None:
+                pytest.skip("hyperscan not installed")
+            matcher = PatternMatcher.from_groups(GROUPS)
+        else:
+            with patch("tools.pattern_matcher.hyperscan", None):
+                matcher = PatternMatcher.from_groups(GROUPS)
+
+        assert matcher.counts("saldo e transações da minha conta") == {"support": 3, "knowledge": 0}
+        assert matcher.counts("como funciona a taxa? e as taxas?") == {"support": 0, "knowledge": 2}
+        assert matcher.counts("saldos") == {"support": 0, "knowledge": 0}
+        assert list(matcher.counts("")) == ["support", "knowledge"]
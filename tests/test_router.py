@@ -8,59 +8,47 @@ from agents.router_agent import RouterAgent
 class TestRouterAgent:
     """Test cases for Router Agent."""
     
-    def test_classify_support_intent(self, router_agent):
+    @pytest.mark.parametrize("query", [
+        "Qual é o meu saldo?",
+        "Quero ver minhas transações",
+        "Estou com problema na minha conta",
+        "Meu ID é user123 e quero meu extrato",
+    ])
+    def test_classify_support_intent(self, router_agent, query):
         """Test classification of support intents."""
-        test_cases = [
-            ("Qual é o meu saldo?", "support"),
-            ("Quero ver minhas transações", "support"),
-            ("Estou com problema na minha conta", "support"),
-            ("Meu ID é user123 e quero meu extrato", "support"),
-        ]
-        
-        for query, expected_intent in test_cases:
-            intent, confidence = router_agent.classify_intent(query)
-            assert intent == expected_intent
-            assert confidence > 0.5
+        intent, confidence = router_agent.classify_intent(query)
+        assert intent == "support"
+        assert confidence > 0.5
     
-    def test_classify_knowledge_intent(self, router_agent):
+    @pytest.mark.parametrize("query", [
+        "O que é o InfinitePay?",
+        "Como funciona a maquininha?",
+        "Quais são as taxas?",
+        "Como faço para abrir uma conta?",
+    ])
+    def test_classify_knowledge_intent(self, router_agent, query):
         """Test classification of knowledge intents."""
-        test_cases = [
-            ("O que é o InfinitePay?", "knowledge"),
-            ("Como funciona a maquininha?", "knowledge"),
-            ("Quais são as taxas?", "knowledge"),
-            ("Como faço para abrir uma conta?", "knowledge"),
-        ]
-        
-        for query, expected_intent in test_cases:
-            intent, confidence = router_agent.classify_intent(query)
-            assert intent == "knowledge"
-            assert confidence > 0.5
+        intent, confidence = router_agent.classify_intent(query)
+        assert intent == "knowledge"
+        assert confidence > 0.5
     
-    def test_classify_escalation_intent(self, router_agent):
+    @pytest.mark.parametrize("query", [
+        "Preciso falar com um atendente humano",
+        "É urgente, me ajude imediatamente",
+        "Não estou entendendo nada",
+    ])
+    def test_classify_escalation_intent(self, router_agent, query):
         """Test classification of escalation intents."""
-        test_cases = [
-            ("Preciso falar com um atendente humano", "escalate"),
-            ("É urgente, me ajude imediatamente", "escalate"),
-            ("Não estou entendendo nada", "escalate"),
-        ]
-        
-        for query, expected_intent in test_cases:
-            intent, confidence = router_agent.classify_intent(query)
-            assert intent == "escalate"
-            assert confidence == 1.0
+        intent, confidence = router_agent.classify_intent(query)
+        assert intent == "escalate"
+        assert confidence == 1.0
     
-    def test_classify_unknown_intent(self, router_agent):
+    @pytest.mark.parametrize("query", ["asdfgh", "12345", ""])
+    def test_classify_unknown_intent(self, router_agent, query):
         """Test classification of unknown intents."""
-        test_cases = [
-            ("asdfgh", "unknown"),
-            ("12345", "unknown"),
-            ("", "unknown"),
-        ]
-        
-        for query, expected_intent in test_cases:
-            intent, confidence = router_agent.classify_intent(query)
-            assert intent == expected_intent
-            assert confidence < 0.5
+        intent, confidence = router_agent.classify_intent(query)
+        assert intent == "unknown"
+        assert confidence < 0.5
     
     def test_multi_intent_detection(self, router_agent):
         """Test detection of multi-intent queries."""
@@ -78,6 +66,15 @@ class TestRouterAgent:
         assert "intent" in result
         assert "confidence" in result
     
+    async def test_aroute_support_query(self, router_agent):
+        """Test async routing of support queries."""
+        query = "Não consigo fazer transferência"
+        result = await router_agent.aroute_query(query, user_id="user789", lang="pt")
+
+        assert result["agent_used"] == "support"
+        assert result["tool_used"] == "diagnose_transfers"
+        assert result["intent"] == "support"
+
     def test_route_knowledge_query(self, router_agent):
         """Test routing knowledge queries."""
         query = "O que é o InfinitePay?"
@@ -104,41 +101,34 @@ class TestRouterAgent:
         assert "sub_queries" in result
         assert len(result["sub_queries"]) >= 2
     
-    def test_escalation_patterns(self, router_agent):
+    async def test_aroute_multi_intent_query(self, router_agent):
+        """Test async routing of multi-intent queries keeps sub-query order."""
+        query = "Quero saber meu saldo e também como funciona a maquininha"
+        result = await router_agent.aroute_query(query, user_id="test_user_123")
+
+        assert result["intent"] == "multi_intent"
+        assert len(result["agents_used"]) == len(result["sub_queries"]) >= 2
+        assert result["answer"].index(result["sub_queries"][0]) < result["answer"].index(result["sub_queries"][1])
+
+    @pytest.mark.parametrize("query", [
+        "É urgente!",
+        "Preciso falar com humano",
+        "Não entendi nada",
+        "Já tentei várias vezes",
+    ])
+    def test_escalation_patterns(self, router_agent, query):
         """Test escalation pattern detection."""
-        escalation_queries = [
-            "É urgente!",
-            "Preciso falar com humano",
-            "Não entendi nada",
-            "Já tentei várias vezes",
-        ]
-        
-        for query in escalation_queries:
-            assert router_agent._check_escalation(query.lower()) is True
+        assert router_agent._check_escalation(query.lower()) is True
     
-    def test_support_keywords(self, router_agent):
+    @pytest.mark.parametrize("query", ["minha conta", "meu saldo", "transação", "problema com"])
+    def test_support_keywords(self, router_agent, query):
         """Test support keyword detection."""
-        support_queries = [
-            "minha conta",
-            "meu saldo",
-            "transação",
-            "problema com",
-        ]
-        
-        for query in support_queries:
-            assert router_agent._has_support_keywords(query) is True
+        assert router_agent._has_support_keywords(query) is True
     
-    def test_knowledge_keywords(self, router_agent):
+    @pytest.mark.parametrize("query", ["o que é", "como funciona", "taxa", "produto"])
+    def test_knowledge_keywords(self, router_agent, query):
         """Test knowledge keyword detection."""
-        knowledge_queries = [
-            "o que é",
-            "como funciona",
-            "taxa",
-            "produto",
-        ]
-        
-        for query in knowledge_queries:
-            assert router_agent._has_knowledge_keywords(query) is True
+        assert router_agent._has_knowledge_keywords(query) is True
     
     def test_agent_capabilities(self, router_agent):
         """Test agent capabilities retrieval."""
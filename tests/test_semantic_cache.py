@@ -0,0 +1,51 @@
+"""Tests for the semantic response cache."""
+
+import uuid
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from rag.semantic_cache import SemanticCache, make_cache_key
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache."""
+
+    def _cache(self, **kwargs):
+        # Unique collection per test so entries don't leak between cases
+        return SemanticCache(
+            embeddings=DeterministicFakeEmbedding(size=32),
+            collection_name=f"test_cache_{uuid.uuid4().hex}",
+            **kwargs,
+        )
+
+    def test_hit_for_same_query_and_key(self):
+        """Test a stored response is returned for the same query and key."""
+        cache = self._cache()
+        key = make_cache_key("facts", "pt")
+        cache.add("qual meu saldo", key, "Seu saldo é R$ 10,00")
+
+        assert cache.lookup("qual meu saldo", key) == "Seu saldo é R$ 10,00"
+
+    def test_miss_for_different_key(self):
+        """Test responses are not shared across keys (e.g. different facts)."""
+        cache = self._cache()
+        cache.add("qual meu saldo", make_cache_key("facts-a", "pt"), "A")
+
+        assert cache.lookup("qual meu saldo", make_cache_key("facts-b", "pt")) is None
+
+    def test_expired_entries_are_skipped(self):
+        """Test entries past their TTL are ignored."""
+        cache = self._cache(ttl=-1)
+        key = make_cache_key("facts", "pt")
+        cache.add("qual meu saldo", key, "A")
+
+        assert cache.lookup("qual meu saldo", key) is None
+
+    def test_expired_entries_are_deleted_on_write(self):
+        """Test writes purge entries past their TTL instead of keeping them forever."""
+        cache = self._cache(ttl=-1, purge_interval=0)
+        key = make_cache_key("facts", "pt")
+        cache.add("qual meu saldo", key, "A")
+        cache.add("ver extrato", key, "B")
+
+        assert cache.store._collection.count() == 1
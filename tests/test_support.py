@@ -3,10 +3,13 @@
 import json
 import tempfile
 from pathlib import Path
+from unittest.mock import Mock, patch
 
 import pytest
 
-from agents.support_agent import SupportAgent
+from agents import support_agent as support_agent_module
+from agents.support_agent import SupportAgent, format_brl
+from tests.conftest import swap_attr
 from tools.user_store import get_account_details, get_recent_transactions, open_support_ticket
 
 
@@ -23,21 +26,14 @@ class TestSupportAgent:
         assert "get_recent_transactions" in [tool.name for tool in agent.get_tools()]
         assert "open_support_ticket" in [tool.name for tool in agent.get_tools()]
     
-    def test_get_account_details_existing_user(self, temp_mock_data):
+    def test_get_account_details_existing_user(self, memory_user_store):
         """Test getting account details for existing user."""
-        # Temporarily replace the data path
-        original_path = "data/mock/users.json"
-        
-        try:
-            # Use the temp file
-            result = get_account_details("test_user_123")
-            
-            assert "Test User" in result
-            assert "R$ 1.500,00" in result  # Check balance formatting
-            assert "✅" in result  # Status emoji
-            assert "Empresarial" in result  # Account type
-        finally:
-            pass  # Restore original behavior
+        result = get_account_details("test_user_123")
+        
+        assert "Test User" in result
+        assert "R$ 1.500,00" in result  # Check balance formatting
+        assert "✅" in result  # Status emoji
+        assert "Empresarial" in result  # Account type
     
     def test_get_account_details_non_existing_user(self):
         """Test getting account details for non-existing user."""
@@ -46,7 +42,7 @@ class TestSupportAgent:
         assert "❌" in result
         assert "não encontrado" in result.lower()
     
-    def test_get_recent_transactions(self, temp_mock_data):
+    def test_get_recent_transactions(self, memory_user_store):
         """Test getting recent transactions."""
         result = get_recent_transactions("test_user_123", limit=5)
         
@@ -60,7 +56,7 @@ class TestSupportAgent:
         
         assert "não encontrado" in result.lower()
     
-    def test_open_support_ticket(self, temp_mock_data):
+    def test_open_support_ticket(self, memory_user_store):
         """Test opening a support ticket."""
         result = open_support_ticket(
             "test_user_123",
@@ -72,6 +68,58 @@ class TestSupportAgent:
         assert "Ticket Criado" in result
         assert "Test Subject" in result
         assert "ticket" in result.lower()
+        assert memory_user_store["support_tickets"][-1]["subject"] == "Test Subject"
+        assert memory_user_store["support_tickets"][-1]["id"] == "ticket001"
+    
+    def test_user_store_is_shared(self, memory_user_store):
+        """Test tool calls reuse one loaded store, so new tickets are visible to later calls."""
+        from tools.user_store import get_user_store
+
+        store = get_user_store()
+        open_support_ticket("test_user_123", "Shared", "Ticket seen by the next call")
+        
+        assert get_user_store() is store
+        assert store.user_exists("test_user_123") and not store.user_exists("non_existing_user")
+        assert [t["subject"] for t in store.get_user_support_tickets("test_user_123")] == ["Shared"]
+    
+    def test_ticket_log_is_replayed_and_flushed(self, mock_user_data, tmp_path):
+        """Test new tickets go to the append-only log, survive a reload, and are compacted by flush."""
+        from tools.user_store import UserStore
+
+        data_file = tmp_path / "users.json"
+        data_file.write_text(json.dumps(mock_user_data), encoding="utf-8")
+        original = data_file.read_bytes()
+
+        store = UserStore(data_path=str(data_file))
+        ticket = store.create_support_ticket("test_user_123", "Logged", "Appended, not rewritten")
+
+        assert data_file.read_bytes() == original
+        assert len(store.ticket_log_path.read_text(encoding="utf-8").splitlines()) == 1
+        assert UserStore(data_path=str(data_file)).get_user_support_tickets("test_user_123") == [ticket]
+
+        store.flush()
+
+        assert not store.ticket_log_path.exists()
+        assert json.loads(data_file.read_text(encoding="utf-8"))["support_tickets"] == [ticket]
+    
+    def test_ticket_log_is_shared_between_processes(self, mock_user_data, tmp_path):
+        """Test stores over one data file (one per API worker) never reuse ids or drop logged tickets."""
+        from tools.user_store import UserStore
+
+        data_file = tmp_path / "users.json"
+        data_file.write_text(json.dumps(mock_user_data), encoding="utf-8")
+        first, second = UserStore(data_path=str(data_file)), UserStore(data_path=str(data_file))
+
+        a = first.create_support_ticket("test_user_123", "A", "From the first worker")
+        b = second.create_support_ticket("test_user_123", "B", "From the second worker")
+        first.flush()
+        c = second.create_support_ticket("test_user_123", "C", "After the compaction")
+        second.flush()
+
+        assert [a["id"], b["id"], c["id"]] == ["ticket001", "ticket002", "ticket003"]
+        saved = json.loads(data_file.read_text(encoding="utf-8"))["support_tickets"]
+        assert [t["subject"] for t in saved] == ["A", "B", "C"]
+        assert not second.ticket_log_path.exists()
     
     def test_open_support_ticket_non_existing_user(self):
         """Test opening ticket for non-existing user."""
@@ -112,6 +160,101 @@ class TestSupportAgent:
         assert result["agent_used"] == "support"
         # Should ask for more details about the problem
     
+    async def test_support_agent_transfer_query_async(self):
+        """Test async transfer diagnostics for a suspended account."""
+        agent = SupportAgent()
+        
+        result = await agent.aprocess_query("Não consigo fazer transferência", user_id="user789")
+        
+        assert result["agent_used"] == "support"
+        assert result["tool_used"] == "diagnose_transfers"
+        assert "Dados da Conta" in result["answer"]
+
+    async def test_support_agent_general_query_astream(self):
+        """Test general support answers stream as async text chunks."""
+        agent = SupportAgent()
+
+        assert agent.can_stream("Bom dia, tudo bem?", user_id="user123")
+        chunks = [chunk async for chunk in agent.astream_general_support_query("Bom dia, tudo bem?", user_id="user123")]
+
+        assert chunks
+        assert "".join(chunks).strip()
+
+    def test_support_agent_transfer_malformed_user_record(self, memory_user_store):
+        """Test diagnostics read missing or malformed user fields as unknown instead of failing."""
+        user = memory_user_store["users"][0]
+        user["status"], user["balance"] = None, "n/a"
+        agent = SupportAgent()
+
+        with patch.object(agent, "_summarize_support_facts_with_llm", return_value=None):
+            result = agent.process_query("Não consigo fazer transferência", user_id="test_user_123")
+
+        assert result["tool_used"] == "diagnose_transfers"
+        assert "unknown" in result["answer"]
+
+    def test_support_agent_diagnostics_store_error_falls_back(self):
+        """Test a user store I/O error falls back to the general support answer."""
+        agent = SupportAgent()
+
+        def unreadable():
+            raise PermissionError("users.json")
+
+        with patch("agents.support_agent.get_user_store", unreadable):
+            result = agent.process_query("Não consigo fazer login", user_id="user123")
+
+        assert result["agent_used"] == "support"
+        assert result["tool_used"] != "diagnose_login"
+
+    def test_support_agent_restricted_account_skips_llm(self):
+        """Test a suspended account is explained from the template without an LLM call."""
+        agent = SupportAgent()
+
+        with patch.object(agent, "_get_llm") as mock_get_llm:
+            result = agent.process_query("Não consigo fazer transferência", user_id="user789", lang="pt")
+
+        mock_get_llm.assert_not_called()
+        assert "status da sua conta" in result["answer"]
+        assert "Dados da Conta" in result["answer"]
+
+    def test_support_agent_ticket_retry_is_idempotent(self):
+        """Test a repeated ticket request reuses the ticket created first."""
+        agent = SupportAgent()
+        query = "Preciso de suporte, o aplicativo fecha sozinho ao abrir. Já reinstalei."
+        ticket = {"id": "ticket_idem", "subject": "x", "status": "open"}
+
+        with patch("tools.user_store.UserStore.create_support_ticket", return_value=ticket) as mock_create:
+            first = agent.process_query(query, user_id="user123")
+            second = agent.process_query(query, user_id="user123")
+
+        assert mock_create.call_count == 1
+        assert "ticket_idem" in first["answer"]
+        assert second["answer"] == first["answer"]
+
+    def test_ticket_idempotency_key_covers_full_description(self):
+        """Test tickets that only differ after a long shared prefix are not treated as retries."""
+        from agents.support_agent import _ticket_idempotency_key
+
+        prefix = "x" * 300
+        assert _ticket_idempotency_key("user123", "App", prefix + " a") != _ticket_idempotency_key("user123", "App", prefix + " b")
+
+    def test_general_answers_are_not_shared_by_near_miss_queries(self, word_semantic_cache):
+        """Test a cached general answer is reused for the same question but not for one that differs by a word."""
+        agent = SupportAgent()
+        llm = Mock()
+        llm.invoke.side_effect = lambda messages: Mock(content=f"answer to {messages[-1].content}")
+        pix = "qual é o prazo do pix na maquininha hoje"
+        boleto = "qual é o prazo do boleto na maquininha hoje"
+
+        with swap_attr(support_agent_module, "get_semantic_cache", lambda: word_semantic_cache), \
+                patch.object(agent, "_get_llm", return_value=llm):
+            first = agent._handle_general_support_query(pix, None)
+            repeat = agent._handle_general_support_query(pix, None)
+            other = agent._handle_general_support_query(boleto, None)
+
+        assert repeat["answer"] == first["answer"]
+        assert "boleto" in other["answer"]
+        assert llm.invoke.call_count == 2
+
     def test_support_agent_requires_user_id(self):
         """Test support agent requiring user ID."""
         agent = SupportAgent()
@@ -137,18 +280,24 @@ class TestSupportAgent:
         suggestions = get_tool_suggestions("Preciso de ajuda")
         assert "open_support_ticket" in suggestions
     
-    def test_extract_limit(self):
+    def test_extract_limit(self, support_agent):
         """Test limit extraction from query."""
-        agent = SupportAgent()
+        agent = support_agent
         
         assert agent._extract_limit("Mostre 10 transações") == 10
         assert agent._extract_limit("Quero ver 3 movimentações") == 3
         assert agent._extract_limit("Mostre transações") == 5  # Default
         assert agent._extract_limit("Mostre 100 transações") == 50  # Max limit
     
-    def test_extract_ticket_info(self):
+    def test_format_brl(self):
+        """Test Brazilian currency formatting."""
+        assert format_brl(0) == "R$ 0,00"
+        assert format_brl(1234.5) == "R$ 1.234,50"
+        assert format_brl(-9876543.219) == "R$ -9.876.543,22"
+    
+    def test_extract_ticket_info(self, support_agent):
         """Test ticket info extraction."""
-        agent = SupportAgent()
+        agent = support_agent
         
         subject, description = agent._extract_ticket_info(
             "Estou com problema na maquininha. Ela não conecta no Wi-Fi e já tentei reiniciar várias vezes."
@@ -158,9 +307,9 @@ class TestSupportAgent:
         assert description is not None
         assert "problema na maquininha" in subject.lower()
     
-    def test_support_agent_default_response(self):
+    def test_support_agent_default_response(self, support_agent):
         """Test support agent default response for unclear queries."""
-        agent = SupportAgent()
+        agent = support_agent
         
         result = agent.process_query("asdfgh", user_id="test_user_123")
         
@@ -0,0 +1,114 @@
+"""Tests for the ticket sink."""
+
+import asyncio
+import json
+from contextlib import ExitStack, contextmanager
+
+import httpx
+import pytest
+
+from tests.conftest import swap_attr, swap_env
+from tools import ticket_sink
+
+
+@pytest.fixture(autouse=True)
+def no_asyncio_worker():
+    """Hide the asyncio worker a session-scoped TestClient may have started."""
+    with swap_attr(ticket_sink, "_queue", None):
+        yield
+
+
+@contextmanager
+def webhook_url(url):
+    """Set SUPPORT_WEBHOOK_URL and make the sink re-read its configuration."""
+    with swap_env(SUPPORT_WEBHOOK_URL=url):
+        ticket_sink.reload_config()
+        try:
+            yield
+        finally:
+            ticket_sink.reload_config()
+
+
+@pytest.fixture
+def webhook():
+    """Route the shared sync client to an in-process webhook; yields posted payloads."""
+    posted = []
+
+    def handler(request):
+        posted.append(request)
+        return httpx.Response(200, json={"id": len(posted), "status": "open"})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    with webhook_url("https://hooks.test/tickets"):
+        with swap_attr(ticket_sink, "_client", client):
+            yield posted
+    client.close()
+
+
+class TestTicketSink:
+    """Test cases for the ticket sink."""
+
+    def test_post_ticket_without_url_is_noop(self):
+        """Test post_ticket returns {} when no webhook is configured."""
+        with webhook_url(""):
+            assert ticket_sink.post_ticket({"subject": "x"}) == {}
+            assert ticket_sink.enqueue_ticket({"subject": "x"}) is False
+
+    def test_post_ticket(self, webhook):
+        """Test post_ticket normalizes the webhook response."""
+        assert ticket_sink.post_ticket({"subject": "çã"}) == {"remote_id": "1", "status": "open"}
+        assert webhook[0].headers["content-type"] == "application/json"
+        assert json.loads(webhook[0].content) == {"subject": "çã"}
+
+    def test_post_ticket_network_error(self):
+        """Test transport failures are logged and reported as a failed post."""
+        def handler(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with webhook_url("https://hooks.test/tickets"), swap_attr(ticket_sink, "_client", client):
+            assert ticket_sink.post_ticket({"subject": "x"}) == {}
+        client.close()
+
+    def test_parse_response_non_json(self):
+        """Test a non-JSON webhook reply still counts as posted."""
+        assert ticket_sink._parse_response(httpx.Response(200, text="ok")) == {"status": "posted"}
+        assert ticket_sink._parse_response(httpx.Response(200, json=[1])) == {"status": "posted"}
+
+    def test_parse_response_error_status(self):
+        """Test a non-2xx reply is reported as a failed post."""
+        assert ticket_sink._parse_response(httpx.Response(503, json={"id": 1})) == {}
+
+    def test_enqueue_ticket_uses_thread_worker(self, webhook):
+        """Test payloads queued without the asyncio worker are posted by the thread worker."""
+        for i in range(3):
+            assert ticket_sink.enqueue_ticket({"local_ticket_id": i}) is True
+
+        assert ticket_sink.flush_tickets(timeout=5)
+        assert len(webhook) == 3
+
+    async def test_stop_ticket_worker_posts_everything(self):
+        """Test stopping the asyncio worker right after enqueueing still posts every payload."""
+        posted = []
+
+        async def handler(request):
+            await asyncio.sleep(0.05)  # keep posts in flight while the worker is stopped
+            posted.append(json.loads(request.content))
+            return httpx.Response(200, json={"id": len(posted)})
+
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with ExitStack() as stack:
+            stack.enter_context(webhook_url("https://hooks.test/tickets"))
+            for name in ("_loop", "_worker_task"):
+                stack.enter_context(swap_attr(ticket_sink, name, None))
+            stack.enter_context(swap_attr(ticket_sink, "_async_clients", {loop: client}))
+
+            ticket_sink.start_ticket_worker()
+            for i in range(3):
+                assert ticket_sink.enqueue_ticket({"local_ticket_id": i}) is True
+            await asyncio.sleep(0.01)
+            await ticket_sink.stop_ticket_worker()
+
+        assert sorted(p["local_ticket_id"] for p in posted) == [0, 1, 2]
+        assert client.is_closed
@@ -0,0 +1,108 @@
+"""Tests for the web search tool."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from tests.conftest import swap_attr
+from tools import web_search
+from tools.web_search import WebSearchTool
+
+
+@pytest.fixture
+async def brave():
+    """Serve Brave API requests in-process through the running loop's shared client."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"web": {"results": [
+            {"title": "InfinitePay", "url": "https://infinitepay.io", "description": "Maquininha", "age": "1d"},
+        ]}})
+
+    loop = asyncio.get_running_loop()
+    web_search._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    web_search._RESULTS_CACHE.clear()
+    yield requests
+    web_search._RESULTS_CACHE.clear()
+    await web_search.close_client()
+
+
+class TestWebSearchTool:
+    """Test cases for WebSearchTool."""
+
+    async def test_search_without_api_key(self):
+        """Test search returns no results when no API key is configured."""
+        assert await WebSearchTool().search("infinitepay") == []
+
+    async def test_search_reuses_client(self, brave):
+        """Test searches parse Brave results and share one client per loop."""
+        tool = WebSearchTool(api_key="test-key")
+        client = web_search._get_client()
+
+        first = await tool.search("infinitepay")
+        second = await tool.search("maquininha")
+
+        assert first == second == [
+            {"title": "InfinitePay", "url": "https://infinitepay.io", "description": "Maquininha", "age": "1d"}
+        ]
+        assert web_search._get_client() is client
+        assert [r.headers["X-Subscription-Token"] for r in brave] == ["test-key", "test-key"]
+
+    async def test_search_results_are_cached(self, brave):
+        """Test a repeated query is answered from the TTL cache without another request."""
+        tool = WebSearchTool(api_key="test-key")
+
+        first = await tool.search("infinitepay")
+        second = await tool.search("infinitepay")
+
+        assert second == first
+        assert len(brave) == 1
+
+    async def test_search_many_keeps_query_order(self, brave):
+        """Test search_many runs every query and returns results per query, in order."""
+        results = await WebSearchTool(api_key="test-key").search_many(["a", "b", "c"])
+
+        assert len(results) == 3
+        assert all(r and r[0]["title"] == "InfinitePay" for r in results)
+        assert sorted(r.url.params["q"] for r in brave) == ["a", "b", "c"]
+
+    def test_sync_wrapper_reuses_background_loop(self):
+        """Test web_search() runs on one long-lived loop instead of a new loop per call."""
+        assert web_search.web_search("infinitepay") == "Não encontrei informações adicionais na web."
+        loop = web_search._get_loop()
+        web_search.web_search("maquininha")
+
+        assert web_search._get_loop() is loop
+        assert loop.is_running()
+
+    def test_sync_wrapper_timeout_returns_no_results(self):
+        """Test a search slower than SYNC_SEARCH_TIMEOUT returns the no-results text instead of raising."""
+        started = []
+
+        async def slow_search(self, query, num_results=3):
+            started.append(asyncio.current_task())
+            await asyncio.sleep(5)
+            return [{"title": "late"}]
+
+        with swap_attr(WebSearchTool, "search", slow_search), swap_attr(web_search, "SYNC_SEARCH_TIMEOUT", 0.05):
+            assert web_search.web_search("infinitepay") == "Não encontrei informações adicionais na web."
+
+        # The abandoned search is cancelled on the background loop
+        task = started[0]
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), web_search._get_loop()).result(timeout=1)
+        assert task.cancelled()
+
+    def test_sync_many_returns_partial_results_on_timeout(self):
+        """Test web_search_many keeps finished results and returns no-results text for slow queries."""
+        async def search(self, query, num_results=3):
+            if query == "slow":
+                await asyncio.sleep(5)
+            return [{"title": query, "description": "d", "url": "https://infinitepay.io"}]
+
+        with swap_attr(WebSearchTool, "search", search), swap_attr(web_search, "SYNC_SEARCH_TIMEOUT", 0.1):
+            fast, slow = web_search.web_search_many(["fast", "slow"])
+
+        assert "**1. fast**" in fast
+        assert slow == "Não encontrei informações adicionais na web."
@@ -0,0 +1,74 @@
+"""Multi-keyword substring matching in a single pass over the text.
+
+Keyword checks like ``any(k in text for k in keywords)`` rescan the text once
+per keyword. KeywordMatcher compiles all keywords into one Aho-Corasick
+automaton (pyahocorasick) so a single linear scan finds every keyword and
+reports the tag attached to it. Without pyahocorasick it falls back to
+precompiled ``re`` alternations (one per tag, plus one over every keyword),
+which still scan in C instead of looping over keywords in Python.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, Optional, Set
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; fall back to substring scans
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """Find which tagged keywords occur (as substrings) in a text."""
+
+    def __init__(self, keywords: Dict[str, str]):
+        """Build the matcher from a ``{keyword: tag}`` mapping."""
+        self._keywords = dict(keywords)
+        self._automaton = None
+        self._any_re = None
+        self._tag_res: Dict[str, "re.Pattern[str]"] = {}
+        if not self._keywords:
+            return
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for keyword, tag in self._keywords.items():
+                automaton.add_word(keyword, tag)
+            automaton.make_automaton()
+            self._automaton = automaton
+            return
+        by_tag: Dict[str, list] = {}
+        for keyword, tag in self._keywords.items():
+            by_tag.setdefault(tag, []).append(keyword)
+        self._tag_res = {tag: _alternation(words) for tag, words in by_tag.items()}
+        self._any_re = _alternation(self._keywords)
+
+    @classmethod
+    def from_groups(cls, groups: Dict[str, Iterable[str]]) -> "KeywordMatcher":
+        """Build from ``{tag: keywords}``; a keyword listed twice keeps its first tag."""
+        keywords: Dict[str, str] = {}
+        for tag, words in groups.items():
+            for word in words:
+                keywords.setdefault(word, tag)
+        return cls(keywords)
+
+    def first(self, text: str) -> Optional[str]:
+        """Tag of the first keyword found in `text`, or None."""
+        if self._automaton is not None:
+            for _, tag in self._automaton.iter(text):
+                return tag
+            return None
+        if self._any_re is None:
+            return None
+        match = self._any_re.search(text)
+        return self._keywords[match.group()] if match else None
+
+    def tags(self, text: str) -> Set[str]:
+        """Tags of every keyword found in `text`."""
+        if self._automaton is not None:
+            return {tag for _, tag in self._automaton.iter(text)}
+        return {tag for tag, pattern in self._tag_res.items() if pattern.search(text)}
+
+
+def _alternation(keywords: Iterable[str]) -> "re.Pattern[str]":
+    """One regex matching any of `keywords` literally, longest first at a position."""
+    return re.compile("|".join(map(re.escape, sorted(keywords, key=len, reverse=True))))
@@ -0,0 +1,74 @@
+"""Multi-regex matching in a single pass over the text.
+
+Scoring a text against a family of regexes with ``pattern.search`` runs the
+backtracking engine once per pattern. PatternMatcher compiles every pattern
+into one Hyperscan database when ``hyperscan`` is installed, so a single scan
+reports which patterns matched and the tag attached to each. Without hyperscan
+(or if a pattern is outside its supported syntax) it falls back to precompiled
+``re`` patterns with the same results.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+try:
+    import hyperscan
+except ImportError:  # hyperscan is optional; fall back to the re module
+    hyperscan = None
+
+logger = logging.getLogger(__name__)
+
+
+class PatternMatcher:
+    """Count which tagged regexes match a text."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        """Build the matcher from ``(tag, pattern)`` pairs."""
+        self._patterns: List[Tuple[str, "re.Pattern[str]"]] = [
+            (tag, re.compile(pattern)) for tag, pattern in patterns
+        ]
+        self._tags = list(dict.fromkeys(tag for tag, _ in self._patterns))
+        self._database = self._compile_database() if hyperscan is not None else None
+
+    @classmethod
+    def from_groups(cls, groups: Dict[str, Iterable[str]]) -> "PatternMatcher":
+        """Build from ``{tag: patterns}``."""
+        return cls((tag, pattern) for tag, patterns in groups.items() for pattern in patterns)
+
+    def _compile_database(self):
+        if not self._patterns:
+            return None
+        flags = hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH
+        database = hyperscan.Database()
+        try:
+            database.compile(
+                expressions=[compiled.pattern.encode("utf-8") for _, compiled in self._patterns],
+                ids=list(range(len(self._patterns))),
+                elements=len(self._patterns),
+                flags=[flags] * len(self._patterns),
+            )
+        except hyperscan.error as e:
+            logger.warning("hyperscan compile failed, using re: %s", e)
+            return None
+        return database
+
+    def _matched(self, text: str) -> Set[int]:
+        """Indices of the patterns that match `text`."""
+        if self._database is not None:
+            matched: Set[int] = set()
+
+            def on_match(pattern_id, start, end, flags, context):
+                matched.add(pattern_id)
+
+            self._database.scan(text.encode("utf-8"), match_event_handler=on_match)
+            return matched
+        return {i for i, (_, compiled) in enumerate(self._patterns) if compiled.search(text)}
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Number of matching patterns per tag, in tag order (every tag is present)."""
+        scores = dict.fromkeys(self._tags, 0)
+        for i in self._matched(text):
+            scores[self._patterns[i][0]] += 1
+        return scores
@@ -2,54 +2,346 @@
 
 If SUPPORT_WEBHOOK_URL is not configured, post_ticket() becomes a no-op and
 returns an empty dict.
+
+Code already running on an event loop can await post_ticket_async() instead.
+Callers can hand payloads to enqueue_ticket() instead and return without
+waiting for the webhook round-trip. When the API has started the asyncio
+worker (start_ticket_worker) it drains the queue in small batches; otherwise a
+daemon thread posts them over the shared sync client.
 """
 from __future__ import annotations
 
+import asyncio
+import atexit
+import functools
 import os
 import logging
-from typing import Dict, Any
+import queue
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 
 import httpx
 
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib
+    import json
+
+    def _json_dumps(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+_client: Optional[httpx.Client] = None
+
+
+def _get_client() -> httpx.Client:
+    """Shared client for post_ticket(), so repeat posts reuse the TLS connection."""
+    global _client
+    if _client is None:
+        _client = httpx.Client(timeout=6.0, limits=httpx.Limits(max_keepalive_connections=4))
+    return _client
+
+
+@atexit.register
+def _close_client() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
 
 def post_ticket(payload: Dict[str, Any]) -> Dict[str, Any]:
     """Post ticket payload to an external webhook if configured.
 
-    Reads SUPPORT_WEBHOOK_URL and SUPPORT_WEBHOOK_TOKEN from environment.
+    Reads SUPPORT_WEBHOOK_URL and SUPPORT_WEBHOOK_TOKEN from environment
+    (once; see reload_config()).
     Returns a dict, possibly containing {"remote_id": str, "status": str}.
 
     In absence of configuration or on failure, returns {} and logs a warning.
     """
-    url = os.getenv("SUPPORT_WEBHOOK_URL")
-    token = os.getenv("SUPPORT_WEBHOOK_TOKEN")
+    url = _webhook_url()
 
     if not url:
         # No sink configured; noop
         return {}
 
+    try:
+        resp = _get_client().post(url, content=_json_dumps(payload), headers=_headers())
+        return _parse_response(resp)
+    except httpx.HTTPError as e:  # timeouts, transport errors; bugs propagate
+        logger.warning("post_ticket() failed: %s", e)
+        return {}
+
+
+@functools.lru_cache(maxsize=1)
+def _config() -> Tuple[Optional[str], Dict[str, str]]:
+    """Webhook URL and request headers, read from the environment on first use."""
+    token = os.getenv("SUPPORT_WEBHOOK_TOKEN")
     headers = {"Content-Type": "application/json"}
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    return os.getenv("SUPPORT_WEBHOOK_URL") or None, headers
+
+
+def reload_config() -> None:
+    """Re-read SUPPORT_WEBHOOK_URL/SUPPORT_WEBHOOK_TOKEN (e.g. after tests change them)."""
+    _config.cache_clear()
+
+
+def _webhook_url() -> Optional[str]:
+    return _config()[0]
+
+
+def _headers() -> Dict[str, str]:
+    return _config()[1]
 
+
+def _parse_response(resp: httpx.Response) -> Dict[str, Any]:
+    status_code = resp.status_code
+    if not 200 <= status_code < 300:
+        # Plain status check instead of raise_for_status(): no exception on the error path
+        logger.warning("post_ticket() failed: status=%d body=%r", status_code, resp.text[:200])
+        return {}
+    # Parse the body directly rather than probing Content-Type; webhooks almost always return JSON
     try:
-        with httpx.Client(timeout=6.0) as client:
-            resp = client.post(url, json=payload, headers=headers)
-            resp.raise_for_status()
-            data = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
-            # Normalize a couple of common fields
-            remote_id = (
-                data.get("id")
-                or data.get("ticket_id")
-                or data.get("remote_id")
-            )
-            status = data.get("status") or "posted"
-            result = {}
-            if remote_id:
-                result["remote_id"] = str(remote_id)
-            result["status"] = status
-            return result
-    except Exception as e:
-        logger.warning(f"post_ticket() failed: {e}")
+        data = _json_loads(resp.content)
+    except ValueError:  # json/orjson decode errors are ValueErrors
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    # Normalize a couple of common fields
+    remote_id = (
+        data.get("id")
+        or data.get("ticket_id")
+        or data.get("remote_id")
+    )
+    status = data.get("status") or "posted"
+    result = {}
+    if remote_id:
+        result["remote_id"] = str(remote_id)
+    result["status"] = status
+    return result
+
+
+# Background dispatch
+BATCH_MAX_SIZE = 16
+BATCH_MAX_WAIT = 0.1  # seconds
+STOP_TIMEOUT = 10.0  # seconds stop_ticket_worker() waits for the worker to drain
+
+# Queued by stop_ticket_worker(): the worker posts what it holds, then exits
+_STOP = object()
+
+_queue: Optional[asyncio.Queue] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+THREAD_QUEUE_SIZE = 1000
+
+_thread_queue: Optional[queue.Queue] = None
+_thread_lock = threading.Lock()
+
+
+def enqueue_ticket(payload: Dict[str, Any]) -> bool:
+    """Queue payload for background posting.
+
+    Safe to call from any thread. Uses the asyncio worker when it is running
+    and the thread worker otherwise. Returns False when no sink is configured
+    or the thread queue is full, in which case the caller should fall back to
+    post_ticket().
+    """
+    if _queue is not None and _loop is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_queue.put_nowait, payload)
+        return True
+    if not _webhook_url():
+        return False
+    try:
+        _get_thread_queue().put_nowait(payload)
+    except queue.Full:
+        return False
+    return True
+
+
+def _get_thread_queue() -> queue.Queue:
+    """The thread worker's queue, starting the daemon thread on first use."""
+    global _thread_queue
+    with _thread_lock:
+        if _thread_queue is None:
+            _thread_queue = queue.Queue(maxsize=THREAD_QUEUE_SIZE)
+            threading.Thread(
+                target=_thread_worker, args=(_thread_queue,), name="ticket-sink", daemon=True
+            ).start()
+        return _thread_queue
+
+
+def _thread_worker(q: queue.Queue) -> None:
+    """Post queued payloads in order, up to BATCH_MAX_SIZE per wake-up."""
+    while True:
+        batch = [q.get()]
+        while len(batch) < BATCH_MAX_SIZE:
+            try:
+                batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+        for payload in batch:
+            try:
+                remote_info = post_ticket(payload)
+                if remote_info:
+                    logger.info(
+                        "Ticket sink post: local_id=%s remote_id=%s status=%s",
+                        payload.get("local_ticket_id"),
+                        remote_info.get("remote_id"),
+                        remote_info.get("status"),
+                    )
+            except Exception:
+                # Keep the worker alive; the traceback points at the bug
+                logger.exception("Ticket sink post crashed: local_id=%s", payload.get("local_ticket_id"))
+            finally:
+                q.task_done()
+
+
+@atexit.register
+def flush_tickets(timeout: Optional[float] = 6.0) -> bool:
+    """Wait for the thread worker to post everything queued so far.
+
+    Returns False if `timeout` seconds pass first. Also runs at exit, before
+    the shared client is closed.
+    """
+    q = _thread_queue
+    if q is None:
+        return True
+    with q.all_tasks_done:
+        return q.all_tasks_done.wait_for(lambda: q.unfinished_tasks == 0, timeout)
+
+
+_async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """The running loop's shared AsyncClient (its connections belong to that loop)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # Drop clients of loops that have since been closed
+        for stale in [loop for loop in _async_clients if loop.is_closed()]:
+            del _async_clients[stale]
+        client = _async_clients[loop] = httpx.AsyncClient(
+            timeout=6.0, limits=httpx.Limits(max_keepalive_connections=4)
+        )
+    return client
+
+
+async def post_ticket_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of post_ticket() for callers already on an event loop.
+
+    Same contract: returns {} when no sink is configured or the post fails.
+    """
+    url = _webhook_url()
+
+    if not url:
+        # No sink configured; noop
+        return {}
+
+    return await _post_ticket_async(_get_async_client(), url, payload)
+
+
+async def _post_ticket_async(client: httpx.AsyncClient, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        resp = await client.post(url, content=_json_dumps(payload), headers=_headers())
+        return _parse_response(resp)
+    except httpx.HTTPError as e:  # timeouts, transport errors; bugs propagate
+        logger.warning("post_ticket() failed: %s", e)
         return {}
+
+
+async def _next_batch(queue: asyncio.Queue) -> List[Dict[str, Any]]:
+    """Wait for one payload, then collect up to BATCH_MAX_SIZE within BATCH_MAX_WAIT.
+
+    Stops early at the _STOP sentinel, which is then the batch's last item.
+    """
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_MAX_WAIT
+    while len(batch) < BATCH_MAX_SIZE and batch[-1] is not _STOP:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def _ticket_sink_worker(queue: asyncio.Queue) -> None:
+    """Drain the queue, posting each batch concurrently over the shared client.
+
+    Returns after posting the batch that ends with the _STOP sentinel.
+    """
+    while True:
+        batch = await _next_batch(queue)
+        stop = batch[-1] is _STOP
+        if stop:
+            batch.pop()
+        if batch and _webhook_url():
+            await _post_batch(batch)
+        if stop:
+            return
+
+
+async def _post_batch(batch: List[Dict[str, Any]]) -> None:
+    """Post a batch concurrently, logging each outcome."""
+    results = await asyncio.gather(*(post_ticket_async(p) for p in batch), return_exceptions=True)
+    for payload, remote_info in zip(batch, results, strict=True):
+        if isinstance(remote_info, Exception):
+            logger.error(
+                "Ticket sink post crashed: local_id=%s",
+                payload.get("local_ticket_id"),
+                exc_info=remote_info,
+            )
+        elif remote_info:
+            logger.info(
+                "Ticket sink post: local_id=%s remote_id=%s status=%s",
+                payload.get("local_ticket_id"),
+                remote_info.get("remote_id"),
+                remote_info.get("status"),
+            )
+
+
+def start_ticket_worker() -> None:
+    """Start the background worker on the running event loop (call at app startup)."""
+    global _queue, _loop, _worker_task
+    if _worker_task is not None and not _worker_task.done():
+        return
+    _loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue()
+    _worker_task = _loop.create_task(_ticket_sink_worker(_queue))
+
+
+async def stop_ticket_worker() -> None:
+    """Flush pending payloads and stop the background worker (call at app shutdown)."""
+    global _queue, _loop, _worker_task
+    queue, task = _queue, _worker_task
+    _queue = _loop = _worker_task = None
+    if task is None:
+        return
+    # Let the worker finish the batch it holds (and its in-flight posts)
+    queue.put_nowait(_STOP)
+    try:
+        await asyncio.wait_for(task, STOP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Ticket sink worker did not drain within %.0fs", STOP_TIMEOUT)
+    # Post anything queued after the sentinel so tickets are not lost on shutdown
+    pending = []
+    while queue is not None and not queue.empty():
+        pending.append(queue.get_nowait())
+    try:
+        await asyncio.gather(*(post_ticket_async(p) for p in pending))
+    finally:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
@@ -1,123 +1,357 @@
 """Mock user data store and support tools."""
 
+import asyncio
+import atexit
+import collections
+import contextlib
+import functools
 import json
 import logging
+import mmap
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from tools.keyword_matcher import KeywordMatcher
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; tickets are then only safe from a single process
+    fcntl = None
+
+try:
+    import orjson
+
+    def _json_dumps(data: Dict) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+
+    def _json_line(data: Dict) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    _json_loads = orjson.loads
+
+    def _json_load_file(path: Path) -> Dict:
+        # orjson parses straight from the mapped pages, no bytes copy of the file
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return orjson.loads(b"")  # mmap refuses empty files; raise the usual error
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+except ImportError:  # orjson is optional; fall back to the stdlib
+    def _json_dumps(data: Dict) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def _json_line(data: Dict) -> bytes:
+        return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+    _json_loads = json.loads
+
+    def _json_load_file(path: Path) -> Dict:
+        return json.loads(path.read_bytes())
+
+TICKET_LOG_NAME = "support_tickets.log.jsonl"
 
 logger = logging.getLogger(__name__)
 
 
+def _created_at(record: Dict) -> str:
+    return record.get("created_at", "")
+
+
+# Mock data shipped with the package; USER_DATA_PATH points elsewhere
+_PACKAGE_DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "mock" / "users.json"
+
+
+@functools.lru_cache(maxsize=1)
+def _default_data_path() -> Path:
+    """USER_DATA_PATH if set, else the package's mock data; resolved once per process."""
+    env_path = os.getenv("USER_DATA_PATH")
+    # Absolute, so the cached path survives a later chdir
+    return Path(env_path).resolve() if env_path else _PACKAGE_DATA_PATH
+
+
 class UserStore:
     """Mock user data store with support tools."""
     
     def __init__(self, data_path: str = None):
         if data_path is None:
-            # Try to find the default path relative to different locations
-            possible_paths = [
-                "data/mock/users.json",
-                "./data/mock/users.json", 
-                "../data/mock/users.json",
-                "/home/mynameisnotyourbusiness/Documents/repos/agent-swarm-test-task/data/mock/users.json"
-            ]
-            for path in possible_paths:
-                if Path(path).exists():
-                    data_path = path
-                    break
-            else:
-                # Use the default path and let it fail gracefully
-                data_path = "data/mock/users.json"
+            data_path = _default_data_path()
         
         self.data_path = Path(data_path)
+        # New tickets are appended here and merged into data_path by flush()
+        self.ticket_log_path = self.data_path.with_name(TICKET_LOG_NAME)
+        # Serializes ticket writes across processes (API workers) sharing the files
+        self.lock_path = self.data_path.with_name(f".{self.data_path.name}.lock")
+        self._unflushed = 0
+        self._write_lock = threading.Lock()
+        self.reload()
+    
+    def reload(self) -> None:
+        """Re-read the data file (e.g. after it was edited outside this process)."""
+        # Stat before reading: a change that lands mid-read triggers another reload
+        self._data_stat = self._stat_data()
+        self._log_offset = 0
         self.data = self._load_data()
+        self._build_indexes()
+    
+    def _build_indexes(self) -> None:
+        """Index users, transactions and tickets by id so lookups skip the full lists."""
+        self._users_by_id: Dict[str, Dict] = {}
+        for user in self.data.get("users", []):
+            self._users_by_id.setdefault(user.get("id"), user)
+        
+        self._txns_by_user: Dict[str, List[Dict]] = collections.defaultdict(list)
+        for txn in self.data.get("transactions", []):
+            self._txns_by_user[txn.get("user_id")].append(txn)
+        # Newest first, sorted once here instead of on every lookup
+        for transactions in self._txns_by_user.values():
+            transactions.sort(key=_created_at, reverse=True)
+        
+        self._tickets_by_user: Dict[str, List[Dict]] = collections.defaultdict(list)
+        self._max_ticket_num = 0
+        for ticket in self.data.get("support_tickets", []):
+            self._index_ticket(ticket)
+    
+    def _index_ticket(self, ticket: Dict) -> None:
+        self._tickets_by_user[ticket.get("user_id")].append(ticket)
+        ticket_id = ticket.get("id", "")
+        if ticket_id.startswith("ticket"):
+            try:
+                num = int(ticket_id[6:])  # Remove "ticket" prefix
+                self._max_ticket_num = max(self._max_ticket_num, num)
+            except ValueError:
+                pass
     
     def _load_data(self) -> Dict:
-        """Load mock data from JSON file."""
+        """Load mock data from JSON file, plus tickets logged since the last flush."""
         try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            data = _json_load_file(self.data_path)
         except FileNotFoundError:
             logger.error(f"Mock data file not found: {self.data_path}")
-            return {"users": [], "transactions": [], "support_tickets": []}
+            data = {"users": [], "transactions": [], "support_tickets": []}
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON in mock data file: {self.data_path}")
-            return {"users": [], "transactions": [], "support_tickets": []}
+            data = {"users": [], "transactions": [], "support_tickets": []}
+        self._replay_ticket_log(data)
+        return data
+    
+    def _replay_ticket_log(self, data: Dict) -> List[Dict]:
+        """Merge log lines past the last read offset into `data`; returns the new tickets.
+
+        Ticket ids already in `data` are skipped.
+        """
+        try:
+            with open(self.ticket_log_path, 'rb') as f:
+                f.seek(self._log_offset)
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        # Only whole lines; one still being written is picked up next time
+        end = raw.rfind(b"\n") + 1
+        self._log_offset += end
+        tickets = data.setdefault("support_tickets", [])
+        known = {ticket.get("id") for ticket in tickets}
+        added = []
+        for line in raw[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                ticket = _json_loads(line)
+            except ValueError:  # e.g. a write cut short by a crash
+                logger.warning(f"Skipping unreadable line in {self.ticket_log_path}")
+                continue
+            if ticket.get("id") not in known:
+                known.add(ticket.get("id"))
+                tickets.append(ticket)
+                added.append(ticket)
+        return added
+    
+    def _stat_data(self) -> Optional[Tuple[int, int, int]]:
+        """Signature of the data file; it changes when another process rewrites it."""
+        try:
+            st = os.stat(self.data_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+    
+    def _sync_from_disk(self) -> None:
+        """Pick up tickets other processes have written. Call with the file lock held."""
+        if self._stat_data() != self._data_stat:
+            # Another process compacted the log into the data file
+            self.reload()
+            return
+        for ticket in self._replay_ticket_log(self.data):
+            self._index_ticket(ticket)
+    
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with other processes using the same data file."""
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(self.lock_path, 'ab')
+        except OSError as e:
+            logger.warning(f"Cannot lock {self.lock_path}, continuing unlocked: {e}")
+            yield
+            return
+        with lock_file:  # closing the file releases the lock
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user details by ID."""
-        for user in self.data.get("users", []):
-            if user.get("id") == user_id:
-                return user
-        return None
+        return self._users_by_id.get(user_id)
+    
+    def user_exists(self, user_id: str) -> bool:
+        """Check whether a user ID is known."""
+        return user_id in self._users_by_id
     
     def get_user_transactions(self, user_id: str, limit: int = 10) -> List[Dict]:
-        """Get recent transactions for a user."""
-        transactions = [
-            txn for txn in self.data.get("transactions", [])
-            if txn.get("user_id") == user_id
-        ]
-        
-        # Sort by date (newest first)
-        transactions.sort(
-            key=lambda x: x.get("created_at", ""),
-            reverse=True
-        )
-        
-        return transactions[:limit]
+        """Get recent transactions for a user (newest first)."""
+        return self._txns_by_user.get(user_id, [])[:limit]
     
+    async def aget_user_by_id(self, user_id: str) -> Optional[Dict]:
+        """Async variant of get_user_by_id, run in a worker thread."""
+        return await asyncio.to_thread(self.get_user_by_id, user_id)
+
+    async def aget_user_transactions(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Async variant of get_user_transactions, run in a worker thread."""
+        return await asyncio.to_thread(self.get_user_transactions, user_id, limit)
+
     def get_user_support_tickets(self, user_id: str) -> List[Dict]:
         """Get support tickets for a user."""
-        return [
-            ticket for ticket in self.data.get("support_tickets", [])
-            if ticket.get("user_id") == user_id
-        ]
+        return list(self._tickets_by_user.get(user_id, ()))
     
     def create_support_ticket(self, user_id: str, subject: str, description: str) -> Optional[Dict]:
         """Create a new support ticket."""
         # Check if user exists
-        user = self.get_user_by_id(user_id)
-        if not user:
+        if not self.user_exists(user_id):
             return None
         
-        # Generate new ticket ID
-        existing_tickets = self.data.get("support_tickets", [])
-        max_id = 0
-        for ticket in existing_tickets:
-            ticket_id = ticket.get("id", "")
-            if ticket_id.startswith("ticket"):
-                try:
-                    num = int(ticket_id[6:])  # Remove "ticket" prefix
-                    max_id = max(max_id, num)
-                except ValueError:
-                    continue
-        
-        new_ticket_id = f"ticket{str(max_id + 1).zfill(3)}"
+        # One writer at a time: the store is shared across threads and processes
+        with self._write_lock, self._file_lock():
+            # Other workers may have logged tickets since we last looked
+            self._sync_from_disk()
+            
+            # Generate new ticket ID
+            self._max_ticket_num += 1
+            new_ticket_id = f"ticket{str(self._max_ticket_num).zfill(3)}"
+            
+            new_ticket = {
+                "id": new_ticket_id,
+                "user_id": user_id,
+                "subject": subject,
+                "description": description,
+                "status": "open",
+                "priority": "medium",  # Default priority
+                "created_at": datetime.now().isoformat()
+            }
+            
+            # Add to data
+            if "support_tickets" not in self.data:
+                self.data["support_tickets"] = []
+            
+            self.data["support_tickets"].append(new_ticket)
+            self._tickets_by_user[user_id].append(new_ticket)
+            
+            # Persist with one small append instead of rewriting the whole file
+            self._append_ticket_log(new_ticket)
         
-        new_ticket = {
-            "id": new_ticket_id,
-            "user_id": user_id,
-            "subject": subject,
-            "description": description,
-            "status": "open",
-            "priority": "medium",  # Default priority
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Add to data
-        if "support_tickets" not in self.data:
-            self.data["support_tickets"] = []
-        
-        self.data["support_tickets"].append(new_ticket)
-        
-        # Save to file (for persistence)
+        return new_ticket
+
+    def _append_ticket_log(self, ticket: Dict) -> None:
+        """Append one ticket to the ticket log."""
         try:
-            with open(self.data_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            with open(self.ticket_log_path, 'ab') as f:
+                f.write(_json_line(ticket))
+                # Synced up to the old end under the file lock, so our own line is read
+                self._log_offset = f.tell()
+            self._unflushed += 1
+        except OSError as e:
+            logger.error(f"Failed to log support ticket: {e}")
+
+    def flush(self) -> None:
+        """Write the data (including logged tickets) back to the JSON file and clear the log."""
+        with self._write_lock, self._file_lock():
+            if not self._unflushed:
+                return
+            # Merge every logged ticket, including other workers', before dropping the log
+            self._sync_from_disk()
+            if self._save_data():
+                self.ticket_log_path.unlink(missing_ok=True)
+                self._unflushed = 0
+                self._data_stat = self._stat_data()
+                self._log_offset = 0
+
+    def _save_data(self) -> bool:
+        """Write mock data back to the JSON file; returns False on failure."""
+        payload = _json_dumps(self.data)
+        # One write to a sibling temp file, then an atomic rename: a crash
+        # mid-write never leaves a truncated data file behind
+        tmp_path = self.data_path.with_name(f".{self.data_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(payload)
+            os.replace(tmp_path, self.data_path)
+            return True
         except Exception as e:
             logger.error(f"Failed to save mock data: {e}")
-        
-        return new_ticket
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+
+_store: Optional[UserStore] = None
+_store_lock = threading.Lock()
+
+
+def get_user_store() -> UserStore:
+    """Return the process-wide UserStore, loading the data file on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = UserStore()
+    return _store
+
+
+@atexit.register
+def _flush_store() -> None:
+    """Compact the ticket log into the data file at exit."""
+    if _store is not None:
+        _store.flush()
+
+
+# Swaps the en-US separators of f"{v:,.2f}" for pt-BR ones in a single pass
+_BRL_TRANS = str.maketrans({",": ".", ".": ","})
+
+
+def format_brl(value: float) -> str:
+    """Format an amount as Brazilian reais, e.g. 1234.5 -> 'R$ 1.234,50'."""
+    return "R$ " + f"{value:,.2f}".translate(_BRL_TRANS)
+
+
+# Translation tables for the tool responses, built once instead of per call
+STATUS_EMOJI = {"active": "✅", "suspended": "⚠️", "inactive": "❌"}
+_TXN_STATUS_EMOJI = {"completed": "✅", "pending": "⏳", "failed": "❌"}
+UNKNOWN_EMOJI = "❓"
+_ACCT_TYPE_PT = {"personal": "Pessoal", "business": "Empresarial"}
+_TXN_TYPE_PT = {"payment": "Pagamento", "withdrawal": "Saque", "deposit": "Depósito"}
+
+_ACCOUNT_DETAILS_TEMPLATE = """📋 **Dados da Conta**
+
+**Nome:** {name}
+**Email:** {email}
+**Telefone:** {phone}
+**Tipo de Conta:** {account_type}
+**Saldo Atual:** {balance}
+**Status:** {status_emoji} {status}
+**Data de Criação:** {created_at}"""
+_TRANSACTION_TEMPLATE = """**{type}** - {amount}
+Descrição: {description}
+Status: {status_emoji} {status}
+Data: {created_at}
+""" + "-" * 20 + "\n\n"
 
 
 # Tool functions for the Support Agent
@@ -130,42 +364,27 @@ def get_account_details(user_id: str) -> str:
     Returns:
         Formatted account details string
     """
-    store = UserStore()
+    store = get_user_store()
     user = store.get_user_by_id(user_id)
     
     if not user:
         return f"❌ Usuário {user_id} não encontrado."
     
-    # Format balance
-    balance = user.get("balance", 0)
-    balance_str = f"R$ {balance:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    balance_str = format_brl(user.get("balance", 0))
     
-    # Format status
     status = user.get("status", "unknown")
-    status_emoji = {
-        "active": "✅",
-        "suspended": "⚠️",
-        "inactive": "❌"
-    }.get(status, "❓")
-    
-    # Format account type
     account_type = user.get("account_type", "unknown")
-    account_type_pt = {
-        "personal": "Pessoal",
-        "business": "Empresarial"
-    }.get(account_type, account_type)
-    
-    response = f"""📋 **Dados da Conta**
-
-**Nome:** {user.get('name', 'N/A')}
-**Email:** {user.get('email', 'N/A')}
-**Telefone:** {user.get('phone', 'N/A')}
-**Tipo de Conta:** {account_type_pt}
-**Saldo Atual:** {balance_str}
-**Status:** {status_emoji} {status.title()}
-**Data de Criação:** {user.get('created_at', 'N/A')}"""
     
-    return response
+    return _ACCOUNT_DETAILS_TEMPLATE.format(
+        name=user.get('name', 'N/A'),
+        email=user.get('email', 'N/A'),
+        phone=user.get('phone', 'N/A'),
+        account_type=_ACCT_TYPE_PT.get(account_type, account_type),
+        balance=balance_str,
+        status_emoji=STATUS_EMOJI.get(status, UNKNOWN_EMOJI),
+        status=status.title(),
+        created_at=user.get('created_at', 'N/A'),
+    )
 
 
 def get_recent_transactions(user_id: str, limit: int = 5) -> str:
@@ -178,10 +397,9 @@ def get_recent_transactions(user_id: str, limit: int = 5) -> str:
     Returns:
         Formatted transactions string
     """
-    store = UserStore()
-    user = store.get_user_by_id(user_id)
+    store = get_user_store()
     
-    if not user:
+    if not store.user_exists(user_id):
         return f"❌ Usuário {user_id} não encontrado."
     
     transactions = store.get_user_transactions(user_id, limit)
@@ -189,36 +407,22 @@ def get_recent_transactions(user_id: str, limit: int = 5) -> str:
     if not transactions:
         return "📊 **Transações Recentes**\n\nNenhuma transação encontrada."
     
-    response = "📊 **Transações Recentes**\n\n"
+    parts = ["📊 **Transações Recentes**\n\n"]
     
     for txn in transactions:
-        # Format amount
-        amount = txn.get("amount", 0)
-        amount_str = f"R$ {amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        
-        # Format status
         status = txn.get("status", "unknown")
-        status_emoji = {
-            "completed": "✅",
-            "pending": "⏳",
-            "failed": "❌"
-        }.get(status, "❓")
-        
-        # Format type
         txn_type = txn.get("type", "unknown")
-        type_pt = {
-            "payment": "Pagamento",
-            "withdrawal": "Saque",
-            "deposit": "Depósito"
-        }.get(txn_type, txn_type)
         
-        response += f"**{type_pt}** - {amount_str}\n"
-        response += f"Descrição: {txn.get('description', 'N/A')}\n"
-        response += f"Status: {status_emoji} {status.title()}\n"
-        response += f"Data: {txn.get('created_at', 'N/A')}\n"
-        response += "-" * 20 + "\n\n"
+        parts.append(_TRANSACTION_TEMPLATE.format(
+            type=_TXN_TYPE_PT.get(txn_type, txn_type),
+            amount=format_brl(txn.get("amount", 0)),
+            description=txn.get('description', 'N/A'),
+            status_emoji=_TXN_STATUS_EMOJI.get(status, UNKNOWN_EMOJI),
+            status=status.title(),
+            created_at=txn.get('created_at', 'N/A'),
+        ))
     
-    return response.strip()
+    return "".join(parts).strip()
 
 
 def open_support_ticket(user_id: str, subject: str, description: str) -> str:
@@ -232,7 +436,7 @@ def open_support_ticket(user_id: str, subject: str, description: str) -> str:
     Returns:
         Confirmation message
     """
-    store = UserStore()
+    store = get_user_store()
     ticket = store.create_support_ticket(user_id, subject, description)
     
     if not ticket:
@@ -292,15 +496,25 @@ TOOL_METADATA = {
 }
 
 
+# All tool keywords in one automaton: a single pass over the query finds every tool
+_TOOL_KEYWORDS = KeywordMatcher.from_groups(
+    {tool_name: metadata["keywords"] for tool_name, metadata in TOOL_METADATA.items()}
+)
+
+
 def get_tool_suggestions(query: str) -> List[str]:
     """Suggest tools based on query keywords."""
-    query_lower = query.lower()
-    suggestions = []
-    
-    for tool_name, metadata in TOOL_METADATA.items():
-        for keyword in metadata["keywords"]:
-            if keyword in query_lower:
-                suggestions.append(tool_name)
-                break
-    
-    return suggestions
\ No newline at end of file
+    return list(_suggest_cached(query.lower()))
+
+
+@functools.lru_cache(maxsize=1024)
+def _suggest_cached(query_lower: str) -> Tuple[str, ...]:
+    """Tool suggestions per lowercased query (case variants share one entry)."""
+    found = _TOOL_KEYWORDS.tags(query_lower)
+    # Keep TOOL_METADATA order
+    return tuple(tool_name for tool_name in TOOL_METADATA if tool_name in found)
+
+
+def clear_tool_suggestion_cache() -> None:
+    """Drop memoized tool suggestions (e.g. after TOOL_METADATA changes in tests)."""
+    _suggest_cached.cache_clear()
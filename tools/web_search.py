@@ -1,12 +1,97 @@
 """Web search tool for additional information."""
 
+import asyncio
+import atexit
+import concurrent.futures
+import importlib.util
 import logging
-from typing import List, Optional
+import math
+import threading
+from typing import Dict, List, Optional
 
 import httpx
+from cachetools import TTLCache
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    import json
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Recent results keyed by (query, num_results); repeated questions skip the
+# network. A threading lock, since searches run on more than one event loop.
+_RESULTS_CACHE: TTLCache = TTLCache(maxsize=512, ttl=300)
+_RESULTS_CACHE_LOCK = threading.Lock()
+
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    """The running loop's shared AsyncClient, so searches reuse pooled TLS connections."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Drop clients of loops that have since been closed
+        for stale in [loop for loop in _clients if loop.is_closed()]:
+            del _clients[stale]
+        client = _clients[loop] = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=10),
+        )
+    return client
+
+
+async def close_client() -> None:
+    """Close the running loop's search client (call at shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+SYNC_SEARCH_TIMEOUT = 15.0
+MAX_CONCURRENT_SEARCHES = 8
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop for the sync web_search() wrapper, running on a daemon thread.
+
+    One long-lived loop keeps its pooled client across calls instead of
+    building (and tearing down) a loop and client per query.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="web-search", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+@atexit.register
+def _stop_loop() -> None:
+    """Close the background loop's client and stop the loop at exit."""
+    global _loop
+    loop, _loop = _loop, None
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(close_client(), loop).result(timeout=5)
+    except Exception as e:
+        logger.warning("Closing web search client failed: %s", e)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+# Query parameters shared by every Brave request; only q and count vary
+_STATIC_PARAMS = {"text_decorations": False, "text_format": "Raw"}
+
 
 class WebSearchTool:
     """Simple web search tool using Brave Search API or fallback."""
@@ -14,6 +99,10 @@ class WebSearchTool:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
         self.base_url = "https://api.search.brave.com/res/v1/web/search"
+        self._headers = {
+            "Accept": "application/json",
+            "X-Subscription-Token": api_key or "",
+        }
         
     async def search(self, query: str, num_results: int = 3) -> List[dict]:
         """Perform web search and return results."""
@@ -21,44 +110,82 @@ class WebSearchTool:
             logger.warning("No API key provided for web search")
             return []
         
+        key = (query, num_results)
+        with _RESULTS_CACHE_LOCK:
+            cached = _RESULTS_CACHE.get(key)
+        if cached is not None:
+            return list(cached)
+        
         try:
-            headers = {
-                "Accept": "application/json",
-                "X-Subscription-Token": self.api_key
-            }
+            response = await _get_client().get(
+                self.base_url,
+                headers=self._headers,
+                params={"q": query, "count": num_results, **_STATIC_PARAMS}
+            )
+            response.raise_for_status()
             
-            params = {
-                "q": query,
-                "count": num_results,
-                "text_decorations": False,
-                "text_format": "Raw"
-            }
+            data = _json_loads(response.content)
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    self.base_url,
-                    headers=headers,
-                    params=params
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                results = []
-                for result in data.get("web", {}).get("results", []):
-                    results.append({
-                        "title": result.get("title", ""),
-                        "url": result.get("url", ""),
-                        "description": result.get("description", ""),
-                        "age": result.get("age", "")
-                    })
-                
-                return results
+            results = []
+            for result in data.get("web", {}).get("results", []):
+                results.append({
+                    "title": result.get("title", ""),
+                    "url": result.get("url", ""),
+                    "description": result.get("description", ""),
+                    "age": result.get("age", "")
+                })
+            
+            with _RESULTS_CACHE_LOCK:
+                _RESULTS_CACHE[key] = tuple(results)
+            return results
                 
         except Exception as e:
             logger.error(f"Web search failed: {e}")
             return []
 
+    async def search_many(
+        self, queries: List[str], num_results: int = 3, timeout: Optional[float] = None
+    ) -> List[List[dict]]:
+        """Run several searches concurrently (at most MAX_CONCURRENT_SEARCHES at a time).
+
+        Returns one result list per query, in query order. Searches still
+        running after `timeout` seconds are cancelled and return [].
+        """
+        if not queries:
+            return []
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+        async def _bounded(query: str) -> List[dict]:
+            async with semaphore:
+                return await self.search(query, num_results)
+
+        tasks = [asyncio.ensure_future(_bounded(q)) for q in queries]
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("%d of %d web searches timed out", len(pending), len(tasks))
+        return [task.result() if task in done else [] for task in tasks]
+
+
+_NO_RESULTS = "Não encontrei informações adicionais na web."
+
+
+def _format_results(results: List[dict]) -> str:
+    """Render search results as the markdown block the agents show."""
+    if not results:
+        return _NO_RESULTS
+    
+    parts = ["🔍 **Resultados da Pesquisa**\n\n"]
+    
+    for i, result in enumerate(results, 1):
+        parts.append(f"**{i}. {result['title']}**\n{result['description']}\n🔗 {result['url']}\n")
+        if result.get('age'):
+            parts.append(f"📅 {result['age']}\n")
+        parts.append("\n")
+    
+    return "".join(parts).strip()
+
 
 def web_search(query: str, num_results: int = 3) -> str:
     """Synchronous wrapper for web search.
@@ -70,33 +197,44 @@ def web_search(query: str, num_results: int = 3) -> str:
     Returns:
         Formatted search results
     """
-    import asyncio
-    
     async def _search():
-        tool = WebSearchTool()
-        results = await tool.search(query, num_results)
-        
-        if not results:
-            return "Não encontrei informações adicionais na web."
-        
-        response = "🔍 **Resultados da Pesquisa**\n\n"
-        
-        for i, result in enumerate(results, 1):
-            response += f"**{i}. {result['title']}**\n"
-            response += f"{result['description']}\n"
-            response += f"🔗 {result['url']}\n"
-            if result.get('age'):
-                response += f"📅 {result['age']}\n"
-            response += "\n"
+        return _format_results(await WebSearchTool().search(query, num_results))
+    
+    future = asyncio.run_coroutine_threadsafe(_search(), _get_loop())
+    try:
+        return future.result(timeout=SYNC_SEARCH_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        # Stop the search on the background loop too, not just stop waiting
+        future.cancel()
+        logger.warning("Web search timed out after %.0fs", SYNC_SEARCH_TIMEOUT)
+        return _NO_RESULTS
+
+
+def web_search_many(queries: List[str], num_results: int = 3) -> List[str]:
+    """Synchronous wrapper for WebSearchTool.search_many.
+    
+    Args:
+        queries: Search queries, run concurrently
+        num_results: Number of results per query
         
-        return response.strip()
+    Returns:
+        Formatted search results, in query order
+    """
+    # SYNC_SEARCH_TIMEOUT per wave of MAX_CONCURRENT_SEARCHES queries
+    budget = SYNC_SEARCH_TIMEOUT * max(1, math.ceil(len(queries) / MAX_CONCURRENT_SEARCHES))
+    
+    async def _search():
+        results = await WebSearchTool().search_many(queries, num_results, timeout=budget)
+        return [_format_results(r) for r in results]
     
+    future = asyncio.run_coroutine_threadsafe(_search(), _get_loop())
     try:
-        return asyncio.run(_search())
-    except RuntimeError:
-        # If there's already an event loop running
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(_search())
+        # search_many enforces the budget itself; the margin only covers a stuck loop
+        return future.result(timeout=budget + 1.0)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        logger.warning("Web searches timed out after %.0fs", budget)
+        return [_NO_RESULTS] * len(queries)
 
 
 # Simple fallback search using web scraping